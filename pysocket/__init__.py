@@ -1,14 +1,23 @@
-from .serverConfig.socketServer import PySocketServer
+from .serverConfig.socketServer import CallError, Failed, PySocketServer
 from .serverConfig.consumer import WebSocketConsumer
+from .serverConfig.dispatch import offload
+from .serverConfig.schema import Schema, SchemaError
 from .asgi.adapter import ASGIAdapter, ASGIConnectionWrapper
 from .routing.router import WebSocketRouter
+from .metrics import metrics
 from .settings import settings
 
 __all__ = [
     "PySocketServer",
+    "CallError",
+    "Failed",
     "WebSocketConsumer",
+    "offload",
+    "Schema",
+    "SchemaError",
     "ASGIAdapter",
     "ASGIConnectionWrapper",
     "WebSocketRouter",
+    "metrics",
     "settings",
 ]
\ No newline at end of file
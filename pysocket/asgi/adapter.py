@@ -1,68 +1,96 @@
-import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from ..serverConfig.socketServer import PySocketServer
 from ..routing.router import WebSocketRouter
 from ..connectionEngine.connection import WebSocketConnection
+from ..connectionEngine.frames import CLOSE_TRY_AGAIN_LATER
+from ..codecs import get_codec, negotiate
+from ..metrics import metrics
+from ..settings import settings
 
 logger = logging.getLogger("pysocket.asgi")
 
 class ASGIConnectionWrapper(WebSocketConnection):
+    __slots__ = ("scope", "_receive", "_send")
+    # Keepalive pings are the ASGI server's job (e.g. Uvicorn's ws_ping_interval)
+    supports_ping = False
+    logger = logger
+
     def __init__(self, scope: Dict[str, Any], receive, send):
         super().__init__()
         self.scope = scope
         self._receive = receive
         self._send = send
-        self._closed = False
-        self.logger = logger
         self.path = scope.get('path', '/')
+        if scope.get('pysocket.codec'):
+            self.codec = get_codec(scope['pysocket.codec'])
+        else:
+            codec = negotiate(scope.get('subprotocols') or ())
+            if codec:
+                self.codec = codec
+                self.subprotocol = codec.subprotocol
 
     async def handshake(self):
         self.logger.debug(f"ASGI handshake for path {self.path}")
         # Handshake handled by ASGI server (Daphne)
 
     async def receive(self):
-        if self._closed:
-            self.logger.debug("Receive attempted on closed connection")
-            return None
-        try:
-            message = await self._receive()
-            self.logger.debug(f"Received ASGI message: {message}")
-            if message['type'] == 'websocket.disconnect':
+        while not self._closed:
+            try:
+                message = await self._receive()
+            except Exception as e:
+                self.logger.error(f"Receive error: {e}")
+                await self.close()
+                return None
+            kind = message['type']
+            if kind == 'websocket.receive':
+                # Text and binary frames are handed to the codec as they arrive, empty ones included
+                data = message.get('text')
+                if data is None:
+                    data = message.get('bytes') or b''
+                if settings.METRICS:
+                    metrics.messages_in.inc()
+                    metrics.bytes_in.inc(len(data))
+                return data
+            if kind == 'websocket.disconnect':
                 self._closed = True
                 self.logger.info("Received websocket.disconnect")
-                return None
-            text = message.get('text')
-            if text:
-                self.logger.debug(f"Received text: {text}")
-                return text
-            return None
-        except Exception as e:
-            self.logger.error(f"Receive error: {e}")
-            await self.close()
-            return None
+        return None
 
-    async def send(self, message: str):
+    def encode_frame(self, message, binary: Optional[bool] = None):
+        # The event dict is the frame: the server builds it once per broadcast
+        # and every connection sharing a frame_key passes it on untouched.
+        if isinstance(message, str):
+            if binary:
+                return {'type': 'websocket.send', 'bytes': message.encode('utf-8')}
+            return {'type': 'websocket.send', 'text': message}
+        if binary is False:
+            return {'type': 'websocket.send', 'text': bytes(message).decode('utf-8')}
+        return {'type': 'websocket.send', 'bytes': bytes(message)}
+
+    async def send(self, message, binary: Optional[bool] = None):
         if self._closed:
             self.logger.warning("Attempted to send on closed ASGI connection")
             return
+        if isinstance(message, dict):
+            message = self.codec.encode(message)
+            binary = self.codec.binary if binary is None else binary
+        self.send_frame(self.encode_frame(message, binary))
+
+    async def _write_frames(self, frames):
+        if settings.METRICS:
+            metrics.messages_out.inc(len(frames))
+            metrics.bytes_out.inc(sum(len(frame.get('bytes') or frame.get('text') or '') for frame in frames))
+        for frame in frames:
+            await self._send(frame)
+
+    async def _shutdown(self, code: int, reason: str):
+        await self._finish_outbound()
         try:
-            if isinstance(message, dict):
-                message = json.dumps(message)
-            await self._send({'type': 'websocket.send', 'text': message})
-            self.logger.debug(f"Sent ASGI message: {message}")
+            await self._send({'type': 'websocket.close', 'code': code, 'reason': reason})
+            self.logger.info(f"Closed ASGI connection for path {self.path}")
         except Exception as e:
-            self.logger.error(f"ASGI send error: {e}")
-            await self.close()
-
-    async def close(self):
-        if not self._closed:
-            self._closed = True
-            try:
-                await self._send({'type': 'websocket.close', 'code': 1000})
-                self.logger.info(f"Closed ASGI connection for path {self.path}")
-            except Exception as e:
-                self.logger.error(f"ASGI close error: {e}")
+            self.logger.error(f"ASGI close error: {e}")
 
 class ASGIAdapter:
     def __init__(self, server: PySocketServer, router: WebSocketRouter = None):
@@ -82,12 +110,22 @@ class ASGIAdapter:
             await send({'type': 'websocket.close', 'code': 1000})
             return
 
-        await send({'type': 'websocket.accept'})
-        connection = ASGIConnectionWrapper(scope, receive, send)
-        path = scope.get('path', '/')
-        consumer = self.router.resolve(path)
-        if consumer:
-            self.logger.info(f"Resolved consumer {consumer.__name__} for path {path}")
-        else:
-            self.logger.warning(f"No consumer resolved for path {path}")
-        await self.server.handle_connection(connection, path, consumer)
\ No newline at end of file
+        if not self.server.admit():
+            # Closing before accept makes the ASGI server answer the handshake with an HTTP error
+            await send({'type': 'websocket.close', 'code': CLOSE_TRY_AGAIN_LATER})
+            return
+        try:
+            connection = ASGIConnectionWrapper(scope, receive, send)
+            accept = {'type': 'websocket.accept'}
+            if connection.subprotocol:
+                accept['subprotocol'] = connection.subprotocol
+            await send(accept)
+            path = scope.get('path', '/')
+            consumer, kwargs = self.router.match(path) or (None, None)
+            if consumer:
+                self.logger.info(f"Resolved consumer {consumer.__name__} for path {path}")
+            else:
+                self.logger.warning(f"No consumer resolved for path {path}")
+            await self.server.handle_connection(connection, path, consumer, kwargs)
+        finally:
+            self.server.release()
\ No newline at end of file
@@ -0,0 +1,12 @@
+from .base import Backplane
+from .memory import MemoryBackplane, MemoryHub
+from .ipc import IPCBackplane
+from .redis import RedisBackplane
+
+__all__ = [
+    "Backplane",
+    "MemoryBackplane",
+    "MemoryHub",
+    "IPCBackplane",
+    "RedisBackplane",
+]
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import Any, Dict, List, Optional
+
+from ..codecs import get_codec
+from ..codecs.messagepack import pack_array
+from ..settings import settings
+
+logger = logging.getLogger("pysocket.backplane")
+
+class Backplane:
+    """Carries room emits between server nodes.
+
+    Emits published within one loop tick (or ``BACKPLANE_FLUSH_INTERVAL``)
+    are batched per channel into a single ``[node_id, seq, items]`` packet.
+    Each item is encoded as it is published, so the data may change
+    afterwards without changing what other nodes receive.
+    Receivers drop their own packets and any sequence number they have
+    already seen from that origin, then deliver to local members only.
+    Subclasses implement :meth:`_send` and call :meth:`_receive`.
+    """
+    channel = "pysocket"
+
+    def __init__(self, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.batch_size = batch_size or settings.BACKPLANE_BATCH_SIZE
+        self.flush_interval = settings.BACKPLANE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.codec = get_codec("msgpack")
+        self.node_id: Optional[str] = None
+        self.server = None
+        self._seq = 0
+        self._last_seq: Dict[str, int] = {}
+        self._pending: Dict[str, List[bytes]] = {}
+        self._pending_count = 0
+        self._flush_handle: Optional[asyncio.Handle] = None
+
+    async def start(self, server) -> None:
+        # Generated here rather than in __init__ so forked workers get their own id.
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.server = server
+        logger.info(f"Backplane {self.__class__.__name__} started as node {self.node_id}")
+
+    async def close(self) -> None:
+        self.flush()
+
+    def channel_for(self, room: Optional[str]) -> str:
+        return self.channel
+
+    def room_joined(self, room: str) -> None:
+        """Called when a room gains its first local member."""
+
+    def room_left(self, room: str) -> None:
+        """Called when a room loses its last local member."""
+
+    def pattern_subscribed(self, pattern: str) -> None:
+        """Called when a topic pattern gains its first local subscriber."""
+
+    def pattern_unsubscribed(self, pattern: str) -> None:
+        """Called when a topic pattern loses its last local subscriber."""
+
+    def publish(self, event: str, data: Any, room: Optional[str] = None) -> None:
+        try:
+            item = self.codec.encode([room, event, data])
+        except (TypeError, ValueError, OverflowError) as e:
+            logger.error(f"Cannot publish {event} to the backplane: {e}")
+            return
+        channel = self.channel_for(room)
+        batch = self._pending.get(channel)
+        if batch is None:
+            batch = self._pending[channel] = []
+        batch.append(item)
+        self._pending_count += 1
+        if self._pending_count >= self.batch_size:
+            self.flush()
+        elif self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            if self.flush_interval:
+                self._flush_handle = loop.call_later(self.flush_interval, self.flush)
+            else:
+                self._flush_handle = loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        self._pending_count = 0
+        for channel, items in pending.items():
+            self._seq += 1
+            try:
+                self._send(channel, pack_array([self.codec.encode(self.node_id), self.codec.encode(self._seq),
+                                                pack_array(items)]))
+            except Exception as e:
+                logger.error(f"Backplane publish to {channel} failed: {e}")
+
+    def _send(self, channel: str, packet: bytes) -> None:
+        raise NotImplementedError
+
+    def _receive(self, packet: bytes) -> None:
+        try:
+            origin, seq, items = self.codec.decode(packet)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Dropping malformed backplane packet: {e}")
+            return
+        if origin == self.node_id or seq <= self._last_seq.get(origin, 0):
+            return
+        self._last_seq[origin] = seq
+        deliver = self.server._deliver
+        for room, event, data in items:
+            deliver(event, data, room)
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import Optional
+
+from .base import Backplane
+
+logger = logging.getLogger("pysocket.backplane")
+
+_HEADER_SIZE = 4
+
+async def _read_packet(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(_HEADER_SIZE)
+    return header + await reader.readexactly(int.from_bytes(header, "big"))
+
+class IPCBackplane(Backplane):
+    """Worker side of the supervisor's Unix domain socket hub."""
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, server) -> None:
+        await super().start(server)
+        self._task = asyncio.ensure_future(self._run())
+
+    def _send(self, channel: str, packet: bytes) -> None:
+        if self._writer is None:
+            logger.debug(f"IPC hub not connected, dropping {len(packet)} byte packet")
+            return
+        self._writer.write(len(packet).to_bytes(_HEADER_SIZE, "big") + packet)
+
+    async def _run(self) -> None:
+        delay = 0.05
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 1.0)
+                continue
+            delay = 0.05
+            self._writer = writer
+            logger.debug(f"Node {self.node_id} connected to IPC hub {self.path}")
+            try:
+                while True:
+                    packet = await _read_packet(reader)
+                    self._receive(packet[_HEADER_SIZE:])
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning(f"Node {self.node_id} lost the IPC hub, reconnecting")
+            finally:
+                self._writer = None
+                writer.close()
+
+    async def close(self) -> None:
+        await super().close()
+        if self._task:
+            self._task.cancel()
+        if self._writer:
+            self._writer.close()
+
+async def run_hub(path: str) -> None:
+    """Relay every packet received on ``path`` to all other connected workers."""
+    peers = set()
+
+    async def relay(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peers.add(writer)
+        try:
+            while True:
+                packet = await _read_packet(reader)
+                for peer in peers:
+                    if peer is not writer:
+                        peer.write(packet)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            peers.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_unix_server(relay, path)
+    async with server:
+        await server.serve_forever()
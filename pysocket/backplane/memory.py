@@ -0,0 +1,33 @@
+import asyncio
+from typing import List
+
+from .base import Backplane
+
+class MemoryHub:
+    """In-process stand-in for a message broker shared by several servers."""
+
+    def __init__(self):
+        self.members: List["MemoryBackplane"] = []
+
+    def publish(self, channel: str, packet: bytes) -> None:
+        for member in self.members:
+            member._loop.call_soon_threadsafe(member._receive, packet)
+
+class MemoryBackplane(Backplane):
+    def __init__(self, hub: MemoryHub, **kwargs):
+        super().__init__(**kwargs)
+        self.hub = hub
+        self._loop = None
+
+    async def start(self, server) -> None:
+        await super().start(server)
+        self._loop = asyncio.get_running_loop()
+        self.hub.members.append(self)
+
+    async def close(self) -> None:
+        await super().close()
+        if self in self.hub.members:
+            self.hub.members.remove(self)
+
+    def _send(self, channel: str, packet: bytes) -> None:
+        self.hub.publish(channel, packet)
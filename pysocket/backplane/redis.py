@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import re
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import unquote, urlsplit
+
+from .base import Backplane
+from ..serverConfig.topics import MANY, ONE, SEPARATOR, split_pattern
+
+logger = logging.getLogger("pysocket.backplane")
+
+_GLOB_SPECIAL = re.compile(r"[\\*?\[\]]")
+
+class RedisError(Exception):
+    pass
+
+def encode_command(*args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif isinstance(arg, int):
+            arg = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n" % len(arg))
+        parts.append(arg)
+        parts.append(b"\r\n")
+    return b"".join(parts)
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readuntil(b"\r\n")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest
+    if kind == b"-":
+        return RedisError(rest.decode("utf-8", "replace"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected reply type {kind!r}")
+
+class RedisBackplane(Backplane):
+    """Backplane over Redis pub/sub, speaking RESP directly.
+
+    Broadcasts use one shared channel and each room gets its own, which a
+    node subscribes to only while the room has local members. Topic
+    patterns become ``PSUBSCRIBE`` globs; a glob may match more rooms than
+    the pattern, and local delivery filters out the extra ones.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "pysocket", **kwargs):
+        super().__init__(**kwargs)
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.prefix = prefix
+        self.broadcast_channel = f"{prefix}:broadcast"
+        self._subscribed: Set[str] = {self.broadcast_channel}
+        self._globs: Dict[str, int] = {}
+        self._publisher: Optional[asyncio.StreamWriter] = None
+        self._subscriber: Optional[asyncio.StreamWriter] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def channel_for(self, room: Optional[str]) -> str:
+        if room is None or room == "broadcast":
+            return self.broadcast_channel
+        return f"{self.prefix}:room:{room}"
+
+    async def start(self, server) -> None:
+        await super().start(server)
+        self._tasks = [
+            asyncio.ensure_future(self._run_publisher()),
+            asyncio.ensure_future(self._run_subscriber()),
+        ]
+
+    async def close(self) -> None:
+        await super().close()
+        for task in self._tasks:
+            task.cancel()
+        for writer in (self._publisher, self._subscriber):
+            if writer:
+                writer.close()
+
+    def room_joined(self, room: str) -> None:
+        channel = self.channel_for(room)
+        if channel not in self._subscribed:
+            self._subscribed.add(channel)
+            if self._subscriber:
+                self._subscriber.write(encode_command("SUBSCRIBE", channel))
+
+    def room_left(self, room: str) -> None:
+        channel = self.channel_for(room)
+        if channel in self._subscribed:
+            self._subscribed.discard(channel)
+            if self._subscriber:
+                self._subscriber.write(encode_command("UNSUBSCRIBE", channel))
+
+    def glob_for(self, pattern: str) -> str:
+        segments = split_pattern(pattern)
+        many = segments[-1] == MANY
+        if many:
+            segments.pop()
+        glob = SEPARATOR.join(segment if segment == ONE else _GLOB_SPECIAL.sub(r"\\\g<0>", segment)
+                              for segment in segments)
+        if many:
+            # "a.#" also matches "a" itself
+            glob += "*"
+        return f"{self.prefix}:room:{glob}"
+
+    def pattern_subscribed(self, pattern: str) -> None:
+        glob = self.glob_for(pattern)
+        count = self._globs.get(glob, 0)
+        self._globs[glob] = count + 1
+        if not count and self._subscriber:
+            self._subscriber.write(encode_command("PSUBSCRIBE", glob))
+
+    def pattern_unsubscribed(self, pattern: str) -> None:
+        glob = self.glob_for(pattern)
+        count = self._globs.get(glob, 0)
+        if count > 1:
+            self._globs[glob] = count - 1
+        elif count:
+            del self._globs[glob]
+            if self._subscriber:
+                self._subscriber.write(encode_command("PUNSUBSCRIBE", glob))
+
+    def _send(self, channel: str, packet: bytes) -> None:
+        if self._publisher is None:
+            logger.warning(f"Redis publisher not connected, dropping packet for {channel}")
+            return
+        self._publisher.write(encode_command("PUBLISH", channel, packet))
+
+    async def _connect(self, select_db: bool):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            writer.write(encode_command("AUTH", self.password))
+            reply = await read_reply(reader)
+            if isinstance(reply, RedisError):
+                writer.close()
+                raise reply
+        if select_db and self.db:
+            writer.write(encode_command("SELECT", self.db))
+            await read_reply(reader)
+        return reader, writer
+
+    async def _run_publisher(self) -> None:
+        delay = 0.1
+        while True:
+            try:
+                reader, writer = await self._connect(select_db=True)
+            except (OSError, RedisError) as e:
+                logger.warning(f"Redis publisher connection to {self.host}:{self.port} failed: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                continue
+            delay = 0.1
+            self._publisher = writer
+            try:
+                while True:
+                    reply = await read_reply(reader)
+                    if isinstance(reply, RedisError):
+                        logger.error(f"Redis publish failed: {reply}")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning("Redis publisher connection lost, reconnecting")
+            finally:
+                self._publisher = None
+                writer.close()
+
+    async def _run_subscriber(self) -> None:
+        delay = 0.1
+        while True:
+            try:
+                reader, writer = await self._connect(select_db=False)
+            except (OSError, RedisError) as e:
+                logger.warning(f"Redis subscriber connection to {self.host}:{self.port} failed: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                continue
+            delay = 0.1
+            writer.write(encode_command("SUBSCRIBE", *self._subscribed))
+            if self._globs:
+                writer.write(encode_command("PSUBSCRIBE", *self._globs))
+            self._subscriber = writer
+            try:
+                while True:
+                    reply = await read_reply(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        self._receive(reply[2])
+                    elif isinstance(reply, list) and len(reply) == 4 and reply[0] == b"pmessage":
+                        # Also delivered as a plain message when the room channel is subscribed;
+                        # the backplane sequence check drops the copy.
+                        self._receive(reply[3])
+                    elif isinstance(reply, RedisError):
+                        logger.error(f"Redis subscriber error: {reply}")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning("Redis subscriber connection lost, reconnecting")
+            finally:
+                self._subscriber = None
+                writer.close()
@@ -0,0 +1,5 @@
+"""Benchmarks for pysocket.
+
+Each module exposes a ``run(...)`` function returning a JSON-serialisable
+dict and can be executed directly, e.g. ``python -m pysocket.bench.routing``.
+"""
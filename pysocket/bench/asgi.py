@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence
+
+from ..asgi.adapter import ASGIAdapter
+from ..connectionEngine import eventloop
+from .client import BenchClient
+from .harness import ASGIHarness
+from .swarm import HOST, _wait_listening, build_server
+from .util import free_port
+
+# "native" is PySocketServer.run; the others serve ASGIAdapter
+SERVERS = ("native", "harness", "uvicorn", "daphne")
+
+
+def create_app() -> ASGIAdapter:
+    logging.getLogger("pysocket").setLevel(logging.ERROR)
+    return ASGIAdapter(build_server())
+
+
+def __getattr__(name: str):
+    # ``pysocket.bench.asgi:app`` for the uvicorn and daphne command lines
+    if name == "app":
+        return create_app()
+    raise AttributeError(name)
+
+
+def available(server: str) -> bool:
+    return server in ("native", "harness") or importlib.util.find_spec(server) is not None
+
+
+def _command(server: str, port: int) -> List[str]:
+    if server == "uvicorn":
+        return [sys.executable, "-m", "uvicorn", "pysocket.bench.asgi:app", "--host", HOST, "--port", str(port),
+                "--log-level", "warning"]
+    if server == "daphne":
+        return [sys.executable, "-m", "daphne", "-b", HOST, "-p", str(port), "-v", "0", "pysocket.bench.asgi:app"]
+    return [sys.executable, "-m", "pysocket.bench.asgi", "--serve", server, str(port)]
+
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def _serve(server: str, port: int) -> None:
+    if server == "harness":
+        await ASGIHarness(create_app()).start(HOST, port)
+        await asyncio.Event().wait()
+    else:
+        await build_server().run(HOST, port)
+
+
+async def _echo(clients: Sequence[BenchClient], messages: int, window: int) -> int:
+    async def one(client: BenchClient) -> int:
+        received = 0
+        while received < messages:
+            burst = min(window, messages - received)
+            for i in range(burst):
+                client.send("echo", i)
+            received += await client.drain(burst)
+        return received
+    return sum(await asyncio.gather(*[one(client) for client in clients]))
+
+
+async def _broadcast(clients: Sequence[BenchClient], broadcasts: int) -> int:
+    for client in clients:
+        client.send("join", "bench")
+    await asyncio.gather(*[client.drain(1) for client in clients])
+    sender = clients[0]
+    for seq in range(broadcasts):
+        sender.send("broadcast", {"room": "bench", "seq": seq})
+    return sum(await asyncio.gather(*[client.drain(broadcasts) for client in clients]))
+
+
+async def _measure(server: str, connections: int, messages: int, window: int, broadcasts: int) -> Dict:
+    port = free_port(HOST)
+    child = await asyncio.create_subprocess_exec(*_command(server, port))
+    clients: List[BenchClient] = []
+    try:
+        await _wait_listening(port, timeout=30)
+        for _ in range(connections):
+            client = BenchClient()
+            await client.connect(HOST, port)
+            clients.append(client)
+        cpu = _cpu_seconds(child.pid)
+        started = time.perf_counter()
+        echoed = await _echo(clients, messages, window)
+        echo_elapsed = time.perf_counter() - started
+        echo_cpu = _cpu_seconds(child.pid)
+        started = time.perf_counter()
+        delivered = await _broadcast(clients, broadcasts)
+        broadcast_elapsed = time.perf_counter() - started
+    finally:
+        await asyncio.gather(*[client.close() for client in clients])
+        child.terminate()
+        await child.wait()
+    result = {
+        "server": server,
+        "echo_per_sec": round(echoed / echo_elapsed),
+        "deliveries_per_sec": round(delivered / broadcast_elapsed),
+    }
+    if cpu is not None and echo_cpu is not None and echo_cpu > cpu:
+        result["echo_per_server_cpu_sec"] = round(echoed / (echo_cpu - cpu))
+    return result
+
+
+def run(servers: Sequence[str] = SERVERS, connections: int = 50, messages: int = 2000, window: int = 100,
+        broadcasts: int = 500) -> Dict:
+    results = []
+    for server in servers:
+        if not available(server):
+            results.append({"server": server, "skipped": "not installed"})
+            continue
+        results.append(asyncio.run(_measure(server, connections, messages, window, broadcasts)))
+    return {"benchmark": "asgi", "connections": connections, "window": window, "results": results}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="ASGIAdapter under ASGI servers against the native server")
+    parser.add_argument("--server", choices=SERVERS, action="append",
+                        help="run only this server (repeatable); default runs every installed one")
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=2000, help="echo round trips per connection")
+    parser.add_argument("--window", type=int, default=100, help="messages in flight per connection")
+    parser.add_argument("--broadcasts", type=int, default=500, help="emits to a room holding every connection")
+    parser.add_argument("--serve", nargs=2, metavar=("SERVER", "PORT"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    logging.getLogger("pysocket").setLevel(logging.ERROR)
+    if args.serve:
+        eventloop.run(_serve(args.serve[0], int(args.serve[1])))
+        return
+    print(json.dumps(run(args.server or SERVERS, args.connections, args.messages, args.window, args.broadcasts),
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Callable, Dict, Optional
+
+from ..backplane import MemoryBackplane, MemoryHub, RedisBackplane
+from ..serverConfig.socketServer import PySocketServer
+from .respserver import RespStandIn
+from .util import SinkConnection, percentiles
+
+
+async def _measure(make_backplane: Callable, nodes: int, members: int, messages: int, samples: int) -> Dict:
+    cluster = []
+    for _ in range(nodes):
+        server = PySocketServer(backplane=make_backplane())
+        await server.start()
+        sinks = [SinkConnection() for _ in range(members)]
+        for sink in sinks:
+            server.join_room(sink, "bench")
+        cluster.append((server, sinks))
+    # Give subscriptions time to reach the broker before publishing.
+    await asyncio.sleep(0.2)
+    origin = cluster[0][0]
+    remote = [sink for _, sinks in cluster[1:] for sink in sinks]
+
+    waiters = [sink.expect(messages).wait() for sink in remote]
+    start = time.perf_counter()
+    for i in range(messages):
+        await origin.emit("tick", i, room="bench")
+    await asyncio.wait_for(asyncio.gather(*waiters), 60)
+    elapsed = time.perf_counter() - start
+
+    probe = remote[-1]
+    latencies = []
+    for _ in range(samples):
+        done = probe.expect(1)
+        sent = time.perf_counter()
+        await origin.emit("probe", None, room="bench")
+        await done.wait()
+        latencies.append((time.perf_counter() - sent) * 1e6)
+
+    for server, _ in cluster:
+        await server.backplane.close()
+    return {
+        "nodes": nodes,
+        "members_per_node": members,
+        "messages": messages,
+        "remote_deliveries_per_sec": round(messages * len(remote) / elapsed),
+        "messages_per_sec": round(messages / elapsed),
+        "latency_us": {k: round(v, 1) for k, v in percentiles(latencies).items()},
+    }
+
+
+async def _run(nodes: int, members: int, messages: int, samples: int, redis_url: Optional[str]) -> Dict:
+    hub = MemoryHub()
+    results = {"memory": await _measure(lambda: MemoryBackplane(hub), nodes, members, messages, samples)}
+    standin = None
+    if redis_url is None:
+        standin = await RespStandIn().start()
+        redis_url = standin.url
+    results["redis"] = await _measure(lambda: RedisBackplane(redis_url), nodes, members, messages, samples)
+    results["redis"]["server"] = "stand-in" if standin else redis_url
+    if standin:
+        await standin.close()
+    return results
+
+
+def run(nodes: int = 4, members: int = 250, messages: int = 2000, samples: int = 200,
+        redis_url: Optional[str] = None) -> Dict:
+    results = asyncio.run(_run(nodes, members, messages, samples, redis_url))
+    return {"benchmark": "backplane", "results": results}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Cross-node fan-out through a backplane")
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--members", type=int, default=250)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--redis-url", default=None, help="use a real Redis instead of the stand-in")
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.nodes, args.members, args.messages, args.samples, args.redis_url), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Sequence
+
+from ..serverConfig.socketServer import PySocketServer
+from .util import SinkConnection
+
+
+class _LoopThread:
+    """A started server on an event loop in a background thread, like the one Django views talk to."""
+
+    def __init__(self, members: int):
+        self.server = PySocketServer()
+        self.sinks = [SinkConnection() for _ in range(members)]
+        for sink in self.sinks:
+            self.server.join_room(sink, "room")
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self) -> "_LoopThread":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def delivered(self) -> int:
+        return self.sinks[0].received if self.sinks else 0
+
+
+def _bridged(runner: _LoopThread) -> Callable[[int], None]:
+    emit = runner.server.emit_threadsafe
+    return lambda seq: emit("tick", seq, room="room")
+
+
+def _per_call_loop(runner: _LoopThread) -> Callable[[int], None]:
+    # What async_to_sync(server.emit) amounts to: one scheduled coroutine and a wait per call
+    server, loop = runner.server, runner.loop
+    return lambda seq: asyncio.run_coroutine_threadsafe(server.emit("tick", seq, room="room"), loop).result()
+
+
+def _measure(method: str, threads: int, calls: int, members: int) -> Dict:
+    with _LoopThread(members) as runner:
+        call = (_bridged if method == "bridge" else _per_call_loop)(runner)
+        barrier = threading.Barrier(threads + 1)
+
+        def produce() -> None:
+            barrier.wait()
+            for seq in range(calls):
+                call(seq)
+
+        workers = [threading.Thread(target=produce) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        returned = time.perf_counter() - started
+        expected = threads * calls
+        while runner.delivered() < expected:
+            time.sleep(0.001)
+        delivered = time.perf_counter() - started
+    return {
+        "method": method,
+        "threads": threads,
+        "calls_per_sec": round(expected / returned),
+        "call_us": round(returned / calls * 1e6, 3),
+        "delivered_per_sec": round(expected / delivered),
+    }
+
+
+def run(threads: Sequence[int] = (1, 2, 4, 8), calls: int = 20000, members: int = 1) -> Dict:
+    results: List[Dict] = []
+    for count in threads:
+        for method in ("per_call", "bridge"):
+            results.append(_measure(method, count, calls, members))
+    return {"benchmark": "bridge", "calls_per_thread": calls, "room_members": members, "results": results}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Emits per second from N threads into the server loop")
+    parser.add_argument("--threads", default="1,2,4,8")
+    parser.add_argument("--calls", type=int, default=20000, help="emits per thread")
+    parser.add_argument("--members", type=int, default=1, help="connections in the target room")
+    args = parser.parse_args(argv)
+    counts = [int(count) for count in args.threads.split(",")]
+    print(json.dumps(run(counts, args.calls, args.members), indent=2))
+
+
+if __name__ == "__main__":
+    main()
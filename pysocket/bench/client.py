@@ -0,0 +1,80 @@
+import asyncio
+import base64
+import json
+import os
+from collections import deque
+from typing import Any, Optional
+
+from ..connectionEngine.frames import (
+    FrameDecoder, encode_close, encode_frame, OP_CLOSE, OP_PING, OP_PONG, OP_TEXT,
+)
+
+
+class BenchClient:
+    """Minimal JSON WebSocket client used by the load generators."""
+
+    def __init__(self):
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._decoder = FrameDecoder(require_mask=False)
+        self._frames = deque()
+
+    async def connect(self, host: str, port: int, path: str = "/") -> None:
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.writer.write((
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n"
+            "\r\n"
+        ).encode("latin-1"))
+        response = await self.reader.readuntil(b"\r\n\r\n")
+        if not response.startswith(b"HTTP/1.1 101"):
+            status = response.split(b"\r\n", 1)[0]
+            raise ConnectionError(f"Handshake rejected: {status!r}")
+
+    def send(self, event: str, data: Any = None) -> None:
+        payload = json.dumps({"event": event, "data": data}).encode("utf-8")
+        self.writer.write(encode_frame(OP_TEXT, payload, mask=os.urandom(4)))
+
+    async def _next_frame(self) -> Optional[bytes]:
+        while True:
+            while self._frames:
+                opcode, payload = self._frames.popleft()
+                if opcode == OP_PING:
+                    self.writer.write(encode_frame(OP_PONG, payload, mask=os.urandom(4)))
+                elif opcode == OP_CLOSE:
+                    return None
+                elif opcode != OP_PONG:
+                    return payload
+            data = await self.reader.read(65536)
+            if not data:
+                return None
+            self._frames.extend(self._decoder.feed(data))
+
+    async def recv(self) -> Any:
+        payload = await self._next_frame()
+        return None if payload is None else json.loads(payload)
+
+    async def drain(self, count: int) -> int:
+        """Read until ``count`` events arrived, without decoding single envelopes."""
+        received = 0
+        while received < count:
+            payload = await self._next_frame()
+            if payload is None:
+                break
+            received += len(json.loads(payload)["batch"]) if payload.startswith(b'{"batch"') else 1
+        return received
+
+    async def close(self) -> None:
+        if self.writer is None:
+            return
+        try:
+            self.writer.write(encode_close(mask=os.urandom(4)))
+            self.writer.close()
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
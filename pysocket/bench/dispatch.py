@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from ..serverConfig.consumer import WebSocketConsumer
+from ..serverConfig.schema import Schema
+from ..serverConfig.socketServer import PySocketServer
+from ..settings import settings
+from .util import SinkConnection
+
+
+class Position(Schema):
+    x: float
+    y: float
+
+
+class Move(Schema):
+    room: str
+    to: Position
+    speed: Optional[float] = None
+
+
+async def _noop(self, data: Any) -> None:
+    return None
+
+
+async def _move_by_hand(self, data: Any) -> Optional[str]:
+    # What handlers wrote before schemas, as in runserver.py
+    if not isinstance(data, dict):
+        await self.server.emit("error", {"message": "Invalid move"}, to=self.connection)
+        return None
+    room = data.get("room")
+    to = data.get("to")
+    if not isinstance(room, str) or not isinstance(to, dict):
+        await self.server.emit("error", {"message": "Invalid move"}, to=self.connection)
+        return None
+    x, y = to.get("x"), to.get("y")
+    if not isinstance(x, (int, float)) or not isinstance(y, (int, float)):
+        await self.server.emit("error", {"message": "Invalid move"}, to=self.connection)
+        return None
+    return room
+
+
+async def _move_typed(self, data: Move) -> str:
+    return data.room
+
+
+def _consumer_class(handlers: int) -> type:
+    namespace = {f"handle_event{i}": _noop for i in range(handlers)}
+    namespace["handle_manual"] = _move_by_hand
+    namespace["handle_typed"] = _move_typed
+    return type("BenchConsumer", (WebSocketConsumer,), namespace)
+
+
+async def _getattr_dispatch(consumer: WebSocketConsumer, event: str, data: Any) -> Any:
+    # WebSocketConsumer.handle_event before dispatch tables, less the unknown-event branch
+    handler = getattr(consumer, f"handle_{event}", None)
+    if handler:
+        consumer.logger.debug("Handling event %s with data %r", event, data)
+        if not settings.METRICS:
+            return await handler(data)
+
+
+async def _time_per_call(dispatch, consumer, event: str, data: Any, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await dispatch(consumer, event, data)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+async def _run(handlers: int, calls: int) -> List[Dict]:
+    server = PySocketServer()
+    consumer = _consumer_class(handlers)(SinkConnection(), server)
+    table = type(consumer).handle_event
+    move = {"room": "lobby", "to": {"x": 3, "y": 4.5}}
+    malformed = {"room": "lobby", "to": {"x": "3"}}
+    event = f"event{handlers // 2}"
+    return [
+        {"case": "lookup", "method": "getattr",
+         "us": round(await _time_per_call(_getattr_dispatch, consumer, event, None, calls), 3)},
+        {"case": "lookup", "method": "table",
+         "us": round(await _time_per_call(table, consumer, event, None, calls), 3)},
+        {"case": "valid", "method": "by_hand",
+         "us": round(await _time_per_call(table, consumer, "manual", move, calls), 3)},
+        {"case": "valid", "method": "schema",
+         "us": round(await _time_per_call(table, consumer, "typed", move, calls), 3)},
+        {"case": "malformed", "method": "by_hand",
+         "us": round(await _time_per_call(table, consumer, "manual", malformed, calls), 3)},
+        {"case": "malformed", "method": "schema",
+         "us": round(await _time_per_call(table, consumer, "typed", malformed, calls), 3)},
+    ]
+
+
+def run(handlers: int = 32, calls: int = 100000) -> Dict:
+    results = asyncio.run(_run(handlers, calls))
+    return {"benchmark": "dispatch", "handlers": handlers, "calls": calls, "results": results}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Per-message consumer dispatch and payload validation cost")
+    parser.add_argument("--handlers", type=int, default=32, help="handle_* methods on the consumer")
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.handlers, args.calls), indent=2))
+
+
+if __name__ == "__main__":
+    main()
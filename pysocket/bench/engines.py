@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Dict, List
+
+from ..connectionEngine import eventloop
+from ..settings import settings
+from .client import BenchClient
+from .swarm import HOST, build_server
+from .util import free_port
+
+
+async def _drive(port: int, connections: int, messages: int, window: int) -> None:
+    # Runs in a child process so the server's CPU time is measured alone.
+    clients = []
+    for _ in range(connections):
+        client = BenchClient()
+        await client.connect(HOST, port)
+        clients.append(client)
+
+    async def echo(client: BenchClient) -> int:
+        received = 0
+        while received < messages:
+            burst = min(window, messages - received)
+            for i in range(burst):
+                client.send("echo", i)
+            received += await client.drain(burst)
+        return received
+
+    started = time.perf_counter()
+    received = await asyncio.gather(*[echo(client) for client in clients])
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*[client.close() for client in clients])
+    print(json.dumps({"received": sum(received), "elapsed": elapsed}), flush=True)
+
+
+async def _measure(engine: str, connections: int, messages: int, window: int) -> Dict:
+    previous, settings.ENGINE = settings.ENGINE, engine
+    server = build_server()
+    port = free_port(HOST)
+    serving = asyncio.ensure_future(server.run(HOST, port))
+    await asyncio.sleep(0.1)
+    cpu = time.process_time()
+    child = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "pysocket.bench.engines", "--drive", str(port), str(connections),
+        str(messages), str(window), stdout=asyncio.subprocess.PIPE)
+    try:
+        report = json.loads(await asyncio.wait_for(child.stdout.readline(), 300))
+        cpu = time.process_time() - cpu
+        await child.wait()
+    finally:
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+        settings.ENGINE = previous
+    return {
+        "engine": engine,
+        "loop": type(asyncio.get_running_loop()).__module__.split(".")[0],
+        "messages": report["received"],
+        "messages_per_sec": round(report["received"] / report["elapsed"]),
+        "messages_per_cpu_sec": round(report["received"] / cpu) if cpu else None,
+    }
+
+
+def run(connections: int = 50, messages: int = 2000, window: int = 100) -> Dict:
+    runners = [asyncio.run]
+    if eventloop.uvloop is not None:
+        runners.append(eventloop.run)
+    results: List[Dict] = []
+    for runner in runners:
+        for engine in ("streams", "protocol"):
+            results.append(runner(_measure(engine, connections, messages, window)))
+    return {"benchmark": "engines", "connections": connections, "window": window, "results": results}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Echo messages/sec per server core for each transport engine")
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=2000, help="echo round trips per connection")
+    parser.add_argument("--window", type=int, default=100, help="messages in flight per connection")
+    parser.add_argument("--drive", nargs=4, type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.drive:
+        asyncio.run(_drive(*args.drive))
+        return
+    logging.getLogger("pysocket").setLevel(logging.ERROR)
+    print(json.dumps(run(args.connections, args.messages, args.window), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from ..connectionEngine.connection import WebSocketConnection
+
+
+class ASGIHarness:
+    """Serves an ASGI WebSocket application on a local TCP port.
+
+    The handshake and framing reuse the raw connection engine, so comparing
+    the harness with ``PySocketServer.run`` isolates the cost of the ASGI
+    event translation and ``ASGIAdapter``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "ASGIHarness":
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            connection = WebSocketConnection(reader, writer)
+            if not await connection.handshake():
+                return
+            protocols = connection.headers.get("sec-websocket-protocol", "")
+            scope = {
+                "type": "websocket",
+                "path": connection.path.split("?", 1)[0],
+                "query_string": connection.path.partition("?")[2].encode("latin-1"),
+                "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in connection.headers.items()],
+                "subprotocols": [p.strip() for p in protocols.split(",") if p.strip()],
+            }
+            connected = False
+
+            async def receive() -> Dict[str, Any]:
+                nonlocal connected
+                if not connected:
+                    connected = True
+                    return {"type": "websocket.connect"}
+                message = await connection.receive()
+                if message is None:
+                    return {"type": "websocket.disconnect", "code": 1000}
+                if isinstance(message, str):
+                    return {"type": "websocket.receive", "text": message}
+                return {"type": "websocket.receive", "bytes": message}
+
+            async def send(message: Dict[str, Any]) -> None:
+                kind = message["type"]
+                if kind == "websocket.send":
+                    text = message.get("text")
+                    if text is not None:
+                        connection.send_frame(connection.encode_frame(text))
+                    else:
+                        connection.send_frame(connection.encode_frame(message["bytes"], True))
+                elif kind == "websocket.close":
+                    await connection.close(message.get("code", 1000))
+
+            await self.app(scope, receive, send)
+            await connection.close()
+        finally:
+            self._tasks.discard(task)
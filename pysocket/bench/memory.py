@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from typing import Dict, Optional
+
+from ..asgi.adapter import ASGIConnectionWrapper
+from ..connectionEngine.connection import WebSocketConnection
+from ..serverConfig.socketServer import PySocketServer
+from .client import BenchClient
+from .util import free_port
+
+HOST = "127.0.0.1"
+
+
+def _rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    import resource
+    return pages * resource.getpagesize()
+
+
+def _object_bytes(factory, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = [factory() for _ in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+async def _hold_clients(port: int, count: int) -> None:
+    # Runs in the child process so client memory is not counted.
+    clients = []
+    for _ in range(count):
+        client = BenchClient()
+        await client.connect(HOST, port)
+        clients.append(client)
+    print("ready", flush=True)
+    await asyncio.get_running_loop().run_in_executor(None, sys.stdin.read)
+    await asyncio.gather(*[client.close() for client in clients])
+
+
+async def _idle_connection_bytes(count: int) -> Dict:
+    server = PySocketServer()
+    port = free_port(HOST)
+    serving = asyncio.ensure_future(server.run(HOST, port))
+    await asyncio.sleep(0.1)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rss_before = _rss()
+    child = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "pysocket.bench.memory", "--hold", str(port), str(count),
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+    try:
+        if await asyncio.wait_for(child.stdout.readline(), 120) != b"ready\n":
+            raise RuntimeError("Client process failed to connect")
+        deadline = time.monotonic() + 10
+        while len(server.clients) < count and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        rss_after = _rss()
+        held = len(server.clients)
+    finally:
+        tracemalloc.stop()
+        child.stdin.close()
+        await child.wait()
+        deadline = time.monotonic() + 10
+        while server.clients and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+    result = {"connections": held,
+              "traced_bytes_per_connection": round((after - before) / count)}
+    if rss_before is not None:
+        result["rss_bytes_per_connection"] = round((rss_after - rss_before) / count)
+    return result
+
+
+async def _connection_object_bytes(count: int) -> Dict[str, int]:
+    # StreamReader binds to the running loop, so it is made inside one.
+    reader = asyncio.StreamReader()
+    scope = {"type": "websocket", "path": "/"}
+    return {
+        "WebSocketConnection": round(_object_bytes(lambda: WebSocketConnection(reader), count)),
+        "ASGIConnectionWrapper": round(_object_bytes(lambda: ASGIConnectionWrapper(scope, None, None), count)),
+    }
+
+
+def run(connections: int = 2000, objects: int = 10000) -> Dict:
+    return {
+        "benchmark": "memory",
+        "idle_raw_connection": asyncio.run(_idle_connection_bytes(connections)),
+        "object_bytes": asyncio.run(_connection_object_bytes(objects)),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Memory held per idle connection")
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--objects", type=int, default=10000)
+    parser.add_argument("--hold", nargs=2, type=int, metavar=("PORT", "COUNT"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.hold:
+        asyncio.run(_hold_clients(*args.hold))
+        return
+    logging.getLogger("pysocket").setLevel(logging.ERROR)
+    print(json.dumps(run(args.connections, args.objects), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import asyncio
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from ..backplane.redis import encode_command
+
+
+class RespStandIn:
+    """Minimal in-process RESP server implementing Redis pub/sub.
+
+    Supports PING, AUTH, SELECT, PUBLISH, SUBSCRIBE and UNSUBSCRIBE, which is
+    all :class:`~pysocket.backplane.redis.RedisBackplane` uses.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.channels: Dict[bytes, Set[asyncio.StreamWriter]] = defaultdict(set)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self) -> "RespStandIn":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            handlers = list(self._clients.values())
+            for writer in list(self._clients):
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+
+    async def _read_command(self, reader: asyncio.StreamReader):
+        line = await reader.readuntil(b"\r\n")
+        if not line.startswith(b"*"):
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            header = await reader.readuntil(b"\r\n")
+            length = int(header[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        subscribed: Set[bytes] = set()
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if not args:
+                    continue
+                name = args[0].upper()
+                if name == b"PUBLISH":
+                    receivers = self.channels.get(args[1], ())
+                    message = encode_command("message", args[1], args[2])
+                    for receiver in receivers:
+                        receiver.write(message)
+                    writer.write(b":%d\r\n" % len(receivers))
+                elif name in (b"SUBSCRIBE", b"UNSUBSCRIBE"):
+                    for channel in args[1:]:
+                        if name == b"SUBSCRIBE":
+                            subscribed.add(channel)
+                            self.channels[channel].add(writer)
+                        else:
+                            subscribed.discard(channel)
+                            self.channels[channel].discard(writer)
+                        kind = name.lower()
+                        writer.write(b"*3\r\n$%d\r\n%s\r\n$%d\r\n%s\r\n:%d\r\n"
+                                     % (len(kind), kind, len(channel), channel, len(subscribed)))
+                elif name == b"PING":
+                    writer.write(b"+PONG\r\n")
+                elif name in (b"AUTH", b"SELECT"):
+                    writer.write(b"+OK\r\n")
+                elif name == b"QUIT":
+                    writer.write(b"+OK\r\n")
+                    break
+                else:
+                    writer.write(b"-ERR unknown command '%s'\r\n" % args[0])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.pop(writer, None)
+            for channel in subscribed:
+                self.channels[channel].discard(writer)
+            writer.close()
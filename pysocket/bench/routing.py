@@ -0,0 +1,59 @@
+import json
+import time
+from typing import Dict, List
+
+from ..routing.router import WebSocketRouter
+
+
+def _consumer():
+    pass
+
+
+def _build_router(size: int, cache_size: int) -> WebSocketRouter:
+    router = WebSocketRouter(cache_size=cache_size)
+    for i in range(size):
+        router.add_route(rf"^ws/app{i}/(?P<room>\w+)/$", _consumer)
+    return router
+
+
+def _linear_resolve(router: WebSocketRouter, path: str):
+    normalized_path = path.lstrip('/')
+    for pattern, callback in router.routes:
+        match = pattern.match(normalized_path)
+        if match:
+            return callback
+    return None
+
+
+def _time_per_call(func, paths: List[str], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for path in paths:
+            func(path)
+    return (time.perf_counter() - start) / (rounds * len(paths)) * 1e6
+
+
+def run(sizes=(10, 100, 500, 1000), lookups: int = 2000, rounds: int = 3) -> Dict:
+    results = []
+    for size in sizes:
+        # Unique paths defeat the LRU cache and measure the prefix index itself.
+        uncached = _build_router(size, cache_size=0)
+        paths = [f"/ws/app{(i * 7919) % size}/room{i}/" for i in range(lookups)]
+        cached = _build_router(size, cache_size=lookups)
+        for path in paths:
+            cached.match(path)
+        results.append({
+            "routes": size,
+            "linear_us": round(_time_per_call(lambda p: _linear_resolve(uncached, p), paths, rounds), 3),
+            "indexed_us": round(_time_per_call(uncached.match, paths, rounds), 3),
+            "cached_us": round(_time_per_call(cached.match, paths, rounds), 3),
+        })
+    return {"benchmark": "routing", "lookups": lookups, "results": results}
+
+
+def main(argv=None) -> None:
+    print(json.dumps(run(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional, Sequence
+
+from ..asgi.adapter import ASGIAdapter
+from ..serverConfig.socketServer import PySocketServer
+from .client import BenchClient
+from .harness import ASGIHarness
+from .util import free_port, percentiles
+
+HOST = "127.0.0.1"
+
+
+def build_server() -> PySocketServer:
+    server = PySocketServer()
+
+    @server.on("echo")
+    async def echo(ws, data):
+        await server.emit("echo", data, to=ws)
+
+    @server.on("join")
+    async def join(ws, room):
+        server.join_room(ws, room)
+        await server.emit("joined", room, to=ws)
+
+    @server.on("leave")
+    async def leave(ws, room):
+        server.leave_room(ws, room)
+        await server.emit("left", room, to=ws)
+
+    @server.on("broadcast")
+    async def broadcast(ws, data):
+        await server.emit("tick", data["seq"], room=data["room"])
+
+    return server
+
+
+async def _wait_listening(port: int, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        client = BenchClient()
+        try:
+            await client.connect(HOST, port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.01)
+            continue
+        await client.close()
+        return
+
+
+async def _connect(port: int, count: int, concurrency: int) -> Dict:
+    gate = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one() -> BenchClient:
+        async with gate:
+            client = BenchClient()
+            started = time.perf_counter()
+            await client.connect(HOST, port)
+            latencies.append((time.perf_counter() - started) * 1e3)
+            return client
+
+    started = time.perf_counter()
+    clients = await asyncio.gather(*[one() for _ in range(count)])
+    elapsed = time.perf_counter() - started
+    return {
+        "clients": clients,
+        "handshakes_per_sec": round(count / elapsed),
+        "handshake_ms": {k: round(v, 3) for k, v in percentiles(latencies).items()},
+    }
+
+
+async def _round_trips(clients: Sequence[BenchClient], samples: int) -> Dict:
+    latencies: List[float] = []
+    per_client = max(1, samples // len(clients))
+
+    async def probe(client: BenchClient) -> None:
+        for i in range(per_client):
+            started = time.perf_counter()
+            client.send("echo", i)
+            await client.recv()
+            latencies.append((time.perf_counter() - started) * 1e6)
+
+    await asyncio.gather(*[probe(client) for client in clients])
+    return {
+        "clients": len(clients),
+        "samples": len(latencies),
+        "rtt_us": {k: round(v, 1) for k, v in percentiles(latencies).items()},
+    }
+
+
+async def _broadcast(clients: Sequence[BenchClient], size: int, messages: int) -> Dict:
+    room = f"room{size}"
+    members = clients[:size]
+    for member in members:
+        member.send("join", room)
+    await asyncio.gather(*[member.recv() for member in members])
+
+    sender = members[0]
+    started = time.perf_counter()
+    for seq in range(messages):
+        sender.send("broadcast", {"room": room, "seq": seq})
+    delivered = await asyncio.wait_for(asyncio.gather(*[member.drain(messages) for member in members]), 120)
+    elapsed = time.perf_counter() - started
+
+    for member in members:
+        member.send("leave", room)
+    await asyncio.gather(*[member.recv() for member in members])
+    return {
+        "room_size": size,
+        "messages": messages,
+        "delivered": sum(delivered),
+        "deliveries_per_sec": round(sum(delivered) / elapsed),
+        "elapsed_s": round(elapsed, 4),
+    }
+
+
+async def _drive(port: int, server: PySocketServer, connections: int, concurrency: int,
+                 samples: int, rtt_clients: int, room_sizes: Sequence[int], messages: int) -> Dict:
+    await _wait_listening(port)
+    opened = await _connect(port, connections, concurrency)
+    clients = opened.pop("clients")
+    try:
+        result = dict(opened)
+        result["round_trip"] = await _round_trips(clients[:rtt_clients], samples)
+        result["broadcast"] = [await _broadcast(clients, size, messages)
+                               for size in room_sizes if size <= len(clients)]
+        return result
+    finally:
+        await asyncio.gather(*[client.close() for client in clients])
+        # Let the server finish its disconnect handling before it is torn down.
+        deadline = time.monotonic() + 5.0
+        while server.clients and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+
+
+async def _run_raw(**options) -> Dict:
+    server = build_server()
+    port = free_port(HOST)
+    serving = asyncio.ensure_future(server.run(HOST, port))
+    try:
+        return await _drive(port, server, **options)
+    finally:
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+
+
+async def _run_asgi(**options) -> Dict:
+    server = build_server()
+    harness = await ASGIHarness(ASGIAdapter(server)).start(HOST)
+    try:
+        return await _drive(harness.port, server, **options)
+    finally:
+        await harness.close()
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(targets: Sequence[str] = ("raw", "asgi"), connections: int = 256, concurrency: int = 64,
+        samples: int = 5000, rtt_clients: int = 16, room_sizes: Sequence[int] = (1, 16, 64, 256),
+        messages: int = 500) -> Dict:
+    runners = {"raw": _run_raw, "asgi": _run_asgi}
+    options = dict(connections=connections, concurrency=concurrency, samples=samples,
+                   rtt_clients=rtt_clients, room_sizes=room_sizes, messages=messages)
+    results = {target: asyncio.run(runners[target](**options)) for target in targets}
+    return {
+        "benchmark": "swarm",
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "connections": connections,
+        "results": results,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Client swarm against the raw server and the ASGI adapter")
+    parser.add_argument("--target", choices=("raw", "asgi"), action="append",
+                        help="run only this target (repeatable); default runs both")
+    parser.add_argument("--connections", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=64, help="handshakes in flight at once")
+    parser.add_argument("--samples", type=int, default=5000, help="round trips to time")
+    parser.add_argument("--rtt-clients", type=int, default=16)
+    parser.add_argument("--room-sizes", default="1,16,64,256")
+    parser.add_argument("--messages", type=int, default=500, help="broadcasts per room size")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args(argv)
+    logging.getLogger("pysocket").setLevel(logging.ERROR)
+    result = run(
+        targets=args.target or ("raw", "asgi"),
+        connections=args.connections,
+        concurrency=args.concurrency,
+        samples=args.samples,
+        rtt_clients=args.rtt_clients,
+        room_sizes=[int(size) for size in args.room_sizes.split(",")],
+        messages=args.messages,
+    )
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
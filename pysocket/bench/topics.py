@@ -0,0 +1,113 @@
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+from ..serverConfig.topics import TopicTrie, split_pattern
+
+REGIONS = 16
+SITES = 64
+DEVICES = 128
+
+
+def _topic(rng: random.Random) -> str:
+    return f"sensors.r{rng.randrange(REGIONS)}.s{rng.randrange(SITES)}.d{rng.randrange(DEVICES)}"
+
+
+def _pattern(rng: random.Random) -> str:
+    # Mostly single devices, then whole sites, regions and one site across regions
+    roll = rng.random()
+    region, site = rng.randrange(REGIONS), rng.randrange(SITES)
+    if roll < 0.6:
+        return f"sensors.r{region}.s{site}.d{rng.randrange(DEVICES)}"
+    if roll < 0.9:
+        return f"sensors.r{region}.s{site}.*"
+    if roll < 0.99:
+        return f"sensors.r{region}.#"
+    return f"sensors.*.s{site}.*"
+
+
+def _matches(pattern: List[str], topic: List[str]) -> bool:
+    if pattern[-1] == "#":
+        pattern = pattern[:-1]
+        if len(topic) < len(pattern):
+            return False
+    elif len(topic) != len(pattern):
+        return False
+    return all(want == "*" or want == have for want, have in zip(pattern, topic))
+
+
+def _build(subscriptions: int, per_connection: int, rng: random.Random) -> Tuple[TopicTrie, Dict, List[str]]:
+    trie = TopicTrie(cache_size=4096)
+    patterns = set()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    for i in range(subscriptions):
+        pattern = _pattern(rng)
+        patterns.add(pattern)
+        trie.subscribe(i // per_connection, pattern)
+    elapsed = time.perf_counter() - started
+    traced = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    stats = {
+        "subscriptions": len(trie),
+        "distinct_patterns": len(patterns),
+        "subscribe_us": round(elapsed / subscriptions * 1e6, 3),
+        "bytes_per_subscription": round(traced / subscriptions),
+    }
+    return trie, stats, sorted(patterns)
+
+
+def _time_per_call(func, topics: List[str]) -> float:
+    started = time.perf_counter()
+    for topic in topics:
+        func(topic)
+    return (time.perf_counter() - started) / len(topics) * 1e6
+
+
+def run(subscriptions: int = 1_000_000, per_connection: int = 10, lookups: int = 20000, scans: int = 20,
+        seed: int = 0) -> Dict:
+    rng = random.Random(seed)
+    trie, result, patterns = _build(subscriptions, per_connection, rng)
+    topics = [_topic(rng) for _ in range(lookups)]
+    hot = topics[:1000]
+    compiled = [split_pattern(pattern) for pattern in patterns]
+
+    def scan(topic: str) -> int:
+        segments = topic.split(".")
+        return sum(1 for pattern in compiled if _matches(pattern, segments))
+
+    # Distinct topics beyond the cache size measure the trie walk itself.
+    result["scan_us"] = round(_time_per_call(scan, topics[:scans]), 3)
+    result["trie_us"] = round(_time_per_call(trie.match, topics), 3)
+    for topic in hot:
+        trie.match(topic)
+    result["cached_us"] = round(_time_per_call(trie.match, hot * 10), 3)
+    result["resolve_us"] = round(_time_per_call(trie.subscribers, hot * 10), 3)
+    result["mean_recipients"] = round(sum(len(trie.subscribers(topic)) for topic in hot) / len(hot), 1)
+    churn = [(subscriptions // per_connection + i, _pattern(rng)) for i in range(lookups)]
+    started = time.perf_counter()
+    for connection, pattern in churn:
+        trie.subscribe(connection, pattern)
+        trie.match(_topic(rng))
+        trie.unsubscribe(connection, pattern)
+    result["churn_us"] = round((time.perf_counter() - started) / len(churn) * 1e6, 3)
+    return {"benchmark": "topics", "results": [result]}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Topic trie matching against a linear scan of patterns")
+    parser.add_argument("--subscriptions", type=int, default=1_000_000)
+    parser.add_argument("--per-connection", type=int, default=10, help="subscriptions held by each connection")
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.subscriptions, args.per_connection, args.lookups), indent=2))
+
+
+if __name__ == "__main__":
+    main()
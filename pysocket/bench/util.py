@@ -0,0 +1,46 @@
+import asyncio
+import socket
+from typing import Dict, List, Optional, Sequence
+
+from ..connectionEngine.connection import WebSocketConnection
+
+
+class SinkConnection(WebSocketConnection):
+    """Connection without a transport that counts the frames queued to it."""
+
+    def __init__(self, expected: int = 0, codec=None):
+        super().__init__()
+        if codec is not None:
+            self.codec = codec
+        self.received = 0
+        self.expected = expected
+        self.done: Optional[asyncio.Event] = None
+
+    def expect(self, count: int) -> asyncio.Event:
+        self.received = 0
+        self.expected = count
+        self.done = asyncio.Event()
+        return self.done
+
+    def send_frame(self, frame, required: bool = False) -> bool:
+        self.received += 1
+        if self.done is not None and self.received >= self.expected:
+            self.done.set()
+        return True
+
+
+def free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def percentiles(samples: Sequence[float], points=(50, 99, 99.9)) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered: List[float] = sorted(samples)
+    result = {}
+    for point in points:
+        index = min(len(ordered) - 1, int(round(point / 100.0 * (len(ordered) - 1))))
+        result[f"p{point:g}".replace(".", "")] = ordered[index]
+    return result
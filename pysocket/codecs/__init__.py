@@ -0,0 +1,12 @@
+from .base import Codec, JSONCodec, OrJSONCodec, get_codec, negotiate, register_codec
+from .messagepack import MessagePackCodec
+
+__all__ = [
+    "Codec",
+    "JSONCodec",
+    "OrJSONCodec",
+    "MessagePackCodec",
+    "get_codec",
+    "negotiate",
+    "register_codec",
+]
@@ -0,0 +1,94 @@
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional accelerator
+    orjson = None
+
+logger = logging.getLogger("pysocket.codecs")
+
+class Codec:
+    """Serialises event envelopes for the wire.
+
+    ``subprotocol`` is the ``Sec-WebSocket-Protocol`` token clients offer to
+    select the codec, and ``binary`` decides whether encoded payloads travel
+    in text or binary frames.
+    """
+    name: str = ""
+    label: str = ""
+    subprotocol: Optional[str] = None
+    binary: bool = False
+
+    def encode(self, obj: Any) -> Union[str, bytes]:
+        raise NotImplementedError
+
+    def decode(self, data: Union[str, bytes]) -> Any:
+        raise NotImplementedError
+
+    def join(self, messages: List[Union[str, bytes]]) -> Union[str, bytes]:
+        """Combine encoded envelopes into one ``{"batch": [...]}`` envelope.
+
+        Codecs override this to splice the encoded messages together instead
+        of decoding and re-encoding them.
+        """
+        return self.encode({"batch": [self.decode(message) for message in messages]})
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.name}>"
+
+class JSONCodec(Codec):
+    name = "json"
+    label = "JSON"
+    subprotocol = "pysocket.json"
+
+    def encode(self, obj: Any) -> str:
+        return json.dumps(obj)
+
+    def decode(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def join(self, messages: List[Union[str, bytes]]) -> Union[str, bytes]:
+        if isinstance(messages[0], bytes):
+            return b'{"batch":[' + b','.join(messages) + b']}'
+        return '{"batch":[' + ','.join(messages) + ']}'
+
+class OrJSONCodec(JSONCodec):
+    """JSON backed by orjson; payloads stay UTF-8 bytes in text frames."""
+
+    def encode(self, obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Values orjson rejects (e.g. integers wider than 64 bits) still encode.
+            return json.dumps(obj).encode("utf-8")
+
+    def decode(self, data: Union[str, bytes]) -> Any:
+        return orjson.loads(data)
+
+_codecs: Dict[str, Codec] = {}
+_subprotocols: Dict[str, Codec] = {}
+
+def register_codec(codec: Codec) -> Codec:
+    _codecs[codec.name] = codec
+    if codec.subprotocol:
+        _subprotocols[codec.subprotocol] = codec
+    logger.debug(f"Registered codec {codec.name} ({codec.subprotocol})")
+    return codec
+
+def get_codec(name: str) -> Codec:
+    try:
+        return _codecs[name]
+    except KeyError:
+        raise ValueError(f"Unknown codec: {name}") from None
+
+def negotiate(offered: Iterable[str]) -> Optional[Codec]:
+    """Return the first codec matching the client's subprotocols, in its order of preference."""
+    for token in offered:
+        codec = _subprotocols.get(token.strip())
+        if codec is not None:
+            return codec
+    return None
+
+register_codec(OrJSONCodec() if orjson is not None else JSONCodec())
@@ -0,0 +1,203 @@
+import struct
+from typing import Any, List, Tuple
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional accelerator
+    msgpack = None
+
+from .base import Codec, register_codec
+
+_float = struct.Struct(">d")
+_pack_u8 = struct.Struct(">B").pack
+_pack_u16 = struct.Struct(">H").pack
+_pack_u32 = struct.Struct(">I").pack
+_pack_u64 = struct.Struct(">Q").pack
+_pack_i8 = struct.Struct(">b").pack
+_pack_i16 = struct.Struct(">h").pack
+_pack_i32 = struct.Struct(">i").pack
+_pack_i64 = struct.Struct(">q").pack
+_BATCH_KEY = b"\x81\xa5batch"  # a one-entry map keyed by "batch"
+
+def _pack_length(out: bytearray, length: int, fix_base: int, fix_max: int, codes: Tuple[int, int, int]) -> None:
+    if length <= fix_max:
+        out.append(fix_base | length)
+    elif codes[0] and length < 0x100:
+        out.append(codes[0])
+        out += _pack_u8(length)
+    elif length < 0x10000:
+        out.append(codes[1])
+        out += _pack_u16(length)
+    else:
+        out.append(codes[2])
+        out += _pack_u32(length)
+
+def _pack(obj: Any, out: bytearray) -> None:
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xFF)
+        elif obj >= 0:
+            if obj < 0x100:
+                out.append(0xCC); out += _pack_u8(obj)
+            elif obj < 0x10000:
+                out.append(0xCD); out += _pack_u16(obj)
+            elif obj < 0x100000000:
+                out.append(0xCE); out += _pack_u32(obj)
+            elif obj <= 0xFFFFFFFFFFFFFFFF:
+                out.append(0xCF); out += _pack_u64(obj)
+            else:
+                raise OverflowError("Integer value out of range")
+        elif obj >= -0x80:
+            out.append(0xD0); out += _pack_i8(obj)
+        elif obj >= -0x8000:
+            out.append(0xD1); out += _pack_i16(obj)
+        elif obj >= -0x80000000:
+            out.append(0xD2); out += _pack_i32(obj)
+        elif obj >= -0x8000000000000000:
+            out.append(0xD3); out += _pack_i64(obj)
+        else:
+            raise OverflowError("Integer value out of range")
+    elif isinstance(obj, float):
+        out.append(0xCB)
+        out += _float.pack(obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        _pack_length(out, len(data), 0xA0, 31, (0xD9, 0xDA, 0xDB))
+        out += data
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        _pack_length(out, len(obj), 0, -1, (0xC4, 0xC5, 0xC6))
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_length(out, len(obj), 0x90, 15, (0, 0xDC, 0xDD))
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        _pack_length(out, len(obj), 0x80, 15, (0, 0xDE, 0xDF))
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"Object of type {type(obj).__name__} is not MessagePack serializable")
+
+def pack_array(encoded: List[bytes]) -> bytes:
+    """A MessagePack array spliced together from values that are already encoded."""
+    out = bytearray()
+    _pack_length(out, len(encoded), 0x90, 15, (0, 0xDC, 0xDD))
+    out += b"".join(encoded)
+    return bytes(out)
+
+def packb(obj: Any) -> bytes:
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+_FIXED = {
+    0xCC: (1, ">B"), 0xCD: (2, ">H"), 0xCE: (4, ">I"), 0xCF: (8, ">Q"),
+    0xD0: (1, ">b"), 0xD1: (2, ">h"), 0xD2: (4, ">i"), 0xD3: (8, ">q"),
+    0xCA: (4, ">f"), 0xCB: (8, ">d"),
+}
+_LENGTHS = {
+    0xD9: (1, "str"), 0xDA: (2, "str"), 0xDB: (4, "str"),
+    0xC4: (1, "bin"), 0xC5: (2, "bin"), 0xC6: (4, "bin"),
+    0xDC: (2, "array"), 0xDD: (4, "array"),
+    0xDE: (2, "map"), 0xDF: (4, "map"),
+}
+
+def _unpack(data: bytes, offset: int) -> Tuple[Any, int]:
+    code = data[offset]
+    offset += 1
+    if code < 0x80:
+        return code, offset
+    if code >= 0xE0:
+        return code - 0x100, offset
+    if 0xA0 <= code <= 0xBF:
+        end = offset + (code & 0x1F)
+        return data[offset:end].decode("utf-8"), end
+    if 0x90 <= code <= 0x9F:
+        return _unpack_array(data, offset, code & 0x0F)
+    if 0x80 <= code <= 0x8F:
+        return _unpack_map(data, offset, code & 0x0F)
+    if code == 0xC0:
+        return None, offset
+    if code == 0xC2:
+        return False, offset
+    if code == 0xC3:
+        return True, offset
+    fixed = _FIXED.get(code)
+    if fixed is not None:
+        size, fmt = fixed
+        return struct.unpack_from(fmt, data, offset)[0], offset + size
+    sized = _LENGTHS.get(code)
+    if sized is None:
+        raise ValueError(f"Unsupported MessagePack type byte {code:#x}")
+    size, kind = sized
+    length = int.from_bytes(data[offset:offset + size], "big")
+    offset += size
+    if kind == "array":
+        return _unpack_array(data, offset, length)
+    if kind == "map":
+        return _unpack_map(data, offset, length)
+    end = offset + length
+    if end > len(data):
+        raise ValueError("Truncated MessagePack data")
+    chunk = data[offset:end]
+    return (chunk.decode("utf-8") if kind == "str" else bytes(chunk)), end
+
+def _unpack_array(data: bytes, offset: int, length: int) -> Tuple[Any, int]:
+    items = []
+    for _ in range(length):
+        item, offset = _unpack(data, offset)
+        items.append(item)
+    return items, offset
+
+def _unpack_map(data: bytes, offset: int, length: int) -> Tuple[Any, int]:
+    result = {}
+    for _ in range(length):
+        key, offset = _unpack(data, offset)
+        value, offset = _unpack(data, offset)
+        result[key] = value
+    return result, offset
+
+def unpackb(data: bytes) -> Any:
+    try:
+        obj, offset = _unpack(data, 0)
+    except (IndexError, TypeError, struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid MessagePack data: {e}") from None
+    if offset != len(data):
+        raise ValueError("Extra data after MessagePack object")
+    return obj
+
+class MessagePackCodec(Codec):
+    """Compact binary codec; uses the ``msgpack`` package when installed."""
+    name = "msgpack"
+    label = "MessagePack"
+    subprotocol = "pysocket.msgpack"
+    binary = True
+
+    def encode(self, obj: Any) -> bytes:
+        if msgpack is not None:
+            return msgpack.packb(obj, use_bin_type=True)
+        return packb(obj)
+
+    def decode(self, data) -> Any:
+        if isinstance(data, str):
+            raise ValueError("MessagePack payloads must be binary")
+        if msgpack is not None:
+            try:
+                return msgpack.unpackb(data, raw=False)
+            except Exception as e:
+                raise ValueError(f"Invalid MessagePack data: {e}") from None
+        return unpackb(data)
+
+    def join(self, messages: List[bytes]) -> bytes:
+        return _BATCH_KEY + pack_array(messages)
+
+register_codec(MessagePackCodec())
@@ -1,5 +1,7 @@
 from .connection import WebSocketConnection
+from .protocol import ProtocolConnection
 
 __all__ = [
     "WebSocketConnection",
-]
\ No newline at end of file
+    "ProtocolConnection",
+]
@@ -1,75 +1,429 @@
 import asyncio
 import logging
-from typing import Optional
+from collections import deque
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Union
+from .frames import (
+    FrameDecoder, ProtocolError, accept_key, encode_frame, encode_close, parse_close,
+    OP_TEXT, OP_BINARY, OP_PING, OP_PONG,
+    CLOSE_NORMAL, CLOSE_INVALID_DATA, CLOSE_POLICY_VIOLATION,
+)
+from .deflate import DeflateFrame, negotiate as negotiate_deflate
+from ..codecs import get_codec, negotiate
+from ..metrics import metrics
+from ..settings import settings
 
 logger = logging.getLogger("pysocket.connection")
 
+READ_CHUNK_SIZE = 65536
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DISCONNECT = "disconnect"
+
+_NO_HEADERS: Mapping[str, str] = MappingProxyType({})
+
+BAD_REQUEST = (
+    b"HTTP/1.1 400 Bad Request\r\n"
+    b"Sec-WebSocket-Version: 13\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+)
+
+SERVICE_UNAVAILABLE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Retry-After: 1\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+)
+
+class _Required:
+    # Queued frame the slow-consumer policy may not drop
+    __slots__ = ("frame",)
+
+    def __init__(self, frame):
+        self.frame = frame
+
 class WebSocketConnection:
-    def __init__(self, reader: Optional[asyncio.StreamReader] = None, writer: Optional[asyncio.StreamWriter] = None):
+    """One WebSocket connection.
+
+    Instances are slotted so idle connections stay small: queues, the
+    decoder's reassembly state and :attr:`state` are only allocated once
+    they are needed. Keep per-connection application data in :attr:`state`
+    (or subclass) since arbitrary attributes cannot be set.
+    """
+    __slots__ = (
+        "reader", "writer", "path", "headers", "codec", "subprotocol", "deflate", "send_queue_size",
+        "_closed", "_peer_close", "_accepted", "_decoder", "_incoming", "_outbound", "_required", "_writer_task",
+        "_batch", "_batch_handle", "_activity", "_awaiting_pong", "_wheel_slot", "_state", "_calls",
+        "__weakref__",
+    )
+    # Raw connections answer protocol pings; see Heartbeat
+    supports_ping = True
+    logger = logger
+
+    def __init__(self, reader: Optional[asyncio.StreamReader] = None, writer: Optional[asyncio.StreamWriter] = None,
+                 max_message_size: Optional[int] = None):
         self.reader = reader
         self.writer = writer
         self.path = None
+        self.headers = _NO_HEADERS
+        self.codec = get_codec(settings.CODEC)
+        self.subprotocol: Optional[str] = None
+        self.deflate = None
+        self.send_queue_size = settings.SEND_QUEUE_SIZE
         self._closed = False
-        self.logger = logger
+        # Close code from the peer, acted on once the messages before it are received
+        self._peer_close: Optional[int] = None
+        self._accepted = False
+        self._decoder = FrameDecoder(max_message_size or settings.MAX_MESSAGE_SIZE) if reader is not None else None
+        self._incoming: Optional[list] = None
+        self._outbound: Optional[deque] = None
+        self._required = False  # the outbound queue may hold _Required frames
+        self._writer_task: Optional[asyncio.Task] = None
+        self._batch: Optional[list] = None
+        self._batch_handle: Optional[asyncio.Handle] = None
+        self._activity = False
+        self._awaiting_pong = False
+        self._wheel_slot: Optional[int] = None
+        self._state: Optional[Dict[str, Any]] = None
+        # Call id -> future for PySocketServer.call, allocated with the first call
+        self._calls: Optional[Dict[int, asyncio.Future]] = None
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        """Per-connection application data, created on first access."""
+        if self._state is None:
+            self._state = {}
+        return self._state
+
+    async def read_request(self) -> Optional[bytes]:
+        """Read the upgrade request, waiting at most ``HANDSHAKE_TIMEOUT`` seconds.
+
+        Returns ``None`` and closes the connection if it does not arrive.
+        """
+        try:
+            return await asyncio.wait_for(self.reader.readuntil(b'\r\n\r\n'), settings.HANDSHAKE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.logger.info("Handshake timed out")
+        except Exception as e:
+            self.logger.error(f"Handshake error: {e}")
+        await self.close()
+        return None
 
-    async def handshake(self):
+    async def handshake(self, request: Optional[bytes] = None) -> bool:
+        """Accept the upgrade ``request``, reading it first if not given."""
         self.logger.debug(f"Performing WebSocket handshake for path {self.path}")
-        if self.reader and self.writer:
-            try:
-                request = await self.reader.readuntil(b'\r\n\r\n')
-                self.logger.debug(f"Received handshake request: {request.decode('utf-8')}")
-                response = (
-                    "HTTP/1.1 101 Switching Protocols\r\n"
-                    "Upgrade: websocket\r\n"
-                    "Connection: Upgrade\r\n"
-                    "Sec-WebSocket-Accept: dummy\r\n"
-                    "\r\n"
-                )
-                self.writer.write(response.encode('utf-8'))
-                await self.writer.drain()
-                self.logger.info("Handshake completed")
-            except Exception as e:
-                self.logger.error(f"Handshake error: {e}")
+        if not (self.reader and self.writer):
+            return False
+        if request is None:
+            request = await self.read_request()
+            if request is None:
+                return False
+        try:
+            response = self._accept_request(request)
+            if response is None:
+                self.writer.write(BAD_REQUEST)
                 await self.close()
+                return False
+            self.writer.write(response)
+            await self.writer.drain()
+            self._accepted = True
+            self.logger.info(f"Handshake completed for path {self.path}")
+            return True
+        except Exception as e:
+            self.logger.error(f"Handshake error: {e}")
+            await self.close()
+            return False
+
+    async def refuse(self, response: bytes = SERVICE_UNAVAILABLE) -> None:
+        """Answer the upgrade request, already read, with an HTTP error instead of accepting it."""
+        try:
+            self.writer.write(response)
+        except Exception as e:
+            self.logger.debug("Refused connection went away: %s", e)
+        await self.close()
+
+    def _accept_request(self, request: bytes) -> Optional[bytes]:
+        """Parse an upgrade request and negotiate the codec and compression.
+
+        Returns the ``101`` response to send, or ``None`` if the request is
+        not a valid WebSocket upgrade.
+        """
+        lines = request.decode('latin-1').split('\r\n')
+        method, target, _ = lines[0].split(' ', 2)
+        headers = self.headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        self.path = target
+        key = headers.get('sec-websocket-key')
+        if (method != 'GET' or not key
+                or 'websocket' not in headers.get('upgrade', '').lower()
+                or 'upgrade' not in headers.get('connection', '').lower()
+                or headers.get('sec-websocket-version') != '13'):
+            self.logger.warning(f"Rejected invalid WebSocket upgrade for path {target}")
+            return None
+        response = (
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept_key(key)}\r\n"
+        )
+        codec = negotiate(headers.get('sec-websocket-protocol', '').split(','))
+        if codec:
+            self.codec = codec
+            self.subprotocol = codec.subprotocol
+            response += f"Sec-WebSocket-Protocol: {codec.subprotocol}\r\n"
+        if settings.PERMESSAGE_DEFLATE and 'sec-websocket-extensions' in headers:
+            self.deflate = negotiate_deflate(headers['sec-websocket-extensions'])
+            if self.deflate:
+                if self._decoder is not None:
+                    self._decoder.inflater = self.deflate
+                response += f"Sec-WebSocket-Extensions: {self.deflate.response_header()}\r\n"
+        response += "\r\n"
+        return response.encode('latin-1')
+
+    @property
+    def frame_key(self):
+        # Connections sharing a key accept the same encoded frame, which lets
+        # PySocketServer.emit encode a broadcast once per key.
+        return (self.__class__, self.codec, self.deflate.frame_key if self.deflate else None)
 
-    async def send(self, message: str):
+    def encode_frame(self, message: Union[str, bytes], binary: Optional[bool] = None):
+        if isinstance(message, str):
+            opcode = OP_BINARY if binary else OP_TEXT
+            message = message.encode('utf-8')
+        else:
+            opcode = OP_TEXT if binary is False else OP_BINARY
+        deflate = self.deflate
+        if deflate is not None and len(message) >= deflate.min_size:
+            if deflate.server_context_takeover:
+                # Compressed by the writer task, in queue order, so frames the
+                # slow-consumer policy drops never enter the shared history.
+                return (opcode, message)
+            return DeflateFrame(opcode, message, deflate)
+        return encode_frame(opcode, message)
+
+    def send_frame(self, frame, required: bool = False) -> bool:
+        """Queue an already encoded frame without waiting for the peer.
+
+        When the outbound queue is full the ``SLOW_CONSUMER_POLICY`` setting
+        decides whether the oldest frame, the new frame or the whole
+        connection is dropped. A ``required`` frame is never dropped: if it
+        would be, the connection is closed instead. Returns ``False`` if the
+        frame was not queued.
+        """
+        if self._closed:
+            return False
+        queue = self._outbound
+        if queue is None:
+            queue = self._outbound = deque()
+        elif len(queue) >= self.send_queue_size:
+            policy = settings.SLOW_CONSUMER_POLICY
+            if required or (policy == DROP_OLDEST and type(queue[0]) is _Required):
+                policy = DISCONNECT
+            if settings.METRICS:
+                metrics.dropped_frames.inc(1 if policy in (DROP_NEWEST, DROP_OLDEST) else len(queue) + 1, policy)
+            if policy == DROP_NEWEST:
+                self.logger.debug("Send queue full for %d, dropping newest frame", id(self))
+                return False
+            if policy == DROP_OLDEST:
+                self.logger.debug("Send queue full for %d, dropping oldest frame", id(self))
+                queue.popleft()
+            else:
+                self.logger.warning(f"Send queue full for {id(self)}, disconnecting slow consumer")
+                self._closed = True
+                queue.clear()
+                asyncio.ensure_future(self._shutdown(CLOSE_POLICY_VIOLATION, "Send queue overflow"))
+                return False
+        if required:
+            frame = _Required(frame)
+            self._required = True
+        queue.append(frame)
+        if self._writer_task is None:
+            self._writer_task = asyncio.ensure_future(self._flush_outbound())
+        return True
+
+    async def send(self, message: Union[str, bytes], binary: Optional[bool] = None):
         if self._closed:
             self.logger.warning("Attempted to send on closed connection")
             return
+        self.send_frame(self.encode_frame(message, binary))
+        self.logger.debug("Queued message: %r", message)
+
+    def coalesce(self, message: Union[str, bytes]) -> None:
+        """Buffer an envelope already encoded with this connection's codec.
+
+        Everything buffered within ``COALESCE_INTERVAL`` seconds (0 meaning
+        the current loop tick) goes out as one ``{"batch": [...]}`` frame, or
+        as the plain envelope when only one message was buffered.
+        """
+        if self._closed:
+            return
+        batch = self._batch
+        if batch is None:
+            batch = self._batch = []
+            loop = asyncio.get_running_loop()
+            interval = settings.COALESCE_INTERVAL
+            if interval:
+                self._batch_handle = loop.call_later(interval, self.flush_batch)
+            else:
+                self._batch_handle = loop.call_soon(self.flush_batch)
+        batch.append(message)
+        if len(batch) >= settings.COALESCE_MAX_BATCH:
+            self.flush_batch()
+
+    def flush_batch(self) -> None:
+        batch = self._batch
+        if batch is None:
+            return
+        self._batch = None
+        self._batch_handle.cancel()
+        self._batch_handle = None
+        codec = self.codec
+        message = batch[0] if len(batch) == 1 else codec.join(batch)
+        self.send_frame(self.encode_frame(message, codec.binary))
+
+    async def _flush_outbound(self):
+        queue = self._outbound
         try:
-            if self.writer:
-                self.writer.write((message + '\n').encode('utf-8'))
-                await self.writer.drain()
-                self.logger.debug(f"Sent message: {message}")
+            while queue:
+                frames = list(queue)
+                queue.clear()
+                if self._required:
+                    self._required = False
+                    frames = [frame.frame if type(frame) is _Required else frame for frame in frames]
+                if self.deflate is not None:
+                    frames = [frame if isinstance(frame, bytes) else await self._compress_frame(frame)
+                              for frame in frames]
+                await self._write_frames(frames)
         except Exception as e:
             self.logger.error(f"Send error: {e}")
+            queue.clear()
             await self.close()
+        finally:
+            self._writer_task = None
+            if not queue:
+                # Idle connections do not keep an empty deque around.
+                self._outbound = None
 
-    async def receive(self) -> Optional[str]:
-        if self._closed:
+    async def _compress_frame(self, frame) -> bytes:
+        if isinstance(frame, DeflateFrame):
+            return await frame.result()
+        opcode, payload = frame
+        threshold = settings.DEFLATE_EXECUTOR_THRESHOLD
+        if threshold and len(payload) >= threshold:
+            compressed = await asyncio.get_running_loop().run_in_executor(None, self.deflate.compress, payload)
+        else:
+            compressed = self.deflate.compress(payload)
+        return encode_frame(opcode, compressed, rsv1=True)
+
+    async def _write_frames(self, frames) -> None:
+        if self.writer:
+            if settings.METRICS:
+                metrics.messages_out.inc(len(frames))
+                metrics.bytes_out.inc(sum(map(len, frames)))
+            self.writer.writelines(frames)
+            await self.writer.drain()
+
+    async def _finish_outbound(self) -> None:
+        task = self._writer_task
+        if task is None or task is asyncio.current_task():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(task), settings.CLOSE_TIMEOUT)
+        except Exception:
+            if self._outbound is not None:
+                self._outbound.clear()
+            task.cancel()
+
+    async def receive(self) -> Optional[Union[str, bytes]]:
+        # Messages decoded but not yet returned, newest first, so an
+        # idle connection holds no buffer and popping is O(1).
+        incoming = self._incoming
+        if self._closed and not incoming:
             self.logger.debug("Receive attempted on closed connection")
             return None
         try:
             if self.reader:
-                data = await self.reader.readline()
-                if not data:
-                    await self.close()
-                    return None
-                message = data.decode('utf-8').strip()
-                self.logger.debug(f"Received message: {message}")
-                return message
+                while not incoming:
+                    if self._peer_close is not None:
+                        await self.close(self._peer_close)
+                        return None
+                    data = await self.reader.read(READ_CHUNK_SIZE)
+                    if not data:
+                        await self.close()
+                        return None
+                    self._activity = True
+                    if settings.METRICS:
+                        metrics.bytes_in.inc(len(data))
+                    incoming = []
+                    for opcode, payload in self._decoder.feed(data):
+                        if opcode == OP_TEXT or opcode == OP_BINARY:
+                            incoming.append((opcode, payload))
+                        elif not await self._handle_control(opcode, payload):
+                            # Close frame: nothing after it counts
+                            break
+                    incoming.reverse()
+                opcode, payload = incoming.pop()
+                self._incoming = incoming or None
+                return await self._to_message(opcode, payload)
+        except ProtocolError as e:
+            self.logger.warning(f"Protocol error on {self.path}: {e}")
+            await self.close(e.close_code, str(e))
+            return None
         except Exception as e:
             self.logger.error(f"Receive error: {e}")
             await self.close()
             return None
 
-    async def close(self):
+    async def _to_message(self, opcode: int, payload: bytes) -> Optional[Union[str, bytes]]:
+        if opcode == OP_TEXT:
+            try:
+                message = payload.decode('utf-8')
+            except UnicodeDecodeError:
+                await self.close(CLOSE_INVALID_DATA, "Invalid UTF-8")
+                return None
+        else:
+            message = payload
+        if settings.METRICS:
+            metrics.messages_in.inc()
+        self.logger.debug("Received message: %r", message)
+        return message
+
+    def ping(self, payload: bytes = b"") -> None:
+        if self.writer and not self._closed:
+            self.writer.write(encode_frame(OP_PING, payload))
+
+    async def _handle_control(self, opcode: int, payload: bytes) -> bool:
+        if opcode == OP_PING:
+            self.writer.write(encode_frame(OP_PONG, payload))
+            return True
+        if opcode == OP_PONG:
+            return True
+        code, reason = parse_close(payload)
+        self.logger.debug(f"Received close frame {code} {reason!r}")
+        self._peer_close = code
+        return False
+
+    async def close(self, code: int = CLOSE_NORMAL, reason: str = ""):
         if not self._closed:
+            self.flush_batch()
             self._closed = True
-            if self.writer:
-                try:
-                    self.writer.close()
-                    await self.writer.wait_closed()
-                    self.logger.info(f"Closed connection for path {self.path}")
-                except Exception as e:
-                    self.logger.error(f"Close error: {e}")
\ No newline at end of file
+            await self._shutdown(code, reason)
+
+    async def _shutdown(self, code: int, reason: str):
+        await self._finish_outbound()
+        if self.writer:
+            try:
+                if self._accepted:
+                    self.writer.write(encode_close(code, reason))
+                self.writer.close()
+                await self.writer.wait_closed()
+                self.logger.info(f"Closed connection for path {self.path}")
+            except Exception as e:
+                self.logger.error(f"Close error: {e}")
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from .frames import MessageTooBig, ProtocolError, encode_frame
+from ..settings import settings
+
+logger = logging.getLogger("pysocket.deflate")
+
+EXTENSION_NAME = "permessage-deflate"
+_TAIL = b"\x00\x00\xff\xff"
+
+def parse_extensions(header: str) -> List[Tuple[str, Dict[str, Optional[str]]]]:
+    offers = []
+    for offer in header.split(','):
+        parts = [part.strip() for part in offer.split(';')]
+        if not parts[0]:
+            continue
+        params: Dict[str, Optional[str]] = {}
+        for part in parts[1:]:
+            if not part:
+                continue
+            name, _, value = part.partition('=')
+            params[name.strip().lower()] = value.strip().strip('"') or None
+        offers.append((parts[0].lower(), params))
+    return offers
+
+def compress(payload: bytes, window_bits: int, level: int, mem_level: int) -> bytes:
+    """Compress one message without context takeover."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -window_bits, mem_level)
+    data = compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    return data[:-4] if data.endswith(_TAIL) else data
+
+class PerMessageDeflate:
+    """Negotiated RFC 7692 parameters and compression state for one connection."""
+
+    def __init__(self, server_window_bits: int = 15, client_window_bits: Optional[int] = None,
+                 server_context_takeover: bool = False, client_context_takeover: bool = True,
+                 level: int = 6, mem_level: int = 8, min_size: int = 0):
+        self.server_window_bits = server_window_bits
+        self.client_window_bits = client_window_bits
+        self.server_context_takeover = server_context_takeover
+        self.client_context_takeover = client_context_takeover
+        self.level = level
+        self.mem_level = mem_level
+        self.min_size = min_size
+        self._compressor = None
+        self._decompressor = None
+        # Connections with equal keys can share precompressed frames; with
+        # context takeover every connection compresses with its own history.
+        if server_context_takeover:
+            self.frame_key = ("context",)
+        else:
+            self.frame_key = (server_window_bits, level, mem_level, min_size)
+
+    def response_header(self) -> str:
+        params = [EXTENSION_NAME]
+        if not self.server_context_takeover:
+            params.append("server_no_context_takeover")
+        if not self.client_context_takeover:
+            params.append("client_no_context_takeover")
+        if self.server_window_bits < 15:
+            params.append(f"server_max_window_bits={self.server_window_bits}")
+        if self.client_window_bits is not None:
+            params.append(f"client_max_window_bits={self.client_window_bits}")
+        return "; ".join(params)
+
+    def compress(self, payload: bytes) -> bytes:
+        if not self.server_context_takeover:
+            return compress(payload, self.server_window_bits, self.level, self.mem_level)
+        if self._compressor is None:
+            self._compressor = zlib.compressobj(self.level, zlib.DEFLATED, -self.server_window_bits, self.mem_level)
+        data = self._compressor.compress(payload) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data[:-4] if data.endswith(_TAIL) else data
+
+    def decompress(self, payload: bytes, max_size: Optional[int]) -> bytes:
+        decompressor = self._decompressor
+        if decompressor is None:
+            decompressor = zlib.decompressobj(-15)
+            if self.client_context_takeover:
+                self._decompressor = decompressor
+        try:
+            data = decompressor.decompress(payload + _TAIL, max_size or 0)
+        except zlib.error as e:
+            raise ProtocolError(f"Invalid compressed data: {e}")
+        if decompressor.unconsumed_tail:
+            raise MessageTooBig(f"Message exceeds {max_size} bytes")
+        return data
+
+class DeflateFrame:
+    """A message compressed without context takeover, shared by every recipient.
+
+    Compression is deferred to the first writer that flushes it and, above
+    ``DEFLATE_EXECUTOR_THRESHOLD`` bytes, runs in the loop's default executor.
+    """
+    __slots__ = ("opcode", "payload", "deflate", "frame", "future")
+
+    def __init__(self, opcode: int, payload: bytes, deflate: PerMessageDeflate):
+        self.opcode = opcode
+        self.payload = payload
+        self.deflate = deflate
+        self.frame: Optional[bytes] = None
+        self.future: Optional[asyncio.Future] = None
+
+    def _compress(self) -> bytes:
+        self.frame = encode_frame(self.opcode, self.deflate.compress(self.payload), rsv1=True)
+        self.payload = None
+        return self.frame
+
+    async def result(self) -> bytes:
+        if self.frame is not None:
+            return self.frame
+        if self.future is None:
+            threshold = settings.DEFLATE_EXECUTOR_THRESHOLD
+            if not threshold or len(self.payload) < threshold:
+                return self._compress()
+            self.future = asyncio.get_running_loop().run_in_executor(None, self._compress)
+        return await self.future
+
+def negotiate(header: str) -> Optional[PerMessageDeflate]:
+    """Accept the first permessage-deflate offer compatible with the settings."""
+    for name, params in parse_extensions(header):
+        if name != EXTENSION_NAME:
+            continue
+        try:
+            deflate = _accept(params)
+        except ValueError as e:
+            logger.debug(f"Declined permessage-deflate offer {params}: {e}")
+            continue
+        if deflate is not None:
+            return deflate
+    return None
+
+def _accept(params: Dict[str, Optional[str]]) -> Optional[PerMessageDeflate]:
+    allowed = {"server_no_context_takeover", "client_no_context_takeover",
+               "server_max_window_bits", "client_max_window_bits"}
+    if set(params) - allowed:
+        raise ValueError("unknown parameter")
+    # zlib cannot produce raw deflate streams with an 8-bit window.
+    server_bits = max(settings.DEFLATE_WINDOW_BITS, 9)
+    if "server_max_window_bits" in params:
+        offered = int(params["server_max_window_bits"] or 0)
+        if not 9 <= offered <= 15:
+            raise ValueError("unsupported server_max_window_bits")
+        server_bits = min(server_bits, offered)
+    client_bits = None
+    if "client_max_window_bits" in params:
+        offered = params["client_max_window_bits"]
+        limit = int(offered) if offered else 15
+        if not 8 <= limit <= 15:
+            raise ValueError("invalid client_max_window_bits")
+        client_bits = min(limit, settings.DEFLATE_CLIENT_WINDOW_BITS)
+    server_context = settings.DEFLATE_CONTEXT_TAKEOVER and "server_no_context_takeover" not in params
+    client_context = settings.DEFLATE_CLIENT_CONTEXT_TAKEOVER and "client_no_context_takeover" not in params
+    return PerMessageDeflate(
+        server_window_bits=server_bits,
+        client_window_bits=client_bits,
+        server_context_takeover=server_context,
+        client_context_takeover=client_context,
+        level=settings.DEFLATE_LEVEL,
+        mem_level=settings.DEFLATE_MEM_LEVEL,
+        min_size=settings.DEFLATE_MIN_SIZE,
+    )
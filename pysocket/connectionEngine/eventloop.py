@@ -0,0 +1,20 @@
+import asyncio
+import sys
+from typing import Any, Coroutine
+
+from ..settings import settings
+
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - optional accelerator
+    uvloop = None
+
+def run(main: Coroutine) -> Any:
+    """``asyncio.run`` on uvloop when it is installed and ``settings.USE_UVLOOP`` is set."""
+    if uvloop is None or not settings.USE_UVLOOP:
+        return asyncio.run(main)
+    if sys.version_info >= (3, 11):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            return runner.run(main)
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return asyncio.run(main)
@@ -0,0 +1,207 @@
+import base64
+import hashlib
+import struct
+from typing import List, Optional, Tuple
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+DATA_OPCODES = (OP_CONTINUATION, OP_TEXT, OP_BINARY)
+CONTROL_OPCODES = (OP_CLOSE, OP_PING, OP_PONG)
+
+CLOSE_NORMAL = 1000
+CLOSE_GOING_AWAY = 1001
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_INVALID_DATA = 1007
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TOO_BIG = 1009
+CLOSE_INTERNAL_ERROR = 1011
+CLOSE_SERVICE_RESTART = 1012
+CLOSE_TRY_AGAIN_LATER = 1013
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+_pack_short = struct.Struct("!BBH").pack
+_pack_long = struct.Struct("!BBQ").pack
+_unpack_short = struct.Struct("!H").unpack_from
+_unpack_long = struct.Struct("!Q").unpack_from
+
+
+class ProtocolError(Exception):
+    close_code = CLOSE_PROTOCOL_ERROR
+
+
+class MessageTooBig(ProtocolError):
+    close_code = CLOSE_TOO_BIG
+
+
+def accept_key(key: str) -> str:
+    digest = hashlib.sha1(key.strip().encode("ascii") + WEBSOCKET_GUID).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def apply_mask(data, mask: bytes) -> bytes:
+    """XOR ``data`` with the 4-byte ``mask`` as one wide integer.
+
+    ``data`` may be any bytes-like object, including a memoryview slice of a
+    receive buffer, so unmasking never copies the payload byte by byte.
+    """
+    length = len(data)
+    if not length:
+        return b""
+    key = (mask * ((length >> 2) + 1))[:length]
+    value = int.from_bytes(data, "little") ^ int.from_bytes(key, "little")
+    return value.to_bytes(length, "little")
+
+
+def encode_frame(opcode: int, payload: bytes = b"", fin: bool = True,
+                 rsv1: bool = False, mask: Optional[bytes] = None) -> bytes:
+    first = (0x80 if fin else 0) | (0x40 if rsv1 else 0) | opcode
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header = bytes((first, mask_bit | length))
+    elif length < 0x10000:
+        header = _pack_short(first, mask_bit | 126, length)
+    else:
+        header = _pack_long(first, mask_bit | 127, length)
+    if mask:
+        return header + mask + apply_mask(payload, mask)
+    return header + payload
+
+
+def encode_close(code: int = CLOSE_NORMAL, reason: str = "", mask: Optional[bytes] = None) -> bytes:
+    payload = struct.pack("!H", code) + reason.encode("utf-8")[:123]
+    return encode_frame(OP_CLOSE, payload, mask=mask)
+
+
+def parse_close(payload: bytes) -> Tuple[int, str]:
+    if len(payload) < 2:
+        return CLOSE_NORMAL, ""
+    code = _unpack_short(payload)[0]
+    try:
+        reason = payload[2:].decode("utf-8")
+    except UnicodeDecodeError:
+        raise ProtocolError("Invalid UTF-8 in close reason")
+    return code, reason
+
+
+class FrameDecoder:
+    """Incremental RFC 6455 decoder that reassembles fragmented messages.
+
+    Bytes are appended with :meth:`feed`, which returns every complete
+    ``(opcode, payload)`` pair available so far. Data messages are reported
+    with the opcode of their first fragment; control frames are passed
+    through as-is so the caller can answer pings and closes.
+    """
+    __slots__ = ("max_size", "require_mask", "inflater", "_buffer", "_fragments",
+                 "_fragment_opcode", "_fragment_size", "_compressed")
+
+    def __init__(self, max_size: Optional[int] = None, require_mask: bool = True, inflater=None):
+        self.max_size = max_size
+        self.require_mask = require_mask
+        # Negotiated permessage-deflate state; allows RSV1 on a message's first frame
+        self.inflater = inflater
+        self._buffer = bytearray()
+        self._fragments: Optional[List[bytes]] = None
+        self._fragment_opcode: Optional[int] = None
+        self._fragment_size = 0
+        self._compressed = False
+
+    def feed(self, data) -> List[Tuple[int, bytes]]:
+        buffer = self._buffer
+        buffer += data
+        messages = []
+        offset = 0
+        available = len(buffer)
+        view = memoryview(buffer)
+        try:
+            while available - offset >= 2:
+                first = view[offset]
+                second = view[offset + 1]
+                fin = first & 0x80
+                opcode = first & 0x0F
+                masked = second & 0x80
+                length = second & 0x7F
+                header = 2
+                if length == 126:
+                    if available - offset < 4:
+                        break
+                    length = _unpack_short(view, offset + 2)[0]
+                    header = 4
+                elif length == 127:
+                    if available - offset < 10:
+                        break
+                    length = _unpack_long(view, offset + 2)[0]
+                    header = 10
+                if masked:
+                    header += 4
+                elif self.require_mask:
+                    raise ProtocolError("Client frames must be masked")
+                self._check_frame(first, opcode, fin, length)
+                end = offset + header + length
+                if end > available:
+                    break
+                start = offset + header
+                if masked:
+                    payload = apply_mask(view[start:end], bytes(view[start - 4:start]))
+                else:
+                    payload = bytes(view[start:end])
+                offset = end
+                if first & 0x40:
+                    self._compressed = True
+                message = self._assemble(opcode, fin, payload)
+                if message is not None:
+                    messages.append(message)
+        finally:
+            view.release()
+        if offset:
+            del buffer[:offset]
+        return messages
+
+    def _check_frame(self, first: int, opcode: int, fin: int, length: int) -> None:
+        if first & 0x30 or (first & 0x40 and (self.inflater is None or opcode not in (OP_TEXT, OP_BINARY))):
+            raise ProtocolError("Reserved bits must be zero")
+        if opcode in CONTROL_OPCODES:
+            if not fin or length > 125:
+                raise ProtocolError("Invalid control frame")
+            return
+        if opcode not in DATA_OPCODES:
+            raise ProtocolError(f"Unknown opcode {opcode:#x}")
+        if self.max_size is not None and self._fragment_size + length > self.max_size:
+            raise MessageTooBig(f"Message exceeds {self.max_size} bytes")
+
+    def _assemble(self, opcode: int, fin: int, payload: bytes) -> Optional[Tuple[int, bytes]]:
+        if opcode in CONTROL_OPCODES:
+            return opcode, payload
+        if opcode == OP_CONTINUATION:
+            if self._fragment_opcode is None:
+                raise ProtocolError("Unexpected continuation frame")
+            self._fragments.append(payload)
+            self._fragment_size += len(payload)
+            if not fin:
+                return None
+            opcode = self._fragment_opcode
+            payload = b"".join(self._fragments)
+            self._fragments = None
+            self._fragment_opcode = None
+            self._fragment_size = 0
+            return opcode, self._inflate(payload)
+        if self._fragment_opcode is not None:
+            raise ProtocolError("Expected continuation frame")
+        if fin:
+            return opcode, self._inflate(payload)
+        self._fragment_opcode = opcode
+        self._fragments = [payload]
+        self._fragment_size = len(payload)
+        return None
+
+    def _inflate(self, payload: bytes) -> bytes:
+        if not self._compressed:
+            return payload
+        self._compressed = False
+        return self.inflater.decompress(payload, self.max_size)
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import math
+from typing import List, Optional, Set
+
+from .frames import CLOSE_INTERNAL_ERROR
+
+logger = logging.getLogger("pysocket.heartbeat")
+
+class TimerWheel:
+    """Hashed timer wheel advanced by a single ``call_at`` chain.
+
+    Each slot covers ``tick`` seconds and the wheel is sized so every delay
+    it accepts fits in one revolution, so expiring a slot never has to look
+    at entries belonging to a later lap. Scheduling and cancelling are O(1).
+    """
+
+    def __init__(self, tick: float, horizon: float, on_expire):
+        self.tick = tick
+        self.on_expire = on_expire
+        self._slots: List[Set] = [set() for _ in range(int(math.ceil(horizon / tick)) + 2)]
+        self._cursor = 0
+        self._size = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._next_at = 0.0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def schedule(self, item, delay: float) -> None:
+        ticks = max(1, int(math.ceil(delay / self.tick)))
+        if ticks >= len(self._slots):
+            raise ValueError(f"Delay {delay} exceeds the wheel horizon")
+        index = (self._cursor + ticks) % len(self._slots)
+        self._slots[index].add(item)
+        item._wheel_slot = index
+        self._size += 1
+        if self._handle is None:
+            loop = asyncio.get_running_loop()
+            self._next_at = loop.time() + self.tick
+            self._handle = loop.call_at(self._next_at, self._advance)
+
+    def cancel(self, item) -> None:
+        index = getattr(item, '_wheel_slot', None)
+        if index is not None:
+            item._wheel_slot = None
+            slot = self._slots[index]
+            if item in slot:
+                slot.discard(item)
+                self._size -= 1
+
+    def _advance(self) -> None:
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        expired = self._slots[self._cursor]
+        if expired:
+            self._slots[self._cursor] = set()
+            self._size -= len(expired)
+            for item in expired:
+                item._wheel_slot = None
+                self.on_expire(item)
+        if self._size:
+            loop = asyncio.get_running_loop()
+            # Re-anchor on the previous deadline so ticks do not drift.
+            self._next_at = max(self._next_at + self.tick, loop.time())
+            self._handle = loop.call_at(self._next_at, self._advance)
+        else:
+            self._handle = None
+
+class Heartbeat:
+    """Pings idle connections and closes those that miss the pong deadline.
+
+    Connections only set a flag when data arrives. When a connection's
+    wheel slot expires, recent traffic re-arms it for another
+    ``interval``. If it was quiet, a ping is sent and the connection is
+    re-armed for ``timeout``. If nothing arrived by then, it is closed.
+    """
+
+    def __init__(self, interval: float, timeout: float, tick: float = 1.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.wheel = TimerWheel(tick, max(interval, timeout), self._expire)
+
+    def register(self, connection) -> None:
+        connection._activity = False
+        connection._awaiting_pong = False
+        self.wheel.schedule(connection, self.interval)
+
+    def unregister(self, connection) -> None:
+        self.wheel.cancel(connection)
+
+    def _expire(self, connection) -> None:
+        if connection._closed:
+            return
+        if connection._activity:
+            connection._activity = False
+            connection._awaiting_pong = False
+            self.wheel.schedule(connection, self.interval)
+        elif connection._awaiting_pong:
+            logger.info(f"Ping timeout for {id(connection)}, closing")
+            asyncio.ensure_future(connection.close(CLOSE_INTERNAL_ERROR, "Ping timeout"))
+        else:
+            connection._awaiting_pong = True
+            connection.ping()
+            self.wheel.schedule(connection, self.timeout)
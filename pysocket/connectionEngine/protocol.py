@@ -0,0 +1,239 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple, Union
+
+from .connection import BAD_REQUEST, SERVICE_UNAVAILABLE, WebSocketConnection
+from .frames import (
+    FrameDecoder, ProtocolError, encode_close, encode_frame, parse_close,
+    OP_BINARY, OP_PING, OP_PONG, OP_TEXT, CLOSE_NORMAL,
+)
+from ..metrics import metrics
+from ..settings import settings
+
+logger = logging.getLogger("pysocket.protocol")
+
+_HEADER_END = b"\r\n\r\n"
+# Rough per-message bookkeeping cost, so floods of empty frames still count
+_MESSAGE_COST = 64
+
+class ProtocolConnection(WebSocketConnection, asyncio.Protocol):
+    """Connection driven by ``asyncio.Protocol`` callbacks instead of streams.
+
+    ``data_received`` feeds bytes straight into the frame decoder and answers
+    control frames inline, so a message costs no stream or coroutine hops
+    until ``receive`` hands it to the server. Writes go to the transport with
+    ``writelines`` and only wait when the transport asks to pause. Reading
+    pauses while more than twice ``STREAM_LIMIT`` of messages wait for
+    ``receive``, and resumes once they are back under the limit, like a
+    ``StreamReader`` buffer.
+    """
+    __slots__ = ("server", "transport", "_request", "_pending", "_waiter", "_drain_waiter", "_paused", "_lost",
+                 "_task", "_queued", "_reading_paused", "_handshake_timer")
+    logger = logger
+
+    def __init__(self, server, max_message_size: Optional[int] = None):
+        super().__init__()
+        self.server = server
+        self.transport: Optional[asyncio.Transport] = None
+        self._request: Optional[bytearray] = None
+        self._pending: Optional[List[Tuple[int, bytes]]] = None
+        self._waiter: Optional[asyncio.Future] = None
+        self._drain_waiter: Optional[asyncio.Future] = None
+        self._paused = False
+        self._lost = False
+        self._task: Optional[asyncio.Task] = None
+        self._queued = 0
+        self._reading_paused = False
+        self._handshake_timer: Optional[asyncio.TimerHandle] = None
+        self._decoder = FrameDecoder(max_message_size or settings.MAX_MESSAGE_SIZE)
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self._request = bytearray()
+        if settings.HANDSHAKE_TIMEOUT is not None:
+            self._handshake_timer = asyncio.get_running_loop().call_later(
+                settings.HANDSHAKE_TIMEOUT, self._handshake_timeout)
+
+    def _handshake_timeout(self) -> None:
+        self._handshake_timer = None
+        self.logger.info("Handshake timed out")
+        self.transport.close()
+
+    def data_received(self, data: bytes) -> None:
+        if self._peer_close is not None:
+            return
+        if not self._accepted:
+            data = self._read_request(data)
+            if not data:
+                return
+        self._activity = True
+        if settings.METRICS:
+            metrics.bytes_in.inc(len(data))
+        try:
+            frames = self._decoder.feed(data)
+        except ProtocolError as e:
+            self.logger.warning(f"Protocol error on {self.path}: {e}")
+            self._close_soon(e.close_code, str(e))
+            return
+        for opcode, payload in frames:
+            if opcode == OP_TEXT or opcode == OP_BINARY:
+                if self._pending is None:
+                    self._pending = []
+                self._pending.append((opcode, payload))
+                self._queued += len(payload) + _MESSAGE_COST
+            elif opcode == OP_PING:
+                self.transport.write(encode_frame(OP_PONG, payload))
+            elif opcode != OP_PONG:
+                code, reason = parse_close(payload)
+                self.logger.debug(f"Received close frame {code} {reason!r}")
+                # receive() closes once the messages before the close are handed back
+                self._peer_close = code
+                self._wake()
+                break
+        if self._pending:
+            if self._queued > 2 * settings.STREAM_LIMIT and not self._reading_paused:
+                self._reading_paused = True
+                self.transport.pause_reading()
+            self._wake()
+
+    def _read_request(self, data: bytes) -> Optional[bytes]:
+        request = self._request
+        request += data
+        end = request.find(_HEADER_END)
+        if end < 0:
+            if len(request) > settings.STREAM_LIMIT:
+                self.logger.warning("Handshake request too large")
+                self.transport.write(BAD_REQUEST)
+                self.transport.close()
+            return None
+        end += len(_HEADER_END)
+        rest = bytes(request[end:])
+        self._request = None
+        self._cancel_handshake_timer()
+        if not self.server.admit():
+            self.transport.write(SERVICE_UNAVAILABLE)
+            self.transport.close()
+            return None
+        try:
+            response = self._accept_request(bytes(request[:end]))
+        except Exception as e:
+            self.logger.error(f"Handshake error: {e}")
+            response = None
+        if response is None:
+            self.server.release()
+            self.transport.write(BAD_REQUEST)
+            self.transport.close()
+            return None
+        self._decoder.inflater = self.deflate
+        self.transport.write(response)
+        self._accepted = True
+        self.logger.info(f"Handshake completed for path {self.path}")
+        self._task = asyncio.ensure_future(self.server.handle_connection(self, self.path))
+        self._task.add_done_callback(self._release)
+        return rest
+
+    def _cancel_handshake_timer(self) -> None:
+        if self._handshake_timer is not None:
+            self._handshake_timer.cancel()
+            self._handshake_timer = None
+
+    def _release(self, task: asyncio.Task) -> None:
+        self.server.release()
+
+    def _wake(self) -> None:
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _close_soon(self, code: int, reason: str = "") -> None:
+        if not self._closed:
+            asyncio.ensure_future(self.close(code, reason))
+        self._wake()
+
+    def pause_writing(self) -> None:
+        self._paused = True
+
+    def resume_writing(self) -> None:
+        self._paused = False
+        waiter = self._drain_waiter
+        if waiter is not None:
+            self._drain_waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def eof_received(self) -> bool:
+        if self._peer_close is None:
+            self._peer_close = CLOSE_NORMAL
+        self._wake()
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._lost = True
+        self._closed = True
+        self._cancel_handshake_timer()
+        self._wake()
+        waiter = self._drain_waiter
+        if waiter is not None:
+            self._drain_waiter = None
+            if not waiter.done():
+                waiter.set_exception(ConnectionResetError("Connection lost"))
+
+    async def receive(self) -> Optional[Union[str, bytes]]:
+        while True:
+            ready = self._incoming
+            if not ready:
+                ready = self._pending
+                if not ready:
+                    if self._closed:
+                        return None
+                    if self._peer_close is not None:
+                        await self.close(self._peer_close)
+                        return None
+                    self._waiter = asyncio.get_running_loop().create_future()
+                    await self._waiter
+                    continue
+                # Oldest last, so pop() returns messages in arrival order.
+                ready.reverse()
+                self._pending = None
+            opcode, payload = ready.pop()
+            self._incoming = ready or None
+            self._queued -= len(payload) + _MESSAGE_COST
+            if self._reading_paused and self._queued <= settings.STREAM_LIMIT:
+                self._reading_paused = False
+                self.transport.resume_reading()
+            return await self._to_message(opcode, payload)
+
+    async def _write_frames(self, frames) -> None:
+        if self._lost:
+            raise ConnectionResetError("Connection lost")
+        if settings.METRICS:
+            metrics.messages_out.inc(len(frames))
+            metrics.bytes_out.inc(sum(map(len, frames)))
+        self.transport.writelines(frames)
+        if self._paused:
+            self._drain_waiter = asyncio.get_running_loop().create_future()
+            await self._drain_waiter
+
+    def ping(self, payload: bytes = b"") -> None:
+        if not self._closed and not self._lost:
+            self.transport.write(encode_frame(OP_PING, payload))
+
+    async def _shutdown(self, code: int, reason: str):
+        await self._finish_outbound()
+        self._wake()
+        if self.transport is not None and not self._lost:
+            if self._accepted:
+                self.transport.write(encode_close(code, reason))
+            self.transport.close()
+            self.logger.info(f"Closed connection for path {self.path}")
+
+async def create_server(server, host: Optional[str], port: Optional[int], reuse_port: Optional[bool] = None,
+                        sock=None) -> asyncio.AbstractServer:
+    """Listen with :class:`ProtocolConnection`; the counterpart of ``asyncio.start_server``."""
+    loop = asyncio.get_running_loop()
+    factory = lambda: ProtocolConnection(server)
+    if sock is not None:
+        return await loop.create_server(factory, sock=sock)
+    return await loop.create_server(factory, host, port, reuse_port=reuse_port)
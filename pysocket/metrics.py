@@ -0,0 +1,201 @@
+import asyncio
+import bisect
+import logging
+import weakref
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("pysocket.metrics")
+
+# Seconds; covers fast in-loop handlers through slow offloaded ones
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = Tuple[str, float]
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _labels(label: Optional[str], value: Optional[str]) -> str:
+    if label is None or value is None:
+        return ""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'{{{label}="{escaped}"}}'
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: Dict[Optional[str], float] = {}
+
+    def inc(self, amount: float = 1, label: Optional[str] = None) -> None:
+        self.values[label] = self.values.get(label, 0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for value, total in self.values.items():
+            yield self.name, _labels(self.label, value), total
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None,
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        # label -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[Optional[str], List[float]] = {}
+
+    def observe(self, amount: float, label: Optional[str] = None) -> None:
+        counts = self.values.get(label)
+        if counts is None:
+            counts = self.values[label] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, amount)] += 1
+        counts[-1] += amount
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        for value, counts in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _labels(self.label, value)
+                labels = f'{labels[:-1]},le="{le}"}}' if labels else f'{{le="{le}"}}'
+                yield f"{self.name}_bucket", labels, cumulative
+            yield f"{self.name}_sum", _labels(self.label, value), counts[-1]
+            yield f"{self.name}_count", _labels(self.label, value), cumulative
+
+class Metrics:
+    """Process-wide metrics registry.
+
+    Instrumented code checks ``settings.METRICS`` before recording anything,
+    so disabled metrics cost one attribute lookup per call site. Gauges are
+    not updated in the hot path at all: collectors registered with
+    :meth:`add_collector` compute them when the metrics are read.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], Optional[Callable]]] = []
+        self._gauges_info: Dict[str, Tuple[str, Callable]] = {}
+        self.handler_seconds = self.histogram(
+            "pysocket_handler_seconds", "Time spent in event handlers", label="event")
+        self.messages_in = self.counter("pysocket_messages_received_total", "WebSocket messages received")
+        self.bytes_in = self.counter("pysocket_bytes_received_total", "Bytes read from WebSocket transports")
+        self.messages_out = self.counter("pysocket_messages_sent_total", "WebSocket frames written")
+        self.bytes_out = self.counter("pysocket_bytes_sent_total", "Bytes written to WebSocket transports")
+        self.dropped_frames = self.counter(
+            "pysocket_dropped_frames_total", "Outbound frames dropped by the slow-consumer policy", label="policy")
+        self.middleware_rejections = self.counter(
+            "pysocket_middleware_rejections_total", "Connections rejected by middleware")
+        self.rejected_connections = self.counter(
+            "pysocket_rejected_connections_total", "Handshakes refused by admission control", label="reason")
+        self.rate_limited = self.counter(
+            "pysocket_rate_limited_total", "Events and emits dropped by rate limits or load shedding", label="scope")
+        self.describe_gauge("pysocket_connections", "Open WebSocket connections")
+        self.describe_gauge("pysocket_rooms", "Rooms with at least one member")
+        self.describe_gauge("pysocket_room_memberships", "Connection-room memberships")
+        self.describe_gauge("pysocket_outbound_queue_frames", "Frames waiting in outbound queues")
+        self.describe_gauge("pysocket_outbound_queue_max_frames", "Deepest outbound queue", aggregate=max)
+        self.describe_gauge("pysocket_topic_subscriptions", "Topic pattern subscriptions")
+        self.describe_gauge("pysocket_history_rooms", "Rooms with retained history")
+        self.describe_gauge("pysocket_history_bytes", "Encoded bytes retained for room resume")
+        self.describe_gauge("pysocket_loop_lag_seconds", "Last measured event loop lag", aggregate=max)
+
+    def counter(self, name: str, help: str, label: Optional[str] = None) -> Counter:
+        metric = self._metrics[name] = Counter(name, help, label)
+        return metric
+
+    def histogram(self, name: str, help: str, label: Optional[str] = None,
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = self._metrics[name] = Histogram(name, help, label, buckets)
+        return metric
+
+    def describe_gauge(self, name: str, help: str, aggregate: Callable = sum) -> None:
+        """Declare a gauge; ``aggregate`` combines the values reported by each collector."""
+        self._gauges_info[name] = (help, aggregate)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Register a callable yielding ``(gauge name, value)`` pairs when metrics are read.
+
+        Bound methods are held weakly, so registering a server does not keep it alive.
+        """
+        if hasattr(collector, "__self__"):
+            self._collectors.append(weakref.WeakMethod(collector))
+        else:
+            self._collectors.append(lambda: collector)
+
+    def _gauges(self) -> Dict[str, float]:
+        reported: Dict[str, List[float]] = {name: [] for name in self._gauges_info}
+        alive = []
+        for ref in self._collectors:
+            collector = ref()
+            if collector is None:
+                continue
+            alive.append(ref)
+            for name, value in collector():
+                reported.setdefault(name, []).append(value)
+        self._collectors = alive
+        gauges = {}
+        for name, values in reported.items():
+            aggregate = self._gauges_info.get(name, (None, sum))[1]
+            gauges[name] = aggregate(values) if values else 0
+        return gauges
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Pull API: counters and histograms keyed by label value, gauges as numbers."""
+        result: Dict[str, Any] = {}
+        for name, metric in self._metrics.items():
+            if isinstance(metric, Histogram):
+                result[name] = {label: {"count": sum(counts[:-1]), "sum": counts[-1],
+                                        "buckets": dict(zip(metric.buckets + (float("inf"),), counts[:-1]))}
+                                for label, counts in metric.values.items()}
+            else:
+                result[name] = dict(metric.values)
+        result.update(self._gauges())
+        return result
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4."""
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample, labels, value in metric.samples():
+                lines.append(f"{sample}{labels} {_format(value)}")
+        for name, value in self._gauges().items():
+            help = self._gauges_info.get(name, ("",))[0]
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        """Start an HTTP endpoint answering every request with :meth:`render`."""
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                request = await reader.readuntil(b"\r\n\r\n")
+                method, target = request.split(b" ", 2)[:2]
+                if target.split(b"?", 1)[0] != b"/metrics":
+                    status, body = "404 Not Found", b""
+                else:
+                    status, body = "200 OK", self.render().encode("utf-8")
+                head = (f"HTTP/1.1 {status}\r\n"
+                        "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                        f"Content-Length: {len(body)}\r\n"
+                        "Connection: close\r\n\r\n")
+                writer.write(head.encode("latin-1") + (body if method != b"HEAD" else b""))
+                await writer.drain()
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+                pass
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        logger.info(f"Metrics available at http://{host}:{port}/metrics")
+        return server
+
+metrics = Metrics()
@@ -1,5 +1,13 @@
-from .base import apply_middleware
+from .base import apply_middleware, compile_middleware, compile_message_middleware
+from .cache import ResultCache, cached, header_key, query_key, request_header
 
 __all__ = [
     "apply_middleware",
-]
\ No newline at end of file
+    "compile_middleware",
+    "compile_message_middleware",
+    "ResultCache",
+    "cached",
+    "header_key",
+    "query_key",
+    "request_header",
+]
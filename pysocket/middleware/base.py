@@ -1,8 +1,42 @@
-from typing import Callable, List
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
 from ..connectionEngine.connection import WebSocketConnection
 
+ConnectMiddleware = Callable[[WebSocketConnection, str], Awaitable[Any]]
+MessageMiddleware = Callable[[WebSocketConnection, str, Any], Awaitable[Any]]
+
 async def apply_middleware(connection: WebSocketConnection, path: str, middleware: List[Callable]) -> bool:
     for mw in middleware:
         if not await mw(connection, path):
             return False
-    return True
\ No newline at end of file
+    return True
+
+async def _allow(connection: WebSocketConnection, path: str) -> bool:
+    return True
+
+def _link(first: Callable, rest: Callable) -> Callable:
+    async def step(*args: Any) -> bool:
+        return bool(await first(*args)) and bool(await rest(*args))
+    return step
+
+def _compile(middleware: Sequence[Callable]) -> Optional[Callable]:
+    chain = None
+    for mw in reversed(middleware):
+        chain = mw if chain is None else _link(mw, chain)
+    return chain
+
+def compile_middleware(middleware: Sequence[ConnectMiddleware]) -> ConnectMiddleware:
+    """Fold connect-time middleware into one ``(connection, path)`` callable.
+
+    Each middleware runs in order and the first falsy result rejects the
+    connection. Built once when the server starts instead of walking the
+    list on every connect.
+    """
+    return _compile(middleware) or _allow
+
+def compile_message_middleware(middleware: Sequence[MessageMiddleware]) -> Optional[MessageMiddleware]:
+    """Fold per-message middleware into one ``(connection, event, data)`` callable.
+
+    A falsy result drops the event before it is dispatched. Returns ``None``
+    when there is no middleware so the dispatcher can skip the stage.
+    """
+    return _compile(middleware)
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from urllib.parse import parse_qs
+
+from ..connectionEngine.connection import WebSocketConnection
+
+KeyFunc = Callable[[WebSocketConnection, str], Optional[Hashable]]
+
+def request_header(connection: WebSocketConnection, name: str) -> Optional[str]:
+    """Read a request header from a raw connection or an ASGI scope."""
+    name = name.lower()
+    value = connection.headers.get(name)
+    if value is None:
+        scope = getattr(connection, 'scope', None)
+        if scope:
+            encoded = name.encode('latin-1')
+            for key, raw in scope.get('headers', ()):
+                if key.lower() == encoded:
+                    return raw.decode('latin-1')
+    return value
+
+def request_query(connection: WebSocketConnection, path: str) -> Dict[str, list]:
+    scope = getattr(connection, 'scope', None)
+    if scope is not None:
+        query = scope.get('query_string', b'').decode('latin-1')
+    else:
+        query = (connection.path or path or '').partition('?')[2]
+    return parse_qs(query)
+
+def header_key(*names: str) -> KeyFunc:
+    """Cache key built from request headers, e.g. ``header_key("authorization")``."""
+    def key(connection: WebSocketConnection, path: str) -> Optional[Tuple]:
+        values = tuple(request_header(connection, name) for name in names)
+        return None if all(value is None for value in values) else values
+    return key
+
+def query_key(*names: str) -> KeyFunc:
+    """Cache key built from query string parameters, e.g. ``query_key("token")``."""
+    def key(connection: WebSocketConnection, path: str) -> Optional[Tuple]:
+        query = request_query(connection, path)
+        values = tuple(query.get(name, [None])[0] for name in names)
+        return None if all(value is None for value in values) else values
+    return key
+
+class ResultCache:
+    """TTL + LRU cache of middleware results keyed per request.
+
+    Concurrent misses for the same key share one call, so a reconnect storm
+    with a single token hits the backend once. Entries expire after ``ttl``
+    seconds (``negative_ttl`` for falsy results; 0 disables caching them).
+    """
+
+    def __init__(self, ttl: float = 60.0, maxsize: int = 10000, negative_ttl: Optional[float] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    async def get_or_call(self, key: Hashable, call: Callable[[], Any]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+        pending = self._inflight.get(key)
+        while pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+            # The caller making the shared call was cancelled, so the next waiter makes it instead
+            pending = self._inflight.get(key)
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception retrieved for callers that never joined.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            ttl = self.ttl if result else self.negative_ttl
+            if ttl > 0:
+                self._entries[key] = (time.monotonic() + ttl, result)
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+            return result
+        finally:
+            del self._inflight[key]
+
+def cached(key: KeyFunc, ttl: float = 60.0, maxsize: int = 10000, negative_ttl: Optional[float] = None,
+           state_key: Optional[str] = None) -> Callable:
+    """Cache a connect-time middleware's result per request key.
+
+    The middleware's return value is cached as-is and its truthiness still
+    decides acceptance. With ``state_key`` the value is also stored in
+    ``connection.state`` on hits and misses alike, so data such as the
+    authenticated user survives caching. Requests whose key is ``None``
+    bypass the cache. The cache is exposed as ``middleware.cache``.
+    """
+    def decorator(middleware: Callable) -> Callable:
+        cache = ResultCache(ttl, maxsize, negative_ttl)
+
+        @wraps(middleware)
+        async def wrapped(connection: WebSocketConnection, path: str) -> Any:
+            cache_key = key(connection, path)
+            if cache_key is None:
+                result = await middleware(connection, path)
+            else:
+                result = await cache.get_or_call(cache_key, lambda: middleware(connection, path))
+            if state_key is not None:
+                connection.state[state_key] = result
+            return result
+        wrapped.cache = cache
+        return wrapped
+    return decorator
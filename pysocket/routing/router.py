@@ -1,9 +1,24 @@
 import re
 import logging
-from typing import Callable, Optional, List, Tuple, Any
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, List, Tuple, Any
 
 logger = logging.getLogger("pysocket.routing")
 
+_REGEX_SPECIAL = frozenset(".^$*+?{}[]()|\\")
+
+def _literal_prefix(pattern: str) -> str:
+    """Return the leading characters every path matching ``pattern`` starts with."""
+    if '|' in pattern:
+        return ''
+    end = 0
+    while end < len(pattern) and pattern[end] not in _REGEX_SPECIAL:
+        end += 1
+    # A quantifier applies to the preceding character, which may then be absent.
+    if end and end < len(pattern) and pattern[end] in '*?{':
+        end -= 1
+    return pattern[:end]
+
 class Route:
     def __init__(self, pattern: str, callback: Callable):
         try:
@@ -14,36 +29,81 @@ class Route:
             pattern = f'^{pattern.lstrip("/")}'
             self.pattern = re.compile(pattern)
             self.callback = callback
+            self.prefix = _literal_prefix(pattern[1:])
             logger.debug(f"Created Route with pattern {self.pattern.pattern}")
         except re.error as e:
             logger.error(f"Invalid regex pattern {pattern}: {e}")
             raise
 
-class WebSocketRouter:
+class _PrefixNode:
+    __slots__ = ("children", "routes")
+
     def __init__(self):
+        self.children: Dict[str, "_PrefixNode"] = {}
+        self.routes: List[int] = []
+
+class WebSocketRouter:
+    def __init__(self, cache_size: int = 1024):
         self.routes: List[Tuple[re.Pattern, Callable]] = []
         self.logger = logger
+        self.cache_size = cache_size
+        self._compiled: List[Route] = []
+        self._root = _PrefixNode()
+        self._cache: "OrderedDict[str, Optional[Tuple[Callable, Dict[str, Any]]]]" = OrderedDict()
 
     def add_route(self, pattern: str, callback: Callable) -> None:
         try:
             route = Route(pattern, callback)
+            node = self._root
+            for char in route.prefix:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _PrefixNode()
+                node = child
+            node.routes.append(len(self._compiled))
+            self._compiled.append(route)
             self.routes.append((route.pattern, route.callback))
+            self._cache.clear()
             self.logger.info(f"Added route with pattern {pattern} -> {callback.__name__}")
         except Exception as e:
             self.logger.error(f"Failed to add route with pattern {pattern}: {e}")
             raise
 
-    def resolve(self, path: str) -> Optional[Callable]:
-        self.logger.debug(f"Resolving path: {path} (raw: {repr(path)})")
+    def match(self, path: str) -> Optional[Tuple[Callable, Dict[str, Any]]]:
+        """Resolve ``path`` to ``(callback, kwargs)`` from the route's named groups.
+
+        Only routes whose literal prefix matches the path are tried, in the
+        order they were added, and results are kept in an LRU cache.
+        """
+        cache = self._cache
+        if path in cache:
+            cache.move_to_end(path)
+            return cache[path]
         # Normalize path to remove leading slash for matching
         normalized_path = path.lstrip('/')
-        self.logger.debug(f"Normalized path: {normalized_path}")
-        for pattern, callback in self.routes:
-            self.logger.debug(f"Trying pattern: {pattern.pattern}")
-            match = pattern.match(normalized_path)
-            self.logger.debug(f"Match result for {normalized_path} against {pattern.pattern}: {match}")
+        candidates = list(self._root.routes)
+        node = self._root
+        for char in normalized_path:
+            node = node.children.get(char)
+            if node is None:
+                break
+            candidates.extend(node.routes)
+        if len(candidates) > 1:
+            candidates.sort()
+        result = None
+        for index in candidates:
+            route = self._compiled[index]
+            match = route.pattern.match(normalized_path)
             if match:
-                self.logger.info(f"Resolved path {path} to callback {callback.__name__}")
-                return callback
-        self.logger.warning(f"No route found for path {path}")
-        return None
\ No newline at end of file
+                result = (route.callback, match.groupdict())
+                break
+        if result is None:
+            self.logger.warning(f"No route found for path {path}")
+        cache[path] = result
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return result
+
+    def resolve(self, path: str) -> Optional[Callable]:
+        result = self.match(path)
+        return result[0] if result else None
@@ -1,7 +1,28 @@
-from .socketServer import PySocketServer
+from .socketServer import CallError, Failed, PySocketServer
 from .consumer import WebSocketConsumer
+from .rooms import RoomRegistry
+from .history import RoomHistory
+from .roomstate import RoomStates, apply_delta, diff
+from .topics import TopicTrie
+from .bridge import EmitBridge
+from .dispatch import offload
+from .ratelimit import TokenBucket
+from .schema import Schema, SchemaError
 
 __all__ = [
     "PySocketServer",
+    "CallError",
+    "Failed",
     "WebSocketConsumer",
+    "RoomRegistry",
+    "RoomHistory",
+    "RoomStates",
+    "diff",
+    "apply_delta",
+    "TopicTrie",
+    "EmitBridge",
+    "offload",
+    "TokenBucket",
+    "Schema",
+    "SchemaError",
 ]
\ No newline at end of file
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Optional, Tuple
+
+logger = logging.getLogger("pysocket.bridge")
+
+class EmitBridge:
+    """Emits from threads outside the event loop, e.g. Django views and workers.
+
+    :meth:`emit` appends to a deque, which is atomic under the GIL, and
+    wakes the loop only when no drain is already scheduled. A burst of
+    calls from many threads therefore costs one wakeup. The loop then
+    delivers up to ``max_batch`` emits per callback.
+
+    ``data`` is encoded on the loop thread, so callers must not mutate it
+    after emitting. Emits made before the server has started are held and
+    delivered once it does.
+    """
+
+    def __init__(self, server, max_batch: int = 1024):
+        self.server = server
+        self.max_batch = max_batch
+        self._queue: Deque[Tuple[str, Any, Optional[str], Any]] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._scheduled = False
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        # A drain scheduled on a previous loop that stopped will never run
+        if self._queue:
+            self._scheduled = True
+            loop.call_soon_threadsafe(self._drain)
+
+    def emit(self, event: str, data: Any, room: Optional[str] = None, to=None) -> None:
+        self._queue.append((event, data, room, to))
+        # Racing threads may both schedule a drain; the spare one finds the queue empty.
+        if not self._scheduled:
+            loop = self._loop
+            if loop is not None:
+                self._scheduled = True
+                try:
+                    loop.call_soon_threadsafe(self._drain)
+                except RuntimeError:
+                    # Loop closed; keep the emit for the next attach
+                    self._scheduled = False
+
+    def _drain(self) -> None:
+        # Cleared before draining so an emit landing after the last pop schedules again.
+        self._scheduled = False
+        queue = self._queue
+        emit = self.server._emit
+        for _ in range(min(len(queue), self.max_batch)):
+            event, data, room, to = queue.popleft()
+            try:
+                emit(event, data, room, to)
+            except Exception as e:
+                logger.error(f"Bridged emit of {event} failed: {e}")
+        if queue and not self._scheduled:
+            self._scheduled = True
+            self._loop.call_soon(self._drain)
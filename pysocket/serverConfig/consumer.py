@@ -1,14 +1,58 @@
+import inspect
 import logging
-from typing import Any
-from ..serverConfig.socketServer import PySocketServer
+import sys
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from ..serverConfig.socketServer import Failed, PySocketServer
+from .schema import SchemaError, schema_of
 from ..connectionEngine.connection import WebSocketConnection
+from ..metrics import metrics
+from ..settings import settings
 
 logger = logging.getLogger("pysocket.consumer")
 
+def _without_instance(func: Callable) -> Callable:
+    # Static and class methods come out of getattr already bound, or needing no instance
+    async def handler(self, data: Any) -> Any:
+        return await func(data)
+    return handler
+
 class WebSocketConsumer:
-    def __init__(self, connection: WebSocketConnection, server: PySocketServer):
+    """Per-connection event handlers: ``handle_<event>(self, data)`` handles ``<event>``.
+
+    The event -> handler table is built once per class, when it is defined,
+    so dispatching an event is a single dict lookup. A handler whose data
+    parameter is annotated with a :class:`~.schema.Schema` receives the
+    decoded object; payloads that do not match are rejected before it runs.
+    """
+
+    # event name -> (handler function, payload schema or None)
+    handlers: Dict[str, Tuple[Callable, Optional[type]]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        cls.handlers = cls._build_handlers()
+
+    @classmethod
+    def _build_handlers(cls) -> Dict[str, Tuple[Callable, Optional[type]]]:
+        handlers = {}
+        for name in dir(cls):
+            if not name.startswith("handle_") or name == "handle_event":
+                continue
+            func = getattr(cls, name)
+            if not callable(func):
+                continue
+            schema = schema_of(func)
+            if isinstance(inspect.getattr_static(cls, name), (staticmethod, classmethod)):
+                func = _without_instance(func)
+            handlers[sys.intern(name[len("handle_"):])] = (func, schema)
+        return handlers
+
+    def __init__(self, connection: WebSocketConnection, server: PySocketServer, **kwargs: Any):
         self.connection = connection
         self.server = server
+        # Named groups captured by the route that resolved this consumer
+        self.url_kwargs = kwargs
         self.logger = logger
 
     async def connect(self):
@@ -18,16 +62,32 @@ class WebSocketConsumer:
         self.logger.debug(f"Consumer disconnected for {id(self.connection)}")
 
     async def handle_event(self, event: str, data: Any):
-        handler = getattr(self, f"handle_{event}", None)
-        if handler:
-            self.logger.debug(f"Handling event {event} with data {data}")
-            await handler(data)
-        else:
+        entry = self.handlers.get(event)
+        if entry is None:
             self.logger.warning(f"No handler for event {event}")
             await self.server.emit("error", {
                 "message": f"Unknown event: {event}"
             }, to=self.connection)
+            return Failed(f"Unknown event: {event}")
+        handler, schema = entry
+        if schema is not None:
+            data = schema.validate(data)
+            if type(data) is SchemaError:
+                message = f"Invalid {event}: {data}"
+                self.logger.debug("Rejected event from %d: %s", id(self.connection), message)
+                await self.server.emit("error", {"message": message}, to=self.connection)
+                return Failed(message)
+        self.logger.debug("Handling event %s with data %r", event, data)
+        if not settings.METRICS:
+            return await handler(self, data)
+        started = time.perf_counter()
+        try:
+            return await handler(self, data)
+        finally:
+            metrics.handler_seconds.observe(time.perf_counter() - started, event)
 
     async def handle_message(self, data):
         self.logger.info(f"Default handle_message received: {data}")
-        await self.server.emit("echo", data, to=self.connection)
\ No newline at end of file
+        await self.server.emit("echo", data, to=self.connection)
+
+WebSocketConsumer.handlers = WebSocketConsumer._build_handlers()
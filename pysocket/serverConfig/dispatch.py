@@ -0,0 +1,122 @@
+import asyncio
+import importlib
+import inspect
+import logging
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Optional, Set, Union
+
+from ..settings import settings
+
+logger = logging.getLogger("pysocket.dispatch")
+
+ORDERED = "ordered"
+PER_EVENT = "per_event"
+CONCURRENT = "concurrent"
+
+class Dispatcher:
+    """Runs one connection's handlers according to a dispatch mode.
+
+    ``per_event`` keeps events with the same name in order while different
+    names run side by side; ``concurrent`` runs every event in its own task.
+    Both cap the handlers in flight at ``max_in_flight``; once the cap is hit,
+    :meth:`dispatch` waits, which stops the connection's read loop and pushes
+    back on the client. ``ordered`` connections need no dispatcher at all.
+    """
+
+    def __init__(self, mode: str, max_in_flight: int):
+        if mode not in (PER_EVENT, CONCURRENT):
+            raise ValueError(f"Unknown dispatch mode: {mode}")
+        self.mode = mode
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks: Set[asyncio.Task] = set()
+        self._queues: Dict[Any, Deque] = {}
+
+    async def dispatch(self, key: Any, handler: Callable, *args: Any) -> None:
+        await self._slots.acquire()
+        if self.mode == CONCURRENT:
+            self._spawn(self._run(handler, args))
+            return
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._spawn(self._run_queue(key, queue))
+        queue.append((handler, args))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, handler: Callable, args: tuple) -> None:
+        try:
+            await handler(*args)
+        except Exception as e:
+            logger.error(f"Unhandled error in handler {getattr(handler, '__name__', handler)}: {e}")
+        finally:
+            self._slots.release()
+
+    async def _run_queue(self, key: Any, queue: Deque) -> None:
+        try:
+            while queue:
+                handler, args = queue.popleft()
+                await self._run(handler, args)
+        finally:
+            del self._queues[key]
+
+    async def close(self, timeout: Optional[float] = None) -> None:
+        """Wait for in-flight handlers, cancelling any still running after ``timeout``."""
+        if not self._tasks:
+            return
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_executor(kind: Union[str, Executor]) -> Executor:
+    global _thread_pool, _process_pool
+    if isinstance(kind, Executor):
+        return kind
+    if kind == "thread":
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(settings.EXECUTOR_THREADS, thread_name_prefix="pysocket")
+        return _thread_pool
+    if kind == "process":
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(settings.EXECUTOR_PROCESSES)
+        return _process_pool
+    raise ValueError(f"Unknown executor: {kind}")
+
+def _call_by_name(module: str, qualname: str, data: Any) -> Any:
+    # Runs in a worker process: look the handler up again and call the
+    # function it decorates, since the wrapper itself cannot be pickled.
+    target = importlib.import_module(module)
+    for part in qualname.split('.'):
+        target = getattr(target, part)
+    return inspect.unwrap(target)(data)
+
+def offload(executor: Union[str, Executor] = "thread") -> Callable:
+    """Run a synchronous handler in a thread or process pool.
+
+    The decorated function receives only the event data and must not touch
+    the connection or server; its return value becomes the handler's
+    result. Process-pool handlers must be defined at module or class level
+    so worker processes can import them. Works on ``PySocketServer.on``
+    handlers (or pass ``executor=`` to ``on``) and ``WebSocketConsumer``
+    ``handle_*`` methods, which are then written without ``self``.
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapped(*args: Any) -> Any:
+            pool = get_executor(executor)
+            data = args[-1]
+            loop = asyncio.get_running_loop()
+            if isinstance(pool, ProcessPoolExecutor):
+                return await loop.run_in_executor(pool, _call_by_name, func.__module__, func.__qualname__, data)
+            return await loop.run_in_executor(pool, func, data)
+        wrapped.offloaded = True
+        return wrapped
+    return decorator
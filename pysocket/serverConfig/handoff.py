@@ -0,0 +1,138 @@
+import array
+import asyncio
+import logging
+import os
+import socket
+from typing import Callable, List, Optional
+
+logger = logging.getLogger("pysocket.handoff")
+
+_SOCKETS = b"S"  # followed by the descriptors as SCM_RIGHTS ancillary data
+_READY = b"R"
+_MAX_SOCKETS = 16
+
+def send_sockets(channel: socket.socket, fds: List[int]) -> None:
+    """Pass open descriptors over a connected Unix socket; the receiver gets duplicates."""
+    channel.sendmsg([_SOCKETS], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))])
+
+def receive_sockets(channel: socket.socket) -> List[socket.socket]:
+    fds = array.array("i")
+    message, ancdata, _, _ = channel.recvmsg(1, socket.CMSG_SPACE(_MAX_SOCKETS * fds.itemsize))
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - len(data) % fds.itemsize])
+    if message != _SOCKETS:
+        for fd in fds:
+            os.close(fd)
+        raise ConnectionError("Handoff channel closed before sockets were sent")
+    return [socket.socket(fileno=fd) for fd in fds]
+
+class ListenerHandoff:
+    """Hands listening sockets from a running server to its replacement.
+
+    The running process listens on a Unix socket at ``path``. A replacement
+    started with the same path connects there at startup and receives the
+    listening sockets themselves, so the port stays open across the restart
+    and no connection attempt is refused. Once the replacement serves on
+    them it reports :meth:`ready`, and the old process calls ``on_handoff``
+    to stop accepting and drain. The replacement takes over ``path`` for
+    the next restart.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0, on_handoff: Optional[Callable[[], None]] = None):
+        if not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("Listener handoff requires Unix domain sockets")
+        self.path = path
+        self.timeout = timeout
+        self.on_handoff = on_handoff
+        self.handed_off = False
+        self._channel: Optional[socket.socket] = None
+        self._listener: Optional[socket.socket] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def receive(self) -> List[socket.socket]:
+        """Take the listening sockets of the server at ``path``; empty if none is running.
+
+        Blocks for up to ``timeout``, so call it from an executor when a loop is running.
+        """
+        if not os.path.exists(self.path):
+            return []
+        channel = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        channel.settimeout(self.timeout)
+        try:
+            channel.connect(self.path)
+            sockets = receive_sockets(channel)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Left behind by a process that did not shut down cleanly
+            channel.close()
+            return []
+        except OSError as e:
+            channel.close()
+            logger.warning(f"Handoff from {self.path} failed, binding afresh: {e}")
+            return []
+        self._channel = channel
+        logger.info(f"Received {len(sockets)} listening sockets from {self.path}")
+        return sockets
+
+    async def ready(self, fds: List[int]) -> None:
+        """Release the previous server, if sockets came from one, and offer ``fds`` to the next."""
+        loop = asyncio.get_running_loop()
+        channel, self._channel = self._channel, None
+        if channel is not None:
+            channel.setblocking(False)
+            try:
+                await loop.sock_sendall(channel, _READY)
+                # The previous server closes the channel once it has given up ``path``
+                await asyncio.wait_for(loop.sock_recv(channel, 1), self.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"Previous server did not confirm the handoff: {e}")
+            finally:
+                channel.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        listener.listen()
+        listener.setblocking(False)
+        self._listener = listener
+        self._task = asyncio.ensure_future(self._offer(listener, fds))
+
+    async def _offer(self, listener: socket.socket, fds: List[int]) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            channel, _ = await loop.sock_accept(listener)
+            try:
+                send_sockets(channel, fds)
+                reply = await asyncio.wait_for(loop.sock_recv(channel, 1), self.timeout)
+                if reply == _READY:
+                    # Unlink before the replacement binds ``path`` in its turn
+                    self._close_listener()
+                    self.handed_off = True
+                    logger.info(f"Listening sockets handed off through {self.path}")
+                    if self.on_handoff is not None:
+                        self.on_handoff()
+                    return
+                logger.warning("Replacement went away before taking over; still serving")
+            except (OSError, asyncio.TimeoutError) as e:
+                logger.warning(f"Handoff through {self.path} failed: {e}")
+            finally:
+                channel.close()
+
+    def _close_listener(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._close_listener()
+        if self._channel is not None:
+            self._channel.close()
+            self._channel = None
@@ -0,0 +1,95 @@
+import secrets
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple, Union
+
+from ..codecs import Codec
+
+Message = Union[str, bytes]
+
+class _Ring:
+    __slots__ = ("entries", "bytes", "floor")
+
+    def __init__(self, floor: int):
+        self.entries: Deque[Tuple[int, Message]] = deque()
+        self.bytes = 0
+        # Highest sequence id that may have been emitted to the room but is not retained
+        self.floor = floor
+
+class RoomHistory:
+    """Recent room emits, encoded once, for clients resuming after a reconnect.
+
+    Sequence ids come from one counter per process, so they increase within
+    every room. The counter starts at a random offset. An id issued by a
+    different worker or an earlier run then almost never falls inside a
+    room's window, and resuming from it reports a gap instead of replaying
+    the wrong messages.
+
+    Each room keeps at most ``size`` messages and ``room_bytes`` encoded
+    bytes. When all rooms together pass ``max_bytes``, the rooms written
+    least recently are dropped whole.
+    """
+
+    def __init__(self, codec: Codec, size: int, room_bytes: int, max_bytes: int):
+        self.codec = codec
+        self.size = size
+        self.room_bytes = room_bytes
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._start = self._seq = secrets.randbits(52)
+        # Highest sequence id among dropped rooms, which any resume must be at or past
+        self._evicted = self._start
+        self._rooms: "OrderedDict[str, _Ring]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def record(self, room: str, seq: int, message: Message) -> None:
+        ring = self._rooms.get(room)
+        if ring is None:
+            # Anything this room was sent before is at or below the eviction mark
+            ring = self._rooms[room] = _Ring(self._evicted)
+        else:
+            self._rooms.move_to_end(room)
+        entries = ring.entries
+        entries.append((seq, message))
+        size = len(message)
+        ring.bytes += size
+        self.bytes += size
+        while len(entries) > self.size or ring.bytes > self.room_bytes:
+            self._trim(ring)
+        while self.bytes > self.max_bytes and self._rooms:
+            _, evicted = self._rooms.popitem(last=False)
+            self._drop(evicted)
+
+    def _trim(self, ring: _Ring) -> None:
+        seq, message = ring.entries.popleft()
+        ring.floor = seq
+        ring.bytes -= len(message)
+        self.bytes -= len(message)
+
+    def since(self, room: str, seq: int) -> Optional[List[Message]]:
+        """Messages emitted to ``room`` after ``seq``, or ``None`` if some are no longer held."""
+        if not self._start <= seq <= self._seq:
+            return None
+        ring = self._rooms.get(room)
+        if ring is None:
+            # Quiet since this process started, or dropped before ``seq`` was sent
+            return [] if seq >= self._evicted else None
+        if seq < ring.floor:
+            return None
+        return [message for entry_seq, message in ring.entries if entry_seq > seq]
+
+    def discard(self, room: str) -> None:
+        ring = self._rooms.pop(room, None)
+        if ring is not None:
+            self._drop(ring)
+
+    def _drop(self, ring: _Ring) -> None:
+        self.bytes -= ring.bytes
+        last = ring.entries[-1][0] if ring.entries else ring.floor
+        if last > self._evicted:
+            self._evicted = last
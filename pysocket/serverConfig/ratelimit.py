@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("pysocket.ratelimit")
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``burst``.
+
+    Refilled lazily from the elapsed time on each :meth:`take`, so a bucket
+    is four floats and a check is one clock read and some arithmetic.
+    """
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+
+    def take(self, count: float = 1) -> bool:
+        now = time.monotonic()
+        tokens = self.tokens + (now - self.stamp) * self.rate
+        self.stamp = now
+        if tokens > self.burst:
+            tokens = self.burst
+        if tokens < count:
+            self.tokens = tokens
+            return False
+        self.tokens = tokens - count
+        return True
+
+class KeyedBuckets:
+    """One :class:`TokenBucket` per key, created on first use.
+
+    A bucket that has refilled completely behaves exactly like a new one,
+    so such buckets are swept whenever the table doubles in size. Keys that
+    go quiet are forgotten without the caller having to report them.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, min_prune: int = 1024):
+        self.rate = rate
+        self.burst = burst
+        self.min_prune = min_prune
+        self._prune_at = min_prune
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def take(self, key: str, count: float = 1) -> bool:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._prune_at:
+                self._prune()
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        return bucket.take(count)
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        self._buckets = {key: bucket for key, bucket in self._buckets.items()
+                         if bucket.tokens + (now - bucket.stamp) * bucket.rate < bucket.burst}
+        self._prune_at = max(self.min_prune, 2 * len(self._buckets))
+
+class LoopMonitor:
+    """Tracks how late the event loop runs a callback scheduled every ``interval``.
+
+    :attr:`overloaded` is set while the measured lag exceeds ``limit``; the
+    server then refuses new connections and sheds inbound events until the
+    loop catches up.
+    """
+
+    def __init__(self, limit: float, interval: float = 0.1):
+        self.limit = limit
+        self.interval = interval
+        self.lag = 0.0
+        self.overloaded = False
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._expected = 0.0
+
+    def start(self) -> None:
+        if self._handle is None:
+            loop = asyncio.get_running_loop()
+            self._expected = loop.time() + self.interval
+            self._handle = loop.call_at(self._expected, self._check)
+
+    def stop(self) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self.lag = 0.0
+        self.overloaded = False
+
+    def _check(self) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        self.lag = max(0.0, now - self._expected)
+        overloaded = self.lag > self.limit
+        if overloaded != self.overloaded:
+            self.overloaded = overloaded
+            if overloaded:
+                logger.warning(f"Event loop lag {self.lag:.3f}s exceeds {self.limit}s, shedding load")
+            else:
+                logger.info(f"Event loop lag back to {self.lag:.3f}s, accepting load")
+        self._expected = now + self.interval
+        self._handle = loop.call_at(self._expected, self._check)
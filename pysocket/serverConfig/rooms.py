@@ -0,0 +1,73 @@
+from typing import AbstractSet, Dict, Hashable, Iterator, List, Set
+
+_EMPTY: AbstractSet = frozenset()
+
+class RoomRegistry:
+    """Room membership with a reverse connection -> rooms index.
+
+    Reads never create rooms, and a room is dropped as soon as its last
+    member leaves, so memory tracks the rooms that are actually in use.
+    """
+
+    def __init__(self):
+        self._rooms: Dict[str, Set[Hashable]] = {}
+        self._memberships: Dict[Hashable, Set[str]] = {}
+
+    def join(self, connection, room: str) -> int:
+        members = self._rooms.get(room)
+        if members is None:
+            members = self._rooms[room] = set()
+        members.add(connection)
+        joined = self._memberships.get(connection)
+        if joined is None:
+            joined = self._memberships[connection] = set()
+        joined.add(room)
+        return len(members)
+
+    def leave(self, connection, room: str) -> int:
+        joined = self._memberships.get(connection)
+        if joined is None or room not in joined:
+            return len(self._rooms.get(room, _EMPTY))
+        joined.discard(room)
+        if not joined:
+            del self._memberships[connection]
+        return self._discard(connection, room)
+
+    def leave_all(self, connection) -> List[str]:
+        joined = self._memberships.pop(connection, None)
+        if not joined:
+            return []
+        for room in joined:
+            self._discard(connection, room)
+        return list(joined)
+
+    def _discard(self, connection, room: str) -> int:
+        members = self._rooms.get(room)
+        if members is None:
+            return 0
+        members.discard(connection)
+        if not members:
+            del self._rooms[room]
+            return 0
+        return len(members)
+
+    def members(self, room: str) -> AbstractSet:
+        return self._rooms.get(room, _EMPTY)
+
+    def size(self, room: str) -> int:
+        return len(self._rooms.get(room, _EMPTY))
+
+    def rooms_of(self, connection) -> AbstractSet[str]:
+        return self._memberships.get(connection, _EMPTY)
+
+    def is_member(self, connection, room: str) -> bool:
+        return room in self._memberships.get(connection, _EMPTY)
+
+    def __contains__(self, room: str) -> bool:
+        return room in self._rooms
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rooms)
@@ -0,0 +1,172 @@
+import copy
+from typing import Any, Dict, List, Optional, Union
+
+from ..codecs import Codec
+
+Message = Union[str, bytes]
+
+# Event carrying {"room", "version"} plus "state" (a snapshot) or "delta" (a list of ops)
+STATE_EVENT = "state"
+
+def diff(old: Any, new: Any) -> List[list]:
+    """Ops turning ``old`` into ``new``.
+
+    ``["set", path, value]`` replaces or adds, ``["del", path]`` removes and
+    ``["ext", path, items]`` appends to a list. A path is the list of keys
+    and indices from the root. Containers whose changes would take more ops
+    than they have entries are replaced whole.
+    """
+    ops: List[list] = []
+    _diff(old, new, [], ops)
+    return ops
+
+def _diff(old: Any, new: Any, path: list, ops: List[list]) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes: List[list] = []
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, path + [key], changes)
+            else:
+                changes.append(["set", path + [key], value])
+        for key in old:
+            if key not in new:
+                changes.append(["del", path + [key]])
+    elif isinstance(old, list) and isinstance(new, list) and len(new) >= len(old):
+        changes = []
+        for index, value in enumerate(old):
+            _diff(value, new[index], path + [index], changes)
+        if len(new) > len(old):
+            changes.append(["ext", path, new[len(old):]])
+    elif type(old) is type(new) and old == new:
+        return
+    else:
+        ops.append(["set", path, new])
+        return
+    if path and len(changes) > len(new):
+        ops.append(["set", path, new])
+    else:
+        ops.extend(changes)
+
+def apply_delta(state: Any, ops: List[list], copy_values: bool = False) -> Any:
+    """Apply ops from :func:`diff` in place and return the (possibly replaced) root."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        value = op[2] if len(op) > 2 else None
+        if copy_values:
+            value = copy.deepcopy(value)
+        if kind not in ("set", "del", "ext"):
+            raise ValueError(f"Unknown state op: {kind!r}")
+        if kind == "ext":
+            target = state
+            for key in path:
+                target = target[key]
+            target.extend(value)
+            continue
+        if not path:
+            state = value
+            continue
+        parent = state
+        for key in path[:-1]:
+            parent = parent[key]
+        if kind == "set":
+            parent[path[-1]] = value
+        else:
+            del parent[path[-1]]
+    return state
+
+class _RoomState:
+    __slots__ = ("state", "version", "snapshot", "chain")
+
+    def __init__(self, state: Any):
+        self.state = state
+        self.version = 1
+        self.snapshot: Optional[Message] = None
+        # Encoded deltas emitted since ``snapshot`` was built
+        self.chain: List[Message] = []
+
+class RoomStates:
+    """Authoritative per-room state, changed by deltas.
+
+    The server keeps a private copy of each room's state. Updates are diffed
+    against it, and only the ops go out, encoded once per codec by the
+    usual room fan-out. Joining members get the state as a snapshot,
+    encoded once and cached, followed by the encoded deltas emitted since.
+    The snapshot is rebuilt on the next join once that chain passes
+    ``max_deltas``.
+    """
+
+    def __init__(self, codec: Codec, max_deltas: int = 64):
+        self.codec = codec
+        self.max_deltas = max_deltas
+        self._rooms: Dict[str, _RoomState] = {}
+
+    def __contains__(self, room: str) -> bool:
+        return room in self._rooms
+
+    def __len__(self) -> int:
+        return len(self._rooms)
+
+    def get(self, room: str) -> Any:
+        entry = self._rooms.get(room)
+        return None if entry is None else entry.state
+
+    def version(self, room: str) -> int:
+        entry = self._rooms.get(room)
+        return 0 if entry is None else entry.version
+
+    def update(self, room: str, state: Any) -> Optional[Dict[str, Any]]:
+        """Replace the room's state; returns the event data to broadcast, or ``None`` if nothing changed."""
+        entry = self._rooms.get(room)
+        if entry is None:
+            self._rooms[room] = _RoomState(copy.deepcopy(state))
+            return {"room": room, "version": 1, "state": state}
+        ops = diff(entry.state, state)
+        if not ops:
+            return None
+        # Ops from diff always apply, so the stored state is changed in place
+        return self._commit(room, entry, apply_delta(entry.state, ops, copy_values=True), ops)
+
+    def patch(self, room: str, ops: List[list]) -> Dict[str, Any]:
+        """Apply ops to the room's state; returns the event data to broadcast.
+
+        The ops apply all together or not at all: raises ``KeyError`` if the
+        room has no state and ``ValueError`` if any op fails, leaving the
+        state and version as they were.
+        """
+        entry = self._rooms.get(room)
+        if entry is None:
+            raise KeyError(f"Room {room!r} has no state to patch")
+        try:
+            state = apply_delta(copy.deepcopy(entry.state), ops, copy_values=True)
+        except Exception as e:
+            raise ValueError(f"Cannot apply state ops to room {room!r}: {e!r}") from None
+        return self._commit(room, entry, state, ops)
+
+    def _commit(self, room: str, entry: _RoomState, state: Any, ops: List[list]) -> Dict[str, Any]:
+        entry.state = state
+        entry.version += 1
+        data = {"room": room, "version": entry.version, "delta": ops}
+        if entry.snapshot is not None:
+            if len(entry.chain) >= self.max_deltas:
+                entry.snapshot = None
+                entry.chain = []
+            else:
+                entry.chain.append(self.codec.encode({"event": STATE_EVENT, "data": data}))
+        return data
+
+    def join_messages(self, room: str, codec: Codec) -> List[Message]:
+        """Encoded snapshot and deltas that bring a new member up to date."""
+        entry = self._rooms.get(room)
+        if entry is None:
+            return []
+        if entry.snapshot is None:
+            entry.snapshot = self.codec.encode({"event": STATE_EVENT, "data": {
+                "room": room, "version": entry.version, "state": entry.state}})
+        messages = [entry.snapshot]
+        messages.extend(entry.chain)
+        if codec is not self.codec:
+            messages = [codec.encode(self.codec.decode(message)) for message in messages]
+        return messages
+
+    def discard(self, room: str) -> None:
+        self._rooms.pop(room, None)
@@ -0,0 +1,281 @@
+import inspect
+import sys
+import typing
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class SchemaError(ValueError):
+    """An event payload does not match the handler's :class:`Schema`."""
+    __slots__ = ("message", "path")
+
+    def __init__(self, message: str, path: Tuple[str, ...] = ()):
+        # BaseException.__new__ already keeps the arguments in ``args``
+        self.message = message
+        self.path = path
+
+    def within(self, key: Any) -> "SchemaError":
+        # Prefixes in place as the error is handed back out of nested values
+        self.path = (str(key),) + self.path
+        return self
+
+    def __str__(self) -> str:
+        return f"{'.'.join(self.path)}: {self.message}" if self.path else self.message
+
+_MISSING = object()
+
+# Checkers and generated validators return a SchemaError instead of raising
+# it, so a rejected payload costs no raise/catch per level of nesting.
+
+def _expected(name: str, value: Any) -> SchemaError:
+    return SchemaError(f"expected {name}, got {type(value).__name__}")
+
+def _check_type(kind: type) -> Callable[[Any], Any]:
+    def check(value: Any) -> Any:
+        # bool is an int subclass, but True is not a valid count
+        if type(value) is kind or (isinstance(value, kind) and type(value) is not bool):
+            return value
+        return _expected(kind.__name__, value)
+    return check
+
+def _check_float(value: Any) -> Any:
+    kind = type(value)
+    if kind is float:
+        return value
+    if kind is int:
+        return float(value)
+    return _expected("float", value)
+
+def _check_any(value: Any) -> Any:
+    return value
+
+def _compile(hint: Any) -> Callable[[Any], Any]:
+    """A ``check(value)`` returning the decoded value or a :class:`SchemaError`."""
+    if hint is Any or hint is object:
+        return _check_any
+    if hint is float:
+        return _check_float
+    if isinstance(hint, type) and issubclass(hint, Schema):
+        return hint._validator()
+    origin = typing.get_origin(hint)
+    args = typing.get_args(hint)
+    if origin is typing.Union:
+        options = [arg for arg in args if arg is not type(None)]
+        check = _compile(options[0]) if len(options) == 1 else _union(options)
+        if len(options) == len(args):
+            return check
+        return lambda value: None if value is None else check(value)
+    if origin is list:
+        item = _compile(args[0]) if args else _check_any
+
+        def check_list(value: Any) -> Any:
+            if type(value) is not list:
+                return _expected("list", value)
+            if item is _check_any:
+                return value
+            decoded = []
+            for index, entry in enumerate(value):
+                entry = item(entry)
+                if type(entry) is SchemaError:
+                    return entry.within(index)
+                decoded.append(entry)
+            return decoded
+        return check_list
+    if origin is dict:
+        entry = _compile(args[1]) if args else _check_any
+
+        def check_dict(value: Any) -> Any:
+            if type(value) is not dict:
+                return _expected("object", value)
+            if entry is _check_any:
+                return value
+            decoded = {}
+            for key, item in value.items():
+                item = entry(item)
+                if type(item) is SchemaError:
+                    return item.within(key)
+                decoded[key] = item
+            return decoded
+        return check_dict
+    if isinstance(hint, type):
+        return _check_type(hint)
+    raise TypeError(f"Unsupported schema field type: {hint!r}")
+
+def _union(options: List[Any]) -> Callable[[Any], Any]:
+    checks = [_compile(option) for option in options]
+    names = " or ".join(getattr(option, "__name__", str(option)) for option in options)
+
+    def check(value: Any) -> Any:
+        for option in checks:
+            decoded = option(value)
+            if type(decoded) is not SchemaError:
+                return decoded
+        return _expected(names, value)
+    return check
+
+def _raising(validate: Callable[[Any], Any]) -> Callable[[Any], "Schema"]:
+    def decode(data: Any) -> "Schema":
+        result = validate(data)
+        if type(result) is SchemaError:
+            raise result
+        return result
+    return decode
+
+def _decode_first(cls, data: Any) -> "Schema":
+    """Validate ``data`` and build an instance, raising :class:`SchemaError` on mismatch."""
+    cls._validator()
+    return cls.decode(data)
+
+def _validate_first(cls, data: Any) -> Any:
+    """Validate ``data`` and build an instance, or return the :class:`SchemaError`."""
+    return cls._validator()(data)
+
+class _SchemaMeta(type):
+    def __new__(mcs, name, bases, namespace):
+        annotations = [field for field in namespace.get("__annotations__", {}) if not field.startswith("_")]
+        # Defaults move out of the class body, where they would clash with the slots
+        defaults = {field: namespace.pop(field) for field in annotations if field in namespace}
+        namespace["__slots__"] = tuple(annotations)
+        cls = super().__new__(mcs, name, bases, namespace)
+        fields: Dict[str, Any] = {}
+        for base in reversed(cls.__mro__[1:]):
+            fields.update(getattr(base, "_defaults", {}))
+        for field in annotations:
+            fields[field] = defaults.get(field, _MISSING)
+        cls._defaults = fields
+        # Replaced by the generated decoder on first use
+        cls.decode = classmethod(_decode_first)
+        cls.validate = classmethod(_validate_first)
+        return cls
+
+class Schema(metaclass=_SchemaMeta):
+    """Typed, slotted payload for an event handler.
+
+    Declare fields as annotations, optionally with defaults::
+
+        class Join(Schema):
+            room: str
+            since: Optional[int] = None
+
+    Annotating a handler's data parameter with a schema, as in
+    ``async def join(ws, data: Join)`` or
+    ``async def handle_join(self, data: Join)``, decodes the payload into
+    an instance before the handler runs. A payload that does not match is
+    answered with an ``"error"`` event and never reaches the handler.
+    Supported field types are ``str``, ``int``, ``float``, ``bool``,
+    ``list``, ``dict``, ``Any``, ``Optional``/``Union``, ``List[...]``,
+    ``Dict[str, ...]`` and nested schemas. Unknown keys are ignored.
+    ``Join.decode(data)`` does the same by hand, raising
+    :class:`SchemaError`; ``Join.validate(data)`` returns the error instead.
+    """
+
+    def __init__(self, **values: Any):
+        for field, default in self._defaults.items():
+            value = values.get(field, default)
+            if value is _MISSING:
+                raise TypeError(f"{type(self).__name__} missing field {field!r}")
+            setattr(self, field, value)
+
+    @classmethod
+    def _validator(cls) -> Callable[[Any], Any]:
+        validate = cls.__dict__.get("validate")
+        if isinstance(validate, staticmethod):
+            return validate.__func__
+        if cls.__dict__.get("_compiling"):
+            # A schema nested in itself; resolved per call
+            return lambda value: cls.validate(value)
+        cls._compiling = True
+        try:
+            validate = _generate_validator(cls)
+        finally:
+            cls._compiling = False
+        cls.validate = staticmethod(validate)
+        cls.decode = staticmethod(_raising(validate))
+        return validate
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: _encode(getattr(self, field)) for field in self._defaults}
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and all(
+            getattr(self, field) == getattr(other, field) for field in self._defaults)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._defaults)
+        return f"{type(self).__name__}({values})"
+
+# Types checked inline by generated decoders; anything else goes through its checker
+_EXACT = (str, int, float, bool, list, dict)
+
+def _inline_test(hint: Any, name: str) -> Tuple[Optional[str], Any]:
+    """An expression true when ``value`` already matches ``hint`` as is, and the type it names."""
+    if hint in _EXACT:
+        return f"type(value) is {name}", hint
+    if typing.get_origin(hint) is typing.Union:
+        args = typing.get_args(hint)
+        if len(args) == 2 and type(None) in args:
+            inner = args[0] if args[1] is type(None) else args[1]
+            if inner in _EXACT:
+                return f"value is None or type(value) is {name}", inner
+    return None, None
+
+def _generate_validator(cls: type) -> Callable[[Any], Any]:
+    # Annotations are resolved on first use so they may name schemas defined later
+    module = sys.modules.get(cls.__module__)
+    hints = typing.get_type_hints(cls, vars(module) if module else None)
+    env: Dict[str, Any] = {"cls": cls, "new": object.__new__, "MISSING": _MISSING,
+                           "SchemaError": SchemaError, "expected": _expected}
+    lines = [
+        "def validate(data):",
+        "    if type(data) is not dict:",
+        "        return expected('object', data)",
+        "    get = data.get",
+        "    instance = new(cls)",
+    ]
+    for index, (field, default) in enumerate(cls._defaults.items()):
+        hint = hints[field]
+        check = _compile(hint)
+        env[f"check{index}"] = check
+        env[f"default{index}"] = default
+        lines.append(f"    value = get({field!r}, MISSING)")
+        lines.append("    if value is MISSING:")
+        if default is _MISSING:
+            lines.append(f"        return SchemaError('missing field', ({field!r},))")
+        else:
+            lines.append(f"        value = default{index}")
+        if check is not _check_any:
+            test, env[f"type{index}"] = _inline_test(hint, f"type{index}")
+            lines.append(f"    elif not ({test}):" if test else "    else:")
+            lines.append(f"        value = check{index}(value)")
+            lines.append("        if type(value) is SchemaError:")
+            lines.append(f"            return value.within({field!r})")
+        lines.append(f"    instance.{field} = value")
+    lines.append("    return instance")
+    exec("\n".join(lines), env)
+    validate = env["validate"]
+    validate.__qualname__ = f"{cls.__qualname__}.validate"
+    return validate
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, Schema):
+        return value.to_dict()
+    if type(value) is list:
+        return [_encode(item) for item in value]
+    return value
+
+def schema_of(func: Callable) -> Optional[type]:
+    """The :class:`Schema` annotating ``func``'s last positional parameter, its event data."""
+    # Through decorators such as offload, which keep the original as __wrapped__
+    func = inspect.unwrap(func)
+    code = getattr(func, "__code__", None)
+    if code is None or not code.co_argcount or not getattr(func, "__annotations__", None):
+        return None
+    name = code.co_varnames[code.co_argcount - 1]
+    try:
+        hint = typing.get_type_hints(func).get(name)
+    except Exception:
+        # Unresolvable string annotations are left to the handler
+        return None
+    if isinstance(hint, type) and issubclass(hint, Schema):
+        return hint
+    return None
@@ -1,71 +1,468 @@
 import asyncio
-import json
+import itertools
 import logging
-from typing import Any, Callable, Dict, Optional, Set
-from collections import defaultdict
+import signal
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Union
 from functools import wraps
 from ..connectionEngine.connection import WebSocketConnection
+from ..connectionEngine import eventloop, protocol
+from ..connectionEngine.frames import CLOSE_POLICY_VIOLATION, CLOSE_SERVICE_RESTART
+from ..connectionEngine.heartbeat import Heartbeat
+from ..codecs import Codec, get_codec
+from .bridge import EmitBridge
+from .dispatch import ORDERED, Dispatcher, offload
+from .handoff import ListenerHandoff
+from .history import RoomHistory
+from .ratelimit import KeyedBuckets, LoopMonitor, TokenBucket
+from .rooms import RoomRegistry
+from .roomstate import STATE_EVENT, RoomStates
+from .schema import SchemaError, schema_of
+from .topics import TopicTrie
+from ..metrics import metrics
+from ..middleware.base import compile_middleware, compile_message_middleware
 from ..settings import settings
 
 logger = logging.getLogger("pysocket.server")
 
+_DRAIN_TICK = 0.01  # drain closes due within this many seconds go out together
+
+class CallError(Exception):
+    """The client answered a :meth:`PySocketServer.call` with an error."""
+
+class Failed:
+    """Return from a handler to answer its call with ``{"ack": id, "error": message}``.
+
+    Handlers registered with ``on`` also return one when they raise, and
+    both kinds of handler when the payload fails their schema.
+    """
+    __slots__ = ("message",)
+
+    def __init__(self, message: str):
+        self.message = message
+
 class PySocketServer:
-    def __init__(self):
+    def __init__(self, backplane=None):
         self.clients: Set[WebSocketConnection] = set()
-        self.rooms: Dict[str, Set[WebSocketConnection]] = defaultdict(set)
+        self.rooms = RoomRegistry()
+        self.topics = TopicTrie(settings.TOPIC_CACHE_SIZE)
         self.event_handlers: Dict[str, Callable] = {}
         self.logger = logger
+        self._started = False
         self.middleware = settings.MIDDLEWARE
+        self.message_middleware = settings.MESSAGE_MIDDLEWARE
+        self.bridge = EmitBridge(self, settings.BRIDGE_MAX_BATCH)
+        self._call_ids = itertools.count(1)
+        # Carries room emits to peer nodes or worker processes
+        self.backplane = backplane
+        self.heartbeat = None
+        if settings.PING_INTERVAL:
+            self.heartbeat = Heartbeat(settings.PING_INTERVAL, settings.PING_TIMEOUT, settings.HEARTBEAT_TICK)
+        # Admission control: connections holding a slot from handshake to cleanup
+        self._admitted = 0
+        self._draining = False
+        self._drained: Optional[asyncio.Event] = None
+        self.load = None
+        if settings.LOOP_LAG_LIMIT:
+            self.load = LoopMonitor(settings.LOOP_LAG_LIMIT, settings.LOOP_LAG_INTERVAL)
+        self.history = None
+        if settings.ROOM_HISTORY:
+            self.history = RoomHistory(get_codec(settings.CODEC), settings.ROOM_HISTORY,
+                                       settings.ROOM_HISTORY_BYTES, settings.HISTORY_MAX_BYTES)
+        self.states = RoomStates(get_codec(settings.CODEC), settings.ROOM_STATE_MAX_DELTAS)
+        self._room_limits = None
+        if settings.ROOM_RATE:
+            self._room_limits = KeyedBuckets(settings.ROOM_RATE, settings.ROOM_BURST)
+        metrics.add_collector(self._collect_metrics)
+
+    def on(self, event_name: str, executor=None) -> Callable:
+        """Register a handler for ``event_name``.
 
-    def on(self, event_name: str) -> Callable:
+        With ``executor`` ("thread", "process" or an ``Executor``) the handler
+        is a synchronous ``func(data)`` run off the event loop; see :func:`offload`.
+        Annotating the data parameter with a :class:`~.schema.Schema` decodes
+        the payload into it, rejecting malformed events before ``func`` runs.
+        """
         def wrapper(func: Callable) -> Callable:
+            schema = schema_of(func)
+            if executor is not None:
+                func = offload(executor)(func)
+
             @wraps(func)
             async def wrapped(ws: WebSocketConnection, data: Any):
+                if schema is not None:
+                    data = schema.validate(data)
+                    if type(data) is SchemaError:
+                        message = f"Invalid {event_name}: {data}"
+                        self.logger.debug("Rejected event from %d: %s", id(ws), message)
+                        await self.emit("error", {"message": message}, to=ws)
+                        return Failed(message)
+                started = time.perf_counter() if settings.METRICS else None
                 try:
                     return await func(ws, data)
                 except Exception as e:
                     self.logger.error(f"Error in handler {event_name}: {e}")
                     await self.emit("error", {"message": str(e)}, to=ws)
-            self.event_handlers[event_name] = wrapped
+                    return Failed(str(e))
+                finally:
+                    if started is not None:
+                        metrics.handler_seconds.observe(time.perf_counter() - started, event_name)
+            self.event_handlers[sys.intern(event_name)] = wrapped
             return wrapped
         return wrapper
 
-    def join_room(self, connection: WebSocketConnection, room: str) -> None:
-        self.rooms[room].add(connection)
-        self.logger.info(f"Client {id(connection)} joined room {room}. Room size: {len(self.rooms[room])}")
+    @property
+    def middleware(self) -> Sequence[Callable]:
+        """Connect-time middleware, ``async (connection, path) -> bool``, run in order.
+
+        The lists are folded into one callable each when the server starts
+        and become tuples then, so changing them in place afterwards raises.
+        Assign a new sequence, or use :meth:`add_middleware`, at any time.
+        """
+        return self._middleware
+
+    @middleware.setter
+    def middleware(self, middleware: Sequence[Callable]) -> None:
+        if self._started:
+            middleware = tuple(middleware)
+            self._connect_chain = compile_middleware(middleware)
+        self._middleware = middleware
+
+    @property
+    def message_middleware(self) -> Sequence[Callable]:
+        """Per-event middleware, ``async (connection, event, data) -> bool``; see :attr:`middleware`."""
+        return self._message_middleware
+
+    @message_middleware.setter
+    def message_middleware(self, middleware: Sequence[Callable]) -> None:
+        if self._started:
+            middleware = tuple(middleware)
+            self._message_chain = compile_message_middleware(middleware)
+        self._message_middleware = middleware
+
+    def add_middleware(self, func: Callable) -> Callable:
+        """Append connect-time middleware; usable as a decorator."""
+        self.middleware = list(self.middleware) + [func]
+        return func
+
+    def add_message_middleware(self, func: Callable) -> Callable:
+        """Append per-event middleware; usable as a decorator."""
+        self.message_middleware = list(self.message_middleware) + [func]
+        return func
+
+    async def start(self) -> None:
+        if not self._started:
+            self._started = True
+            # Compiles the chains and freezes the lists
+            self.middleware = self.middleware
+            self.message_middleware = self.message_middleware
+            if self.load is not None:
+                self.load.start()
+            self.bridge.attach(asyncio.get_running_loop())
+            if self.backplane is not None:
+                await self.backplane.start(self)
+
+    def admit(self) -> bool:
+        """Reserve a connection slot before the handshake completes.
+
+        Refuses while ``MAX_CONNECTIONS`` slots are taken or the event loop
+        is lagging past ``LOOP_LAG_LIMIT``. Each admitted connection must
+        give its slot back with :meth:`release`.
+        """
+        if self._draining:
+            reason = "draining"
+        elif self.load is not None and self.load.overloaded:
+            reason = "overload"
+        elif settings.MAX_CONNECTIONS is not None and self._admitted >= settings.MAX_CONNECTIONS:
+            reason = "capacity"
+        else:
+            self._admitted += 1
+            return True
+        if settings.METRICS:
+            metrics.rejected_connections.inc(label=reason)
+        self.logger.debug("Refused connection: %s", reason)
+        return False
+
+    def release(self) -> None:
+        self._admitted -= 1
+
+    def join_room(self, connection: WebSocketConnection, room: str, since: Optional[int] = None) -> bool:
+        """Add ``connection`` to ``room``.
+
+        With ``ROOM_HISTORY`` enabled, room envelopes carry ``room`` and
+        ``seq`` fields. Passing the last ``seq`` a client saw as ``since``
+        replays what it missed ahead of any new emits. Returns ``False`` if
+        the history no longer covers that gap; the client should then
+        reload its state. If the room has shared state (:meth:`set_state`),
+        a fresh member, or one that could not resume, is sent it first.
+        """
+        created = room not in self.rooms
+        size = self.rooms.join(connection, room)
+        if created and self.backplane is not None:
+            self.backplane.room_joined(room)
+        self.logger.info(f"Client {id(connection)} joined room {room}. Room size: {size}")
+        if since is None:
+            self._send_state(connection, room)
+            return True
+        missed = self.history.since(room, since) if self.history is not None else None
+        if missed is None:
+            self.logger.info(f"Client {id(connection)} cannot resume room {room} from {since}")
+            self._send_state(connection, room)
+            return False
+        codec = connection.codec
+        for message in missed:
+            if codec is not self.history.codec:
+                message = codec.encode(self.history.codec.decode(message))
+            self._send_message(connection, message)
+        self.logger.debug("Replayed %d messages in room %s to %d", len(missed), room, id(connection))
+        return True
 
     def leave_room(self, connection: WebSocketConnection, room: str) -> None:
-        self.rooms[room].discard(connection)
-        self.logger.info(f"Client {id(connection)} left room {room}. Room size: {len(self.rooms[room])}")
+        size = self.rooms.leave(connection, room)
+        if not size and self.backplane is not None:
+            self.backplane.room_left(room)
+        self.logger.info(f"Client {id(connection)} left room {room}. Room size: {size}")
+
+    def set_state(self, room: str, state: Any) -> int:
+        """Make ``state`` the room's shared state and broadcast what changed.
+
+        Members receive a ``"state"`` event whose data holds ``room``,
+        ``version`` and either ``state`` (the first time) or ``delta``, a
+        list of ops to apply in order; see :func:`~.roomstate.diff`.
+        Members joining later get the current state on :meth:`join_room`.
+        Returns the new version.
+
+        State events skip the room rate limit and are never dropped by the
+        slow-consumer policy; a member that cannot keep up is disconnected
+        and gets a fresh snapshot when it joins again. State is kept per
+        node and is not published to the backplane, so with several nodes
+        either set it on each of them or keep a room's members on one node.
+        """
+        data = self.states.update(room, state)
+        if data is not None:
+            self._deliver_state(room, data)
+        return self.states.version(room)
+
+    def patch_state(self, room: str, ops: list) -> int:
+        """Apply delta ops to the room's state directly, skipping the diff.
+
+        Raises ``KeyError`` if the room has no state yet and ``ValueError``
+        if the ops do not apply; nothing is changed or sent then.
+        """
+        self._deliver_state(room, self.states.patch(room, ops))
+        return self.states.version(room)
+
+    def get_state(self, room: str) -> Any:
+        """The room's current shared state; treat it as read-only."""
+        return self.states.get(room)
+
+    def clear_state(self, room: str) -> None:
+        self.states.discard(room)
+
+    def _send_state(self, connection: WebSocketConnection, room: str) -> None:
+        if room in self.states:
+            for message in self.states.join_messages(room, connection.codec):
+                self._send_message(connection, message, required=True)
+
+    def _deliver_state(self, room: str, data: Dict[str, Any]) -> None:
+        # A lost delta would leave a member applying the next one to the wrong
+        # state, so these go to this node's members only and are queued as
+        # required frames, after anything already batched for them.
+        envelope = {"event": STATE_EVENT, "data": data}
+        encoded = {}
+        frames = {}
+        for connection in self.rooms.members(room):
+            if getattr(connection, '_closed', False):
+                continue
+            if settings.COALESCE_INTERVAL is not None:
+                connection.flush_batch()
+            key = connection.frame_key
+            frame = frames.get(key)
+            if frame is None:
+                codec = connection.codec
+                message = encoded.get(codec)
+                if message is None:
+                    message = encoded[codec] = codec.encode(envelope)
+                frame = frames[key] = connection.encode_frame(message, codec.binary)
+            connection.send_frame(frame, required=True)
+
+    def subscribe(self, connection: WebSocketConnection, pattern: str) -> None:
+        """Receive emits to every room matching ``pattern``, e.g. ``sensors.eu.*`` or ``sensors.#``.
+
+        ``*`` stands for one dot-separated segment and a trailing ``#`` for
+        any number of them. A pattern without wildcards subscribes to that
+        one room, like :meth:`join_room` without the membership bookkeeping.
+        """
+        if self.topics.subscribe(connection, pattern) and self.backplane is not None:
+            self.backplane.pattern_subscribed(pattern)
+        self.logger.info(f"Client {id(connection)} subscribed to {pattern}")
+
+    def unsubscribe(self, connection: WebSocketConnection, pattern: str) -> None:
+        if self.topics.unsubscribe(connection, pattern) and self.backplane is not None:
+            self.backplane.pattern_unsubscribed(pattern)
+        self.logger.info(f"Client {id(connection)} unsubscribed from {pattern}")
+
+    def room_size(self, room: str) -> int:
+        return self.rooms.size(room)
+
+    def _collect_metrics(self):
+        depths = [len(connection._outbound or ()) for connection in self.clients]
+        yield "pysocket_connections", len(self.clients)
+        yield "pysocket_rooms", len(self.rooms)
+        yield "pysocket_room_memberships", sum(self.rooms.size(room) for room in self.rooms)
+        yield "pysocket_outbound_queue_frames", sum(depths)
+        yield "pysocket_outbound_queue_max_frames", max(depths, default=0)
+        yield "pysocket_topic_subscriptions", len(self.topics)
+        if self.history is not None:
+            yield "pysocket_history_rooms", len(self.history)
+            yield "pysocket_history_bytes", self.history.bytes
+        if self.load is not None:
+            yield "pysocket_loop_lag_seconds", self.load.lag
 
     async def emit(self, event: str, data: Any, room: Optional[str] = None, to: Optional[WebSocketConnection] = None) -> None:
-        message = self._format_message(event, data)
+        self._emit(event, data, room, to)
+
+    def emit_threadsafe(self, event: str, data: Any, room: Optional[str] = None,
+                        to: Optional[WebSocketConnection] = None) -> None:
+        """Emit from any thread without waiting, e.g. from a Django view; see :class:`EmitBridge`."""
+        self.bridge.emit(event, data, room, to)
+
+    async def call(self, connection: WebSocketConnection, event: str, data: Any = None,
+                   timeout: Optional[float] = None) -> Any:
+        """Send ``event`` with an ``id`` and wait for the client's ``{"ack": id, "data": ...}``.
+
+        Calls are pipelined: any number can be in flight on one connection.
+        Raises :class:`CallError` if the client acks with ``error``,
+        ``asyncio.TimeoutError`` after ``timeout`` seconds, and
+        ``ConnectionError`` if the connection closes first.
+        """
+        if getattr(connection, '_closed', False):
+            raise ConnectionError("Connection closed")
+        call_id = next(self._call_ids)
+        future = asyncio.get_running_loop().create_future()
+        calls = connection._calls
+        if calls is None:
+            calls = connection._calls = {}
+        calls[call_id] = future
+        try:
+            self._send_envelope(connection, {"event": event, "data": data, "id": call_id})
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            calls.pop(call_id, None)
+            if not calls and connection._calls is calls:
+                connection._calls = None
+
+    def _resolve_call(self, connection: WebSocketConnection, payload: Dict[str, Any]) -> None:
+        calls = getattr(connection, '_calls', None)
+        ack = payload["ack"]
+        # Anything else may be unhashable, and could never match a call id anyway
+        future = calls.get(ack) if calls and type(ack) in (int, str) else None
+        if future is None or future.done():
+            self.logger.debug("Ignoring ack %r from %d without a pending call", ack, id(connection))
+        elif "error" in payload:
+            future.set_exception(CallError(payload["error"]))
+        else:
+            future.set_result(payload.get("data"))
+
+    async def _answer(self, connection: WebSocketConnection, call_id: Any, handler: Callable, *args) -> None:
+        try:
+            result = await handler(*args)
+        except Exception as e:
+            self._send_envelope(connection, {"ack": call_id, "error": str(e)})
+            raise
+        if isinstance(result, Failed):
+            reply = {"ack": call_id, "error": result.message}
+        else:
+            reply = {"ack": call_id, "data": result}
+        try:
+            self._send_envelope(connection, reply)
+        except (TypeError, ValueError, OverflowError) as e:
+            self.logger.error(f"Cannot encode reply to {id(connection)}: {e}")
+            self._send_envelope(connection, {"ack": call_id, "error": "Unserializable result"})
+
+    def _send_envelope(self, connection: WebSocketConnection, envelope: Dict[str, Any]) -> None:
+        self._send_message(connection, connection.codec.encode(envelope))
+
+    def _send_message(self, connection: WebSocketConnection, message: Union[str, bytes],
+                      required: bool = False) -> None:
+        if required:
+            if settings.COALESCE_INTERVAL is not None:
+                connection.flush_batch()
+            connection.send_frame(connection.encode_frame(message, connection.codec.binary), required=True)
+        elif settings.COALESCE_INTERVAL is not None:
+            connection.coalesce(message)
+        else:
+            connection.send_frame(connection.encode_frame(message, connection.codec.binary))
+
+    def _emit(self, event: str, data: Any, room: Optional[str] = None, to: Optional[WebSocketConnection] = None) -> None:
+        if room is not None and to is None and self._room_limits is not None and not self._room_limits.take(room):
+            if settings.METRICS:
+                metrics.rate_limited.inc(label="room")
+            self.logger.debug("Dropped %s to room %s: rate limit exceeded", event, room)
+            return
+        if to is None and self.backplane is not None:
+            self.backplane.publish(event, data, room)
+        self._deliver(event, data, room, to)
+
+    def _deliver(self, event: str, data: Any, room: Optional[str] = None, to: Optional[WebSocketConnection] = None) -> None:
         if to:
             targets = [to]
         elif room == "broadcast":
             targets = self.clients
+        elif room:
+            targets = self.rooms.members(room)
+            if self.topics:
+                targets = self.topics.subscribers(room, targets)
         else:
-            targets = self.rooms[room] if room else self.clients
-        self.logger.debug(f"Emitting {event} to {len(targets)} targets (room: {room}, to: {to}): {message}")
-        for connection in list(targets):
+            targets = self.clients
+        self.logger.debug("Emitting %s to %d targets (room: %s, to: %s): %r", event, len(targets), room, to, data)
+        # Serialize once per codec and frame once per kind of connection, then
+        # hand the shared frame to each outbound queue without awaiting any peer.
+        envelope = {"event": event, "data": data}
+        encoded = {}
+        frames = {}
+        history = self.history
+        if history is not None and room and to is None and room != "broadcast":
+            envelope["room"] = room
+            envelope["seq"] = seq = history.next_seq()
+            message = encoded[history.codec] = history.codec.encode(envelope)
+            history.record(room, seq, message)
+        if settings.COALESCE_INTERVAL is not None:
+            # Batches differ per connection, so only the encoding is shared.
+            for connection in targets:
+                if not getattr(connection, '_closed', False):
+                    codec = connection.codec
+                    message = encoded.get(codec)
+                    if message is None:
+                        message = encoded[codec] = codec.encode(envelope)
+                    connection.coalesce(message)
+            return
+        for connection in targets:
             if not getattr(connection, '_closed', False):
-                try:
-                    await connection.send(message)
-                    self.logger.debug(f"Sent {event} to client {id(connection)}")
-                except Exception as e:
-                    self.logger.error(f"Failed to send to client {id(connection)}: {e}")
-                    await connection.close()
+                key = connection.frame_key
+                frame = frames.get(key)
+                if frame is None:
+                    codec = connection.codec
+                    message = encoded.get(codec)
+                    if message is None:
+                        message = encoded[codec] = codec.encode(envelope)
+                    frame = frames[key] = connection.encode_frame(message, codec.binary)
+                connection.send_frame(frame)
             else:
                 self.logger.warning(f"Skipping closed connection {id(connection)}")
 
-    def _format_message(self, event: str, data: Any) -> str:
-        return json.dumps({"event": event, "data": data})
+    def _format_message(self, event: str, data: Any, codec: Optional[Codec] = None) -> Union[str, bytes]:
+        return (codec or get_codec(settings.CODEC)).encode({"event": event, "data": data})
 
-    async def handle_connection(self, connection: WebSocketConnection, path: str = None, consumer=None):
-        from ..middleware.base import apply_middleware  # Deferred import
+    async def handle_connection(self, connection: WebSocketConnection, path: str = None, consumer=None,
+                                consumer_kwargs: Optional[Dict[str, Any]] = None):
+        await self.start()
         self.logger.info(f"Handling connection {id(connection)} for path {path}")
-        if not await apply_middleware(connection, path, self.middleware):
+        if not await self._connect_chain(connection, path):
             await connection.close()
+            if settings.METRICS:
+                metrics.middleware_rejections.inc()
             self.logger.warning(f"Middleware rejected connection {id(connection)}")
             return
 
@@ -73,57 +470,299 @@ class PySocketServer:
         connection.path = path
         self.logger.info(f"Added client {id(connection)}. Total clients: {len(self.clients)}")
 
+        consumer_instance = None
         if consumer:
-            consumer_instance = consumer(connection, self)
+            consumer_instance = consumer(connection, self, **(consumer_kwargs or {}))
             self.logger.info(f"Created consumer instance {consumer.__name__} for {id(connection)}")
             await consumer_instance.connect()
 
+        if self.heartbeat and connection.supports_ping:
+            self.heartbeat.register(connection)
+
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        load = self.load
+        limiter = None
+        if settings.CONNECTION_RATE:
+            limiter = TokenBucket(settings.CONNECTION_RATE, settings.CONNECTION_BURST)
+        dispatcher = None
+        if settings.DISPATCH_MODE != ORDERED:
+            dispatcher = Dispatcher(settings.DISPATCH_MODE, settings.MAX_IN_FLIGHT)
+
         try:
             while not getattr(connection, '_closed', False):
-                message = await asyncio.wait_for(connection.receive(), timeout=settings.PING_INTERVAL)
+                message = await connection.receive()
                 if message is None:
                     self.logger.info(f"Connection {id(connection)} closed")
                     break
 
+                codec = connection.codec
                 try:
-                    payload = json.loads(message)
+                    payload = codec.decode(message)
+                    if not isinstance(payload, dict):
+                        raise ValueError("Event envelope must be an object")
+                    # {"batch": [envelope, ...]} carries several events in one frame
+                    envelopes = payload.get("batch")
+                    if envelopes is None:
+                        envelopes = (payload,)
+                    elif not isinstance(envelopes, list) or not all(isinstance(item, dict) for item in envelopes):
+                        raise ValueError("Batch must be a list of event envelopes")
+                except ValueError:
+                    await self.emit("error", {"message": f"Invalid {codec.label}"}, to=connection)
+                    self.logger.warning(f"Invalid {codec.label} from {id(connection)}: {message!r}")
+                    continue
+                if load is not None and load.overloaded:
+                    if settings.METRICS:
+                        metrics.rate_limited.inc(len(envelopes), label="overload")
+                    continue
+                if limiter is not None and not limiter.take(len(envelopes)):
+                    if settings.RATE_LIMIT_POLICY == "disconnect":
+                        self.logger.warning(f"Closing {id(connection)}: event rate limit exceeded")
+                        await connection.close(CLOSE_POLICY_VIOLATION, "Rate limit exceeded")
+                        break
+                    if settings.METRICS:
+                        metrics.rate_limited.inc(len(envelopes), label="connection")
+                    self.logger.debug("Dropped %d events from %d: rate limit exceeded", len(envelopes), id(connection))
+                    continue
+                for payload in envelopes:
                     event = payload.get("event")
+                    if type(event) is not str:
+                        if event is None and "ack" in payload:
+                            self._resolve_call(connection, payload)
+                        elif payload.get("id") is not None:
+                            self._send_envelope(connection, {"ack": payload["id"], "error": "Event name must be a string"})
+                        else:
+                            await self.emit("error", {"message": "Event name must be a string"}, to=connection)
+                        continue
                     data = payload.get("data", {})
-                    self.logger.debug(f"Received event {event} from {id(connection)}: {data}")
+                    if debug:
+                        self.logger.debug("Received event %s from %d: %r", event, id(connection), data)
+                    # Read per event so middleware added while connected applies
+                    message_chain = self._message_chain
+                    if message_chain is not None and not await message_chain(connection, event, data):
+                        continue
                     if consumer:
-                        await consumer_instance.handle_event(event, data)
+                        handler, args = consumer_instance.handle_event, (event, data)
                     elif event in self.event_handlers:
-                        await self.event_handlers[event](connection, data)
-                except json.JSONDecodeError:
-                    await connection.send(self._format_message("error", {"message": "Invalid JSON"}))
-                    self.logger.warning(f"Invalid JSON from {id(connection)}: {message}")
-        except asyncio.TimeoutError:
-            self.logger.debug(f"Ping timeout for {id(connection)}")
+                        handler, args = self.event_handlers[event], (connection, data)
+                    else:
+                        if payload.get("id") is not None:
+                            self._send_envelope(connection, {"ack": payload["id"], "error": f"Unknown event: {event}"})
+                        continue
+                    if payload.get("id") is not None:
+                        # The handler's return value goes back as {"ack": id, "data": ...}
+                        handler, args = self._answer, (connection, payload["id"], handler) + args
+                    if dispatcher is None:
+                        await handler(*args)
+                    else:
+                        await dispatcher.dispatch(event, handler, *args)
         except Exception as e:
             self.logger.error(f"Connection error for {id(connection)}: {e}")
         finally:
-            await self._cleanup_connection(connection, consumer)
+            if dispatcher is not None:
+                await dispatcher.close(settings.CLOSE_TIMEOUT)
+            await self._cleanup_connection(connection, consumer_instance)
 
-    async def _cleanup_connection(self, connection: WebSocketConnection, consumer=None):
+    async def _cleanup_connection(self, connection: WebSocketConnection, consumer_instance=None):
         self.clients.discard(connection)
-        for room in list(self.rooms.keys()):
-            self.leave_room(connection, room)
-        if consumer:
-            consumer_instance = consumer(connection, self)
+        calls = getattr(connection, '_calls', None)
+        if calls:
+            for future in calls.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+        if self.heartbeat:
+            self.heartbeat.unregister(connection)
+        left = self.rooms.leave_all(connection)
+        if left and self.backplane is not None:
+            for room in left:
+                if room not in self.rooms:
+                    self.backplane.room_left(room)
+        if left:
+            self.logger.debug(f"Removed client {id(connection)} from {len(left)} rooms")
+        dropped = self.topics.unsubscribe_all(connection)
+        if dropped and self.backplane is not None:
+            for pattern in dropped:
+                self.backplane.pattern_unsubscribed(pattern)
+        if consumer_instance:
             await consumer_instance.disconnect()
         if "disconnect" in self.event_handlers:
             await self.event_handlers["disconnect"](connection, None)
         self.logger.info(f"Cleaned up connection {id(connection)}. Total clients: {len(self.clients)}")
+        if self._drained is not None and not self.clients:
+            self._drained.set()
+
+    async def drain(self, rate: Optional[float] = None, timeout: Optional[float] = None) -> int:
+        """Close every connection with 1012 (service restart) and wait for their cleanup.
 
-    async def run(self, host: str = None, port: int = None):
+        Closes are spread at ``rate`` per second (``DRAIN_RATE``) so clients
+        reconnect gradually instead of all at once; a rate of ``None`` or
+        ``0`` or less closes them all at once. Closes carry
+        ``DRAIN_CLOSE_REASON`` as a hint to do so. Cleanup, consumer
+        ``disconnect`` and ``disconnect`` handlers run as for any other
+        close. New handshakes are refused from here on. Returns how many
+        connections were still open when ``timeout`` ran out.
+        """
+        rate = settings.DRAIN_RATE if rate is None else rate
+        if rate is not None and rate <= 0:
+            rate = None
+        timeout = settings.DRAIN_TIMEOUT if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self._draining = True
+        self._drained = asyncio.Event()
+        self.logger.info(f"Draining {len(self.clients)} connections" + (f" at {rate:g}/s" if rate else ""))
+        closing: Set[asyncio.Future] = set()
+        notified: Set[WebSocketConnection] = set()
+        started = loop.time()
+        closed = 0
+        # Connections finishing their handshake meanwhile show up on the next pass
+        pending = list(self.clients)
+        while pending and loop.time() < deadline:
+            for connection in pending:
+                notified.add(connection)
+                if connection not in self.clients:
+                    continue
+                delay = started + closed / rate - loop.time() if rate else 0.0
+                if delay > _DRAIN_TICK:
+                    await asyncio.sleep(min(delay, max(0.0, deadline - loop.time())))
+                    if loop.time() >= deadline:
+                        break
+                closed += 1
+                task = asyncio.ensure_future(connection.close(CLOSE_SERVICE_RESTART, settings.DRAIN_CLOSE_REASON))
+                closing.add(task)
+                task.add_done_callback(closing.discard)
+            pending = [connection for connection in self.clients if connection not in notified]
+        if self.clients:
+            try:
+                await asyncio.wait_for(self._drained.wait(), max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+        remaining = len(self.clients)
+        if remaining:
+            self.logger.warning(f"Drain timed out with {remaining} connections open")
+        else:
+            self.logger.info(f"Drained {closed} connections")
+        return remaining
+
+    async def run(self, host: str = None, port: int = None) -> None:
+        """Serve on ``host:port`` from the running event loop until shutdown.
+
+        SIGTERM drains connections before returning; set ``HANDOFF_PATH``
+        and send SIGHUP to restart without closing the port. To start from
+        synchronous code, or with worker processes, use :meth:`run_forever`.
+        """
+        await self._serve(host or settings.HOST, port or settings.PORT, handoff=settings.HANDOFF_PATH)
+
+    def run_forever(self, host: str = None, port: int = None, workers: int = None) -> None:
+        """Serve on ``host:port`` from synchronous code, blocking until shutdown.
+
+        Runs its own event loop (uvloop when ``USE_UVLOOP`` and installed).
+        With ``workers > 1`` (``WORKERS``) it forks that many worker
+        processes under a supervisor instead; see :meth:`run` for shutdown.
+        """
         host = host or settings.HOST
         port = port or settings.PORT
+        workers = workers or settings.WORKERS
+        if workers > 1:
+            from .workers import WorkerSupervisor  # Deferred import
+            WorkerSupervisor(self, host, port, workers).run()
+        else:
+            eventloop.run(self._serve(host, port, handoff=settings.HANDOFF_PATH))
+
+    async def _serve(self, host: str, port: int, reuse_port: Optional[bool] = None, sock=None,
+                     handoff: Optional[str] = None):
+        """Serve until SIGTERM or SIGHUP, then stop accepting and :meth:`drain`.
+
+        With a ``handoff`` path (``HANDOFF_PATH`` under :meth:`run`) the
+        listening sockets are taken over from a server already running
+        there, and offered in turn to the next one; see
+        :class:`~.handoff.ListenerHandoff`. After SIGHUP the server keeps
+        accepting until a replacement has taken the sockets, or for
+        ``HANDOFF_TIMEOUT``, so a restart never closes the port.
+        """
+        await self.start()
+        loop = asyncio.get_running_loop()
+        stopping = asyncio.Event()
+        servers: List[asyncio.AbstractServer] = []
+        metrics_server = None
+
+        def stop_accepting() -> None:
+            # The replacement holds its own copies of the listening sockets
+            for server in servers:
+                server.close()
+            if metrics_server is not None:
+                metrics_server.close()
+            stopping.set()
+
+        transfer = None
+        sockets = [sock] if sock is not None else []
+        if handoff:
+            transfer = ListenerHandoff(handoff, settings.HANDOFF_TIMEOUT, on_handoff=stop_accepting)
+            # Blocks for up to HANDOFF_TIMEOUT while the previous server answers
+            sockets = await loop.run_in_executor(None, transfer.receive) or sockets
+        if sockets:
+            for listening in sockets:
+                servers.append(await self._listen(host, port, sock=listening))
+        else:
+            servers.append(await self._listen(host, port, reuse_port=reuse_port))
         self.logger.info(f"pySocket running at ws://{host}:{port}")
-        server = await asyncio.start_server(self._handle_client, host, port)
-        async with server:
-            await server.serve_forever()
+
+        def restart() -> None:
+            if transfer is None or transfer.handed_off:
+                stop_accepting()
+                return
+            self.logger.info(f"Restarting: waiting up to {settings.HANDOFF_TIMEOUT:g}s for a replacement")
+            loop.call_later(settings.HANDOFF_TIMEOUT, stop_accepting)
+
+        signals = []
+        for signum, callback in ((signal.SIGTERM, stop_accepting), (getattr(signal, "SIGHUP", None), restart)):
+            try:
+                loop.add_signal_handler(signum, callback)
+                signals.append(signum)
+            except (NotImplementedError, RuntimeError, TypeError, ValueError):
+                # No SIGHUP on this platform, or not serving from the main thread
+                pass
+        try:
+            if transfer is not None:
+                await transfer.ready([listening.fileno() for server in servers for listening in server.sockets])
+            if settings.METRICS_PORT:
+                # Bound after the handoff so the previous server has released the port
+                metrics_server = await metrics.serve(host, settings.METRICS_PORT)
+            await stopping.wait()
+            self.logger.info("Stopped accepting connections")
+            await self.drain()
+        finally:
+            for signum in signals:
+                loop.remove_signal_handler(signum)
+            if transfer is not None:
+                transfer.close()
+            for server in servers:
+                server.close()
+            if metrics_server is not None:
+                metrics_server.close()
+
+    async def _listen(self, host: str, port: int, reuse_port: Optional[bool] = None,
+                      sock=None) -> asyncio.AbstractServer:
+        if settings.ENGINE == "protocol":
+            return await protocol.create_server(self, host, port, reuse_port=reuse_port, sock=sock)
+        if settings.ENGINE != "streams":
+            raise ValueError(f"Unknown engine: {settings.ENGINE}")
+        limit = settings.STREAM_LIMIT
+        if sock is not None:
+            return await asyncio.start_server(self._handle_client, sock=sock, limit=limit)
+        return await asyncio.start_server(self._handle_client, host, port, reuse_port=reuse_port, limit=limit)
 
     async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         connection = WebSocketConnection(reader, writer)
-        await connection.handshake()
-        await self.handle_connection(connection)
\ No newline at end of file
+        # Only take a slot once the request is in, so silent sockets cannot hold them
+        request = await connection.read_request()
+        if request is None:
+            return
+        if not self.admit():
+            await connection.refuse()
+            return
+        try:
+            if not await connection.handshake(request):
+                return
+            await self.handle_connection(connection, connection.path)
+        finally:
+            self.release()
\ No newline at end of file
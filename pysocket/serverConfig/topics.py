@@ -0,0 +1,188 @@
+from typing import AbstractSet, Dict, Hashable, List, Optional, Set, Tuple
+
+SEPARATOR = "."
+ONE = "*"  # exactly one segment
+MANY = "#"  # zero or more trailing segments
+
+_EMPTY: AbstractSet = frozenset()
+
+def split_pattern(pattern: str) -> List[str]:
+    segments = pattern.split(SEPARATOR)
+    if MANY in segments[:-1]:
+        raise ValueError(f"'{MANY}' must be the last segment of a topic pattern: {pattern!r}")
+    return segments
+
+def is_pattern(topic: str) -> bool:
+    return any(segment in (ONE, MANY) for segment in topic.split(SEPARATOR))
+
+class _TopicNode:
+    __slots__ = ("children", "subscribers")
+
+    def __init__(self):
+        self.children: Optional[Dict[str, "_TopicNode"]] = None
+        # Allocated once a pattern ends here and then kept, since match results hold on to it
+        self.subscribers: Optional[Set[Hashable]] = None
+
+class TopicTrie:
+    """Pattern subscriptions such as ``sensors.eu.*`` or ``sensors.#``, matched against concrete topics.
+
+    Topics are dot-separated. ``*`` matches exactly one segment and ``#``,
+    allowed only as the last segment, matches zero or more.
+
+    :meth:`match` caches, per topic, the subscriber sets it reached. Those
+    sets are live, so subscribing to or leaving a pattern that already has
+    a set needs no invalidation. Only giving a pattern its first set does.
+    That drops the cached topics sharing the pattern's first segment, or
+    every cached topic when the pattern starts with a wildcard.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._root = _TopicNode()
+        self._patterns: Dict[Hashable, Set[str]] = {}
+        self._count = 0
+        # first segment -> topic -> subscriber sets
+        self._cache: Dict[str, Dict[str, Tuple[Set[Hashable], ...]]] = {}
+        self._cached = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def patterns_of(self, connection) -> AbstractSet[str]:
+        return self._patterns.get(connection, _EMPTY)
+
+    def subscribe(self, connection, pattern: str) -> bool:
+        """Add a subscription; returns ``True`` if ``pattern`` had no subscribers before."""
+        segments = split_pattern(pattern)
+        joined = self._patterns.get(connection)
+        if joined is None:
+            joined = self._patterns[connection] = set()
+        elif pattern in joined:
+            return False
+        node = self._root
+        for segment in segments:
+            children = node.children
+            if children is None:
+                children = node.children = {}
+            child = children.get(segment)
+            if child is None:
+                child = children[segment] = _TopicNode()
+            node = child
+        subscribers = node.subscribers
+        if subscribers is None:
+            subscribers = node.subscribers = set()
+            self._invalidate(segments[0])
+        first = not subscribers
+        subscribers.add(connection)
+        joined.add(pattern)
+        self._count += 1
+        return first
+
+    def unsubscribe(self, connection, pattern: str) -> bool:
+        """Remove a subscription; returns ``True`` if it was the last one to ``pattern``."""
+        joined = self._patterns.get(connection)
+        if joined is None or pattern not in joined:
+            return False
+        joined.discard(pattern)
+        if not joined:
+            del self._patterns[connection]
+        return self._remove(connection, pattern)
+
+    def unsubscribe_all(self, connection) -> List[str]:
+        """Drop every subscription of ``connection``; returns the patterns left without subscribers."""
+        joined = self._patterns.pop(connection, None)
+        if not joined:
+            return []
+        return [pattern for pattern in joined if self._remove(connection, pattern)]
+
+    def _remove(self, connection, pattern: str) -> bool:
+        path = [self._root]
+        segments = pattern.split(SEPARATOR)
+        for segment in segments:
+            path.append(path[-1].children[segment])
+        node = path[-1]
+        node.subscribers.discard(connection)
+        self._count -= 1
+        if node.subscribers:
+            return False
+        # Prune nodes nothing ends at or passes through; results cached
+        # before still point at their (now empty) sets, which is harmless.
+        for depth in range(len(segments), 0, -1):
+            node = path[depth]
+            if node.children or node.subscribers:
+                break
+            parent = path[depth - 1]
+            del parent.children[segments[depth - 1]]
+            if not parent.children:
+                parent.children = None
+        return True
+
+    def _invalidate(self, first: str) -> None:
+        if first in (ONE, MANY):
+            self._cache.clear()
+            self._cached = 0
+        else:
+            bucket = self._cache.pop(first, None)
+            if bucket:
+                self._cached -= len(bucket)
+
+    def match(self, topic: str) -> Tuple[Set[Hashable], ...]:
+        """Subscriber sets of every pattern matching ``topic``; some may be empty."""
+        first = topic.split(SEPARATOR, 1)[0]
+        bucket = self._cache.get(first)
+        if bucket is not None:
+            found = bucket.get(topic)
+            if found is not None:
+                return found
+        found = self._match(topic.split(SEPARATOR))
+        if self._cached >= self.cache_size:
+            self._cache.clear()
+            self._cached = 0
+            bucket = None
+        if bucket is None:
+            bucket = self._cache[first] = {}
+        bucket[topic] = found
+        self._cached += 1
+        return found
+
+    def _match(self, segments: List[str]) -> Tuple[Set[Hashable], ...]:
+        found = []
+        nodes = [self._root]
+        for segment in segments:
+            reached = []
+            for node in nodes:
+                children = node.children
+                if children is None:
+                    continue
+                many = children.get(MANY)
+                if many is not None:
+                    found.append(many.subscribers)
+                child = children.get(segment)
+                if child is not None:
+                    reached.append(child)
+                one = children.get(ONE)
+                if one is not None and one is not child:
+                    reached.append(one)
+            nodes = reached
+            if not nodes:
+                break
+        else:
+            for node in nodes:
+                if node.subscribers is not None:
+                    found.append(node.subscribers)
+                many = node.children.get(MANY) if node.children else None
+                if many is not None:
+                    found.append(many.subscribers)
+        return tuple(subscribers for subscribers in found if subscribers is not None)
+
+    def subscribers(self, topic: str, members: AbstractSet = _EMPTY) -> AbstractSet:
+        """Connections subscribed to ``topic`` by pattern, together with ``members``."""
+        matched = [subscribers for subscribers in self.match(topic) if subscribers]
+        if not matched:
+            return members
+        if not members and len(matched) == 1:
+            return matched[0]
+        union = set(members)
+        for subscribers in matched:
+            union |= subscribers
+        return union
@@ -0,0 +1,139 @@
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+import traceback
+from typing import Callable, Dict, Optional
+
+from ..backplane.ipc import IPCBackplane, run_hub
+from ..connectionEngine import eventloop
+from ..settings import settings
+
+logger = logging.getLogger("pysocket.workers")
+
+# Workers that die within _STABLE_UPTIME seconds of starting are restarted after
+# a delay that doubles from _RESTART_BACKOFF_BASE with each such exit in a row
+_STABLE_UPTIME = 1.0
+_RESTART_BACKOFF_BASE = 0.5
+_RESTART_BACKOFF_MAX = 5.0
+
+class WorkerSupervisor:
+    """Forks ``workers`` server processes sharing one port and restarts dead ones.
+
+    Workers bind with SO_REUSEPORT where the platform supports it and share a
+    socket bound by the supervisor otherwise. Unless the server already has
+    a backplane, a separate hub process relays room emits between workers
+    over a Unix domain socket.
+    """
+
+    def __init__(self, server, host: str, port: int, workers: int):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("Multi-process workers require os.fork")
+        self.server = server
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.reuse_port = hasattr(socket, "SO_REUSEPORT")
+        self.bus_path: Optional[str] = None
+        self._sock: Optional[socket.socket] = None
+        self._hub_pid: Optional[int] = None
+        self._slots: Dict[int, int] = {}
+        self._started: Dict[int, float] = {}
+        # Slot -> workers in a row that exited before _STABLE_UPTIME
+        self._failures: Dict[int, int] = {}
+        self._stopping = False
+
+    def run(self) -> None:
+        tmpdir = tempfile.mkdtemp(prefix="pysocket-")
+        self.bus_path = os.path.join(tmpdir, "bus.sock")
+        if not self.reuse_port:
+            self._sock = socket.create_server((self.host, self.port))
+        previous = {sig: signal.signal(sig, self._on_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+        logger.info(f"Supervisor {os.getpid()} starting {self.workers} workers on {self.host}:{self.port}")
+        try:
+            if self.server.backplane is None:
+                self._hub_pid = self._spawn(lambda: eventloop.run(run_hub(self.bus_path)))
+            for slot in range(self.workers):
+                self._start_worker(slot)
+            self._supervise()
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            if self._sock:
+                self._sock.close()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def _supervise(self) -> None:
+        while self._slots or self._hub_pid:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            if pid == self._hub_pid:
+                self._hub_pid = None
+                if not self._stopping:
+                    logger.warning(f"IPC hub {pid} exited with status {status}, restarting")
+                    self._hub_pid = self._spawn(lambda: eventloop.run(run_hub(self.bus_path)))
+                continue
+            slot = self._slots.pop(pid, None)
+            if slot is None or self._stopping:
+                continue
+            uptime = time.monotonic() - self._started.pop(pid, 0.0)
+            logger.warning(f"Worker {pid} (slot {slot}) exited with status {status}, restarting")
+            delay = self._restart_delay(slot, uptime)
+            if delay:
+                # Crash loop: back off instead of forking as fast as possible.
+                time.sleep(delay)
+                if self._stopping:
+                    continue
+            self._start_worker(slot)
+
+    def _restart_delay(self, slot: int, uptime: float) -> float:
+        if uptime >= _STABLE_UPTIME:
+            self._failures.pop(slot, None)
+            return 0.0
+        failures = self._failures[slot] = self._failures.get(slot, 0) + 1
+        return min(_RESTART_BACKOFF_MAX, _RESTART_BACKOFF_BASE * 2 ** (failures - 1))
+
+    def _start_worker(self, slot: int) -> None:
+        pid = self._spawn(lambda: eventloop.run(self._worker(slot)))
+        self._slots[pid] = slot
+        self._started[pid] = time.monotonic()
+
+    async def _worker(self, slot: int) -> None:
+        if settings.METRICS_PORT:
+            # Metrics are per process, so each worker exposes its own port.
+            settings.METRICS_PORT += slot
+        if self.server.backplane is None:
+            self.server.backplane = IPCBackplane(self.bus_path)
+        await self.server._serve(self.host, self.port, reuse_port=self.reuse_port or None, sock=self._sock)
+
+    def _spawn(self, target: Callable[[], None]) -> int:
+        pid = os.fork()
+        if pid:
+            return pid
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            target()
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _on_signal(self, signum, frame) -> None:
+        if self._stopping:
+            return
+        self._stopping = True
+        logger.info(f"Supervisor received signal {signum}, stopping workers")
+        for pid in list(self._slots) + [self._hub_pid]:
+            if pid:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
@@ -1,9 +1,72 @@
-from typing import List, Callable
+from typing import List, Callable, Optional
 
 class Settings:
     HOST: str = "localhost"
     PORT: int = 8765
-    PING_INTERVAL: int = 20
-    MIDDLEWARE: List[Callable] = []
+    WORKERS: int = 1
+    PING_INTERVAL: int = 20  # seconds of silence before a ping; 0 disables heartbeats
+    PING_TIMEOUT: int = 20
+    HEARTBEAT_TICK: float = 1.0
+    MAX_MESSAGE_SIZE: int = 1024 * 1024
+    ENGINE: str = "streams"  # "streams" (asyncio.start_server) or "protocol" (asyncio.Protocol callbacks)
+    USE_UVLOOP: bool = True  # run on uvloop when it is installed
+    STREAM_LIMIT: int = 64 * 1024  # StreamReader buffer limit per connection; also caps handshake size
+    SEND_QUEUE_SIZE: int = 1024
+    SLOW_CONSUMER_POLICY: str = "drop_oldest"  # "drop_oldest", "drop_newest" or "disconnect"
+    CLOSE_TIMEOUT: float = 5.0
+    HANDSHAKE_TIMEOUT: Optional[float] = 10.0  # seconds a new socket has to send its upgrade request; None waits forever
+    # Unix socket through which a running server hands its listening sockets to a
+    # replacement started with the same path; None binds the port afresh
+    HANDOFF_PATH: Optional[str] = None
+    HANDOFF_TIMEOUT: float = 30.0  # seconds after SIGHUP to wait for a replacement before draining anyway
+    DRAIN_RATE: Optional[float] = 1000.0  # connections closed per second when shutting down; None or 0 closes all at once
+    DRAIN_TIMEOUT: float = 60.0  # seconds to wait for drained connections to be cleaned up
+    DRAIN_CLOSE_REASON: str = "reconnect"  # sent with close code 1012 (service restart)
+    BACKPLANE_BATCH_SIZE: int = 256
+    BACKPLANE_FLUSH_INTERVAL: float = 0.0  # seconds; 0 flushes on the next loop tick
+    PERMESSAGE_DEFLATE: bool = True
+    DEFLATE_WINDOW_BITS: int = 15
+    DEFLATE_CLIENT_WINDOW_BITS: int = 15
+    # Without server context takeover a broadcast is compressed once for all recipients
+    DEFLATE_CONTEXT_TAKEOVER: bool = False
+    DEFLATE_CLIENT_CONTEXT_TAKEOVER: bool = True
+    DEFLATE_LEVEL: int = 6
+    DEFLATE_MEM_LEVEL: int = 8
+    DEFLATE_MIN_SIZE: int = 128  # smaller messages are sent uncompressed
+    DEFLATE_EXECUTOR_THRESHOLD: int = 0  # bytes; compress larger payloads in a thread pool, 0 disables
+    # "ordered" handles one event at a time per connection, "per_event" keeps order
+    # only within an event name, "concurrent" runs every event in its own task
+    DISPATCH_MODE: str = "ordered"
+    MAX_IN_FLIGHT: int = 64  # per connection, for "per_event" and "concurrent"
+    EXECUTOR_THREADS: Optional[int] = None  # pool sizes for offloaded handlers; None uses the defaults
+    EXECUTOR_PROCESSES: Optional[int] = None
+    # Seconds to gather emits to one connection into a single batch frame; 0 batches
+    # per loop tick, None sends every emit as its own frame
+    COALESCE_INTERVAL: Optional[float] = None
+    COALESCE_MAX_BATCH: int = 256  # flush early once this many messages are buffered
+    # Room emits kept per room so a reconnecting client can resume with join_room(since=seq);
+    # 0 disables history and the "room"/"seq" fields it adds to room envelopes
+    ROOM_HISTORY: int = 0
+    ROOM_HISTORY_BYTES: int = 1024 * 1024  # encoded bytes kept per room
+    HISTORY_MAX_BYTES: int = 64 * 1024 * 1024  # across all rooms; least recently written rooms go first
+    ROOM_STATE_MAX_DELTAS: int = 64  # deltas sent after the cached snapshot before joins rebuild it
+    TOPIC_CACHE_SIZE: int = 4096  # topics whose pattern matches are cached; see PySocketServer.subscribe
+    BRIDGE_MAX_BATCH: int = 1024  # thread-safe emits delivered per loop callback
+    MAX_CONNECTIONS: Optional[int] = None  # further handshakes are refused with 503; None is unlimited
+    # Token buckets allowing RATE per second in bursts of up to BURST (defaults to RATE); None disables
+    CONNECTION_RATE: Optional[float] = None  # inbound events per connection
+    CONNECTION_BURST: Optional[float] = None
+    RATE_LIMIT_POLICY: str = "drop"  # for events over CONNECTION_RATE: "drop" or "disconnect"
+    ROOM_RATE: Optional[float] = None  # emits per room, counted on the emitting node
+    ROOM_BURST: Optional[float] = None
+    # Seconds the event loop may run late before new connections are refused and
+    # inbound events are shed; None disables the monitor
+    LOOP_LAG_LIMIT: Optional[float] = None
+    LOOP_LAG_INTERVAL: float = 0.1
+    METRICS: bool = False  # record counters and histograms; see pysocket.metrics
+    METRICS_PORT: Optional[int] = None  # serve Prometheus text on http://HOST:METRICS_PORT/metrics
+    CODEC: str = "json"  # used when the client does not negotiate a subprotocol
+    MIDDLEWARE: List[Callable] = []  # async (connection, path) -> bool, run once per connection
+    MESSAGE_MIDDLEWARE: List[Callable] = []  # async (connection, event, data) -> bool, run per event
 
 settings = Settings()
\ No newline at end of file
@@ -13,6 +13,7 @@ except ModuleNotFoundError as e:
 
 # Now import your socket server
 from pysocket.serverConfig.socketServer import PySocketServer
+from pysocket.serverConfig.schema import Schema
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +21,14 @@ logger = logging.getLogger("pysocket")
 
 server = PySocketServer()  # Now purely in-memory
 
+# Payload schemas: malformed events are answered with an error before the handler runs
+class Join(Schema):
+    room: str
+
+class Message(Schema):
+    room: str
+    message: str
+
 # Example middleware
 @server.add_middleware
 async def auth_middleware(websocket, path):
@@ -33,29 +42,27 @@ async def on_connect(ws, _):
     logger.info(f"Client connected: {id(ws)}")
 
 @server.on("join")
-async def join(ws, data):
-    room = data.get("room")
+async def join(ws, data: Join):
+    room = data.room
     if not room:
         await server.emit("error", {"message": "Room not specified"}, to=ws)
         return
-        
+
     server.join_room(ws, room)
     await server.emit("joined", {"room": room}, room=room)
     logger.info(f"Client {id(ws)} joined room {room}")
 
 @server.on("message")
-async def handle_message(ws, data):
-    room = data.get("room")
-    msg = data.get("message")
-    if not room or not msg:
+async def handle_message(ws, data: Message):
+    if not data.room or not data.message:
         await server.emit("error", {"message": "Invalid message format"}, to=ws)
         return
-        
+
     await server.emit("message", {
-        "message": msg,
+        "message": data.message,
         "sender": str(id(ws)),
         "timestamp": asyncio.get_event_loop().time()
-    }, room=room)
+    }, room=data.room)
 
 @server.on("broadcast")
 async def handle_broadcast(ws, data):
@@ -70,7 +77,7 @@ async def handle_broadcast(ws, data):
     })
 
 if __name__ == "__main__":
-    server.run(host="0.0.0.0", port=8765)
+    server.run_forever(host="0.0.0.0", port=8765)
 
 
 # # run_server.py
@@ -11,5 +11,9 @@ setup(
     install_requires=[
         "websockets>=11.0",
     ],
+    extras_require={
+        "fast": ["orjson>=3.6", "msgpack>=1.0", "uvloop>=0.17; sys_platform != 'win32'"],
+        "bench": ["uvicorn[standard]>=0.20", "daphne>=4.0"],
+    },
     python_requires=">=3.8",
 )
@@ -0,0 +1,10 @@
+import pytest
+
+from pysocket.settings import settings
+
+
+@pytest.fixture(params=["streams", "protocol"])
+def engine(request, monkeypatch):
+    """Run the test once on each transport engine."""
+    monkeypatch.setattr(settings, "ENGINE", request.param)
+    return request.param
@@ -0,0 +1,76 @@
+import asyncio
+
+from pysocket import PySocketServer
+from pysocket.backplane import MemoryBackplane, MemoryHub
+
+
+class _Node:
+    def __init__(self, hub):
+        self.backplane = MemoryBackplane(hub)
+        self.server = PySocketServer(backplane=self.backplane)
+        self.delivered = []
+        self.server._deliver = lambda event, data, room=None, to=None: self.delivered.append((room, event, data))
+
+
+def test_published_data_is_captured_at_publish_time():
+    hub = MemoryHub()
+    sender, receiver = _Node(hub), _Node(hub)
+
+    async def main():
+        await sender.server.start()
+        await receiver.server.start()
+        data = {"scores": [1, 2]}
+        await sender.server.emit("score", data, room="game")
+        data["scores"].append(3)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert receiver.delivered == [("game", "score", {"scores": [1, 2]})]
+
+
+def test_emits_in_one_tick_arrive_in_order_and_skip_the_sender():
+    hub = MemoryHub()
+    sender, receiver = _Node(hub), _Node(hub)
+
+    async def main():
+        await sender.server.start()
+        await receiver.server.start()
+        for i in range(5):
+            await sender.server.emit("tick", i, room=f"room{i % 2}")
+        await sender.server.emit("all", None)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert receiver.delivered == [(f"room{i % 2}", "tick", i) for i in range(5)] + [(None, "all", None)]
+    assert [item for item in sender.delivered if item[1] == "tick"] == receiver.delivered[:5]
+
+
+def test_unencodable_data_is_not_published():
+    hub = MemoryHub()
+    sender, receiver = _Node(hub), _Node(hub)
+
+    async def main():
+        await sender.server.start()
+        await receiver.server.start()
+        await sender.server.emit("bad", object(), room="game")
+        await sender.server.emit("good", 1, room="game")
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert receiver.delivered == [("game", "good", 1)]
+
+
+def test_integers_msgpack_cannot_hold_are_still_delivered_locally():
+    hub = MemoryHub()
+    sender, receiver = _Node(hub), _Node(hub)
+
+    async def main():
+        await sender.server.start()
+        await receiver.server.start()
+        await sender.server.emit("big", {"x": 2 ** 70}, room="game")
+        await sender.server.emit("good", 1, room="game")
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert sender.delivered == [("game", "big", {"x": 2 ** 70}), ("game", "good", 1)]
+    assert receiver.delivered == [("game", "good", 1)]
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+from pysocket import PySocketServer
+from pysocket.settings import settings
+
+
+def _recording_server():
+    server = PySocketServer()
+    server.delivered = []
+    server._deliver = lambda event, data, room=None, to=None: server.delivered.append((event, data))
+    return server
+
+
+def test_emits_from_threads_arrive_in_order_per_thread(monkeypatch):
+    monkeypatch.setattr(settings, "BRIDGE_MAX_BATCH", 16)
+    server = _recording_server()
+
+    def emit_all(name):
+        for i in range(200):
+            server.emit_threadsafe(name, i)
+
+    async def main():
+        await server.start()
+        threads = [threading.Thread(target=emit_all, args=(f"thread{n}",)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        while len(server.delivered) < 800:
+            await asyncio.sleep(0.01)
+        for thread in threads:
+            thread.join()
+
+    asyncio.run(main())
+    for n in range(4):
+        assert [data for event, data in server.delivered if event == f"thread{n}"] == list(range(200))
+
+
+def test_emits_before_start_are_delivered_once_it_does():
+    server = _recording_server()
+    server.emit_threadsafe("early", 1)
+
+    async def main():
+        await server.start()
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert server.delivered == [("early", 1)]
+
+
+def test_emits_after_the_loop_stops_wait_for_the_next_one():
+    server = _recording_server()
+    stopped = asyncio.new_event_loop()
+    stopped.run_until_complete(server.start())
+    # Scheduled on a loop that is not running and never will be again
+    server.emit_threadsafe("stopped", 1)
+    stopped.close()
+
+    async def attach():
+        server.bridge.attach(asyncio.get_running_loop())
+        await asyncio.sleep(0)
+
+    asyncio.run(attach())
+    assert server.delivered == [("stopped", 1)]
+    # That loop is closed now, so this one is held without raising
+    server.emit_threadsafe("closed", 2)
+    assert len(server.bridge) == 1
+    asyncio.run(attach())
+    assert server.delivered == [("stopped", 1), ("closed", 2)]
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from pysocket import PySocketServer
+from pysocket.serverConfig.socketServer import CallError
+
+from wsclient import Client, serving
+
+
+def _server():
+    server = PySocketServer()
+    connected = []
+
+    @server.on("hello")
+    async def hello(ws, data):
+        connected.append(ws)
+        return "hi"
+
+    return server, connected
+
+
+async def _connected(server, connected, port):
+    client = await Client.connect(port)
+    client.send("hello", id=1)
+    assert await client.recv() == {"ack": 1, "data": "hi"}
+    return client, connected[-1]
+
+
+def test_calls_are_answered_out_of_order(engine):
+    server, connected = _server()
+
+    async def main():
+        async with serving(server) as port:
+            client, connection = await _connected(server, connected, port)
+            first = asyncio.ensure_future(server.call(connection, "ask", 1, timeout=2))
+            second = asyncio.ensure_future(server.call(connection, "ask", 2, timeout=2))
+            asks = [await client.recv(), await client.recv()]
+            client.send_raw({"ack": asks[1]["id"], "data": "two"})
+            client.send_raw({"ack": asks[0]["id"], "error": "no"})
+            assert await second == "two"
+            with pytest.raises(CallError):
+                await first
+            await client.close()
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("ack", [[1], {"id": 1}, 1.0, True])
+def test_malformed_acks_are_ignored(ack):
+    server, connected = _server()
+
+    async def main():
+        async with serving(server) as port:
+            client, connection = await _connected(server, connected, port)
+            call = asyncio.ensure_future(server.call(connection, "ask", timeout=2))
+            ask = await client.recv()
+            client.send_raw({"ack": ack, "data": "wrong"})
+            client.send_raw({"ack": ask["id"], "data": "right"})
+            assert await call == "right"
+            # The connection survived the malformed ack
+            client.send("hello", id=2)
+            assert await client.recv() == {"ack": 2, "data": "hi"}
+            await client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+import asyncio
+
+from pysocket import PySocketServer
+from pysocket.settings import settings
+
+from wsclient import Client, serving
+
+
+async def _connected(server, port):
+    client = await Client.connect(port)
+    while not server.clients:
+        await asyncio.sleep(0.01)
+    return client, next(iter(server.clients))
+
+
+def test_emits_in_one_tick_arrive_as_one_batch(monkeypatch, engine):
+    monkeypatch.setattr(settings, "COALESCE_INTERVAL", 0)
+    monkeypatch.setattr(settings, "COALESCE_MAX_BATCH", 3)
+    server = PySocketServer()
+
+    async def main():
+        async with serving(server) as port:
+            client, _ = await _connected(server, port)
+            for i in range(4):
+                await server.emit("tick", i)
+            full, rest = await client.recv(), await client.recv()
+            await server.emit("tick", 4)
+            single = await client.recv()
+            await client.close()
+            return full, rest, single
+
+    full, rest, single = asyncio.run(main())
+    # The fourth emit overflows COALESCE_MAX_BATCH and starts a new batch
+    assert full == {"batch": [{"event": "tick", "data": i} for i in range(3)]}
+    assert rest == {"event": "tick", "data": 3}
+    assert single == {"event": "tick", "data": 4}
+
+
+def test_emits_within_the_interval_share_a_batch(monkeypatch, engine):
+    monkeypatch.setattr(settings, "COALESCE_INTERVAL", 0.05)
+    server = PySocketServer()
+
+    async def main():
+        async with serving(server) as port:
+            client, _ = await _connected(server, port)
+            await server.emit("tick", 0)
+            await asyncio.sleep(0.01)
+            await server.emit("tick", 1)
+            batch = await client.recv()
+            await client.close()
+            return batch
+
+    assert asyncio.run(main()) == {"batch": [{"event": "tick", "data": 0}, {"event": "tick", "data": 1}]}
+
+
+def test_close_flushes_a_pending_batch(monkeypatch, engine):
+    monkeypatch.setattr(settings, "COALESCE_INTERVAL", 60)
+    server = PySocketServer()
+
+    async def main():
+        async with serving(server) as port:
+            client, connection = await _connected(server, port)
+            await server.emit("bye", 1)
+            await server.emit("bye", 2)
+            await connection.close()
+            received = [await client.recv(), await client.recv()]
+            await client.close()
+            return received
+
+    assert asyncio.run(main()) == [
+        {"batch": [{"event": "bye", "data": 1}, {"event": "bye", "data": 2}]},
+        ("close", 1000, ""),
+    ]
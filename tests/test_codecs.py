@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+import pytest
+
+from pysocket import PySocketServer
+from pysocket.codecs import get_codec, negotiate
+from pysocket.codecs.messagepack import msgpack, pack_array, packb, unpackb
+from pysocket.connectionEngine.frames import OP_BINARY, encode_frame
+
+from wsclient import Client, serving
+
+
+@pytest.mark.parametrize("value, encoded", [
+    (None, "c0"), (True, "c3"), (False, "c2"),
+    (0, "00"), (127, "7f"), (128, "cc80"), (256, "cd0100"), (2 ** 32, "cf0000000100000000"),
+    (-1, "ff"), (-32, "e0"), (-33, "d0df"), (-129, "d1ff7f"), (-2 ** 31 - 1, "d3ffffffff7fffffff"),
+    (1.5, "cb3ff8000000000000"),
+    ("a", "a161"), ("x" * 32, "d920" + "78" * 32),
+    (b"\x00", "c40100"),
+    ([1, 2], "920102"), ((1, 2), "920102"),
+    ({"a": 1}, "81a16101"),
+])
+def test_fallback_packer_matches_the_spec(value, encoded):
+    assert packb(value).hex() == encoded
+    assert unpackb(bytes.fromhex(encoded)) == (list(value) if isinstance(value, tuple) else value)
+
+
+@pytest.mark.parametrize("size", [0, 15, 16, 255, 256, 65535, 65536])
+def test_fallback_round_trips_containers_at_every_length_encoding(size):
+    value = {
+        "text": "é" * size,
+        "blob": os.urandom(size),
+        "list": list(range(size)) if size < 1000 else [0] * size,
+        "map": {str(i): i for i in range(min(size, 70000))},
+    }
+    assert unpackb(packb(value)) == value
+
+
+def test_fallback_rejects_bad_input():
+    with pytest.raises(TypeError):
+        packb(object())
+    with pytest.raises(ValueError):
+        unpackb(b"\x92\x01")
+    with pytest.raises(ValueError):
+        unpackb(b"\x01\x02")
+    with pytest.raises(ValueError):
+        get_codec("msgpack").decode("text")
+    # The same error msgpack raises for integers that do not fit in 64 bits
+    for value in (2 ** 64, -2 ** 63 - 1):
+        with pytest.raises(OverflowError):
+            packb({"x": value})
+    assert unpackb(packb([2 ** 64 - 1, -2 ** 63])) == [2 ** 64 - 1, -2 ** 63]
+
+
+def test_codec_join_splices_encoded_messages():
+    for name in ("json", "msgpack"):
+        codec = get_codec(name)
+        messages = [codec.encode({"event": "e", "data": i}) for i in range(3)]
+        assert codec.decode(codec.join(messages)) == {"batch": [{"event": "e", "data": i} for i in range(3)]}
+    assert unpackb(pack_array([packb("a"), packb(1)])) == ["a", 1]
+
+
+def test_negotiation_follows_the_client_preference():
+    assert negotiate(["unknown", "pysocket.msgpack", "pysocket.json"]) is get_codec("msgpack")
+    assert negotiate(["pysocket.json"]) is get_codec("json")
+    assert negotiate(["unknown"]) is None
+
+
+def test_a_negotiated_msgpack_connection_speaks_binary(engine):
+    server = PySocketServer()
+
+    @server.on("echo")
+    async def echo(ws, data):
+        return data
+
+    async def main():
+        async with serving(server) as port:
+            client = await Client.connect(port, headers="Sec-WebSocket-Protocol: pysocket.msgpack\r\n")
+            client.writer.write(encode_frame(OP_BINARY, packb({"event": "echo", "data": b"\x00\xff", "id": 1}),
+                                             mask=os.urandom(4)))
+            frame = await client.frame_in()
+            await client.close()
+            return client.response, frame
+
+    response, (opcode, payload) = asyncio.run(main())
+    assert b"Sec-WebSocket-Protocol: pysocket.msgpack\r\n" in response
+    assert opcode == OP_BINARY
+    assert unpackb(payload) == {"ack": 1, "data": b"\x00\xff"}
+
+
+def test_a_reply_msgpack_cannot_encode_is_answered_with_an_error(engine):
+    server = PySocketServer()
+
+    @server.on("huge")
+    async def huge(ws, data):
+        return 2 ** 70
+
+    async def main():
+        async with serving(server) as port:
+            client = await Client.connect(port, headers="Sec-WebSocket-Protocol: pysocket.msgpack\r\n")
+            for call_id in (1, 2):
+                client.writer.write(encode_frame(OP_BINARY, packb({"event": "huge", "id": call_id}),
+                                                 mask=os.urandom(4)))
+            frames = [await client.frame_in(), await client.frame_in()]
+            await client.close()
+            return [unpackb(payload) for _, payload in frames]
+
+    # The connection survives the first failure to answer the second call
+    assert asyncio.run(main()) == [{"ack": 1, "error": "Unserializable result"},
+                                   {"ack": 2, "error": "Unserializable result"}]
+
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack is not installed")
+def test_fallback_agrees_with_msgpack():
+    value = {"a": [1, -1, 2 ** 40, 1.5, None, True, "é", b"\x01"], "b": {"c": "x" * 300}}
+    assert packb(value) == msgpack.packb(value, use_bin_type=True)
+    assert unpackb(msgpack.packb(value, use_bin_type=True)) == value
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import zlib
+
+import pytest
+
+from pysocket import PySocketServer
+from pysocket.connectionEngine.deflate import PerMessageDeflate, compress, negotiate, parse_extensions
+from pysocket.connectionEngine.frames import FrameDecoder, OP_TEXT, encode_frame
+from pysocket.settings import settings
+
+from wsclient import Client, serving
+
+OFFER = "Sec-WebSocket-Extensions: permessage-deflate; client_max_window_bits\r\n"
+
+
+def test_parse_extensions():
+    assert parse_extensions('permessage-deflate; client_max_window_bits; server_max_window_bits="10", x-foo') == [
+        ("permessage-deflate", {"client_max_window_bits": None, "server_max_window_bits": "10"}),
+        ("x-foo", {}),
+    ]
+
+
+@pytest.mark.parametrize("offer, header", [
+    ("permessage-deflate",
+     "permessage-deflate; server_no_context_takeover"),
+    ("permessage-deflate; client_max_window_bits",
+     "permessage-deflate; server_no_context_takeover; client_max_window_bits=15"),
+    ("permessage-deflate; server_max_window_bits=10; client_no_context_takeover",
+     "permessage-deflate; server_no_context_takeover; client_no_context_takeover; server_max_window_bits=10"),
+    # Declined offers fall through to the next one
+    ("permessage-deflate; server_max_window_bits=8, permessage-deflate; mystery, permessage-deflate",
+     "permessage-deflate; server_no_context_takeover"),
+])
+def test_negotiation_answers_the_first_acceptable_offer(offer, header):
+    assert negotiate(offer).response_header() == header
+
+
+@pytest.mark.parametrize("offer", ["x-webkit-deflate-frame", "permessage-deflate; client_max_window_bits=16",
+                                   "permessage-deflate; server_max_window_bits=20"])
+def test_unacceptable_offers_are_declined(offer):
+    assert negotiate(offer) is None
+
+
+def test_server_context_takeover_follows_the_setting(monkeypatch):
+    monkeypatch.setattr(settings, "DEFLATE_CONTEXT_TAKEOVER", True)
+    assert negotiate("permessage-deflate").server_context_takeover
+    assert not negotiate("permessage-deflate; server_no_context_takeover").server_context_takeover
+
+
+@pytest.mark.parametrize("context", [False, True])
+def test_compressed_messages_decompress_in_order(context):
+    deflate = PerMessageDeflate(server_context_takeover=context)
+    inflate = zlib.decompressobj(-15)
+    for i in range(3):
+        message = b"repeated payload %d " % i * 20
+        assert inflate.decompress(deflate.compress(message) + b"\x00\x00\xff\xff") == message
+    assert compress(b"abc" * 50, 15, 6, 8) == PerMessageDeflate().compress(b"abc" * 50)
+
+
+class _Inflater:
+    def __init__(self):
+        self.decompressor = zlib.decompressobj(-15)
+
+    def decompress(self, payload, max_size):
+        return self.decompressor.decompress(payload + b"\x00\x00\xff\xff")
+
+
+def _deflating(client):
+    client._decoder = FrameDecoder(require_mask=False, inflater=_Inflater())
+    return client
+
+
+def test_negotiated_connections_exchange_compressed_messages(engine):
+    server = PySocketServer()
+
+    @server.on("echo")
+    async def echo(ws, data):
+        return data
+
+    async def main():
+        async with serving(server) as port:
+            client = _deflating(await Client.connect(port, headers=OFFER))
+            large = "x" * 1000
+            envelope = json.dumps({"event": "echo", "data": large, "id": 1}).encode()
+            client.writer.write(encode_frame(OP_TEXT, compress(envelope, 15, 6, 8), rsv1=True, mask=os.urandom(4)))
+            client.send("echo", "small", id=2)
+            replies = [await client.recv(), await client.recv()]
+            await client.close()
+            return client.response, replies
+
+    response, replies = asyncio.run(main())
+    assert b"Sec-WebSocket-Extensions: permessage-deflate; server_no_context_takeover" in response
+    assert replies == [{"ack": 1, "data": "x" * 1000}, {"ack": 2, "data": "small"}]
+
+
+def test_broadcasts_are_compressed_once_for_all_recipients():
+    server = PySocketServer()
+    raw_frames = []
+
+    async def main():
+        async with serving(server) as port:
+            clients = [await Client.connect(port, headers=OFFER) for _ in range(3)]
+            while len(server.clients) < 3:
+                await asyncio.sleep(0.01)
+            assert len({connection.frame_key for connection in server.clients}) == 1
+            await server.emit("news", "y" * 500)
+            for client in clients:
+                raw_frames.append(await client.reader.read(65536))
+                await client.close()
+
+    asyncio.run(main())
+    assert raw_frames[0] == raw_frames[1] == raw_frames[2]
+    assert raw_frames[0][0] & 0x40  # RSV1: compressed
+    assert len(raw_frames[0]) < 100
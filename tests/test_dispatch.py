@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from pysocket import PySocketServer
+from pysocket.serverConfig.dispatch import CONCURRENT, PER_EVENT, Dispatcher, offload
+from pysocket.settings import settings
+
+from wsclient import Client, serving
+
+
+def _square(data):
+    return data * data
+
+
+def _recorder(done):
+    async def handler(name, delay):
+        await asyncio.sleep(delay)
+        done.append(name)
+    return handler
+
+
+def test_per_event_dispatch_keeps_each_event_in_order():
+    done = []
+    handler = _recorder(done)
+
+    async def main():
+        dispatcher = Dispatcher(PER_EVENT, max_in_flight=10)
+        await dispatcher.dispatch("a", handler, "a1", 0.03)
+        await dispatcher.dispatch("a", handler, "a2", 0)
+        await dispatcher.dispatch("b", handler, "b1", 0.01)
+        await dispatcher.close()
+
+    asyncio.run(main())
+    assert done == ["b1", "a1", "a2"]
+
+
+def test_concurrent_dispatch_caps_handlers_in_flight():
+    done = []
+    handler = _recorder(done)
+
+    async def main():
+        dispatcher = Dispatcher(CONCURRENT, max_in_flight=2)
+        await dispatcher.dispatch("a", handler, "slow", 0.03)
+        await dispatcher.dispatch("a", handler, "fast", 0)
+        # Waits for a free slot, so it only starts once "fast" is done
+        await dispatcher.dispatch("a", handler, "third", 0)
+        assert done == ["fast"]
+        await dispatcher.close()
+
+    asyncio.run(main())
+    assert done == ["fast", "third", "slow"]
+
+
+@pytest.mark.parametrize("mode, acks", [
+    ("ordered", [1, 2, 3]),
+    ("per_event", [3, 1, 2]),
+    ("concurrent", [3, 2, 1]),
+])
+def test_dispatch_modes_order_replies(mode, acks, monkeypatch):
+    monkeypatch.setattr(settings, "DISPATCH_MODE", mode)
+    server = PySocketServer()
+
+    @server.on("sleep")
+    async def sleep(ws, data):
+        await asyncio.sleep(data)
+        return data
+
+    @server.on("now")
+    async def now(ws, data):
+        return data
+
+    async def main():
+        async with serving(server) as port:
+            client = await Client.connect(port)
+            client.send("sleep", 0.05, id=1)
+            client.send("sleep", 0.02, id=2)
+            client.send("now", None, id=3)
+            replies = [await client.recv() for _ in range(3)]
+            await client.close()
+            return replies
+
+    assert [reply["ack"] for reply in asyncio.run(main())] == acks
+
+
+def test_offloaded_handlers_run_off_the_event_loop(engine):
+    server = PySocketServer()
+    pool = ProcessPoolExecutor(1)
+    loop_thread = threading.get_ident()
+
+    @server.on("block")
+    @offload("thread")
+    def block(data):
+        time.sleep(data)
+        return threading.get_ident() != loop_thread
+
+    @server.on("ping")
+    async def ping(ws, data):
+        return "pong"
+
+    server.on("square", executor=pool)(_square)
+
+    async def main():
+        async with serving(server) as port:
+            blocked, other = await Client.connect(port), await Client.connect(port)
+            blocked.send("block", 0.2, id=1)
+            blocked.send("square", 7, id=2)
+            started = time.monotonic()
+            await asyncio.sleep(0.01)
+            other.send("ping", None, id=1)
+            # The loop keeps serving other connections while the thread sleeps
+            assert await other.recv() == {"ack": 1, "data": "pong"}
+            assert time.monotonic() - started < 0.15
+            replies = [await blocked.recv(), await blocked.recv()]
+            await blocked.close()
+            await other.close()
+            return replies
+
+    try:
+        replies = asyncio.run(main())
+    finally:
+        pool.shutdown()
+    assert replies == [{"ack": 1, "data": True}, {"ack": 2, "data": 49}]
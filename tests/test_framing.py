@@ -0,0 +1,135 @@
+import asyncio
+import os
+
+import pytest
+
+from pysocket import PySocketServer
+from pysocket.connectionEngine.frames import (
+    FrameDecoder, MessageTooBig, OP_BINARY, OP_CLOSE, OP_CONTINUATION, OP_PING, OP_TEXT,
+    ProtocolError, apply_mask, encode_close, encode_frame, parse_close,
+)
+from pysocket.connectionEngine.protocol import ProtocolConnection
+from pysocket.settings import settings
+
+from wsclient import Client, serving
+
+
+@pytest.mark.parametrize("size", [0, 1, 125, 126, 65535, 65536, 200000])
+def test_masked_frames_round_trip_at_every_length_encoding(size):
+    payload = os.urandom(size)
+    frame = encode_frame(OP_BINARY, payload, mask=os.urandom(4))
+    assert FrameDecoder().feed(frame) == [(OP_BINARY, payload)]
+
+
+def test_apply_mask_is_its_own_inverse():
+    mask = b"\x01\x02\x03\x04"
+    data = b"hello, websocket"
+    masked = apply_mask(data, mask)
+    assert masked != data
+    assert apply_mask(masked, mask) == data
+    assert apply_mask(memoryview(masked)[2:], mask) != data[2:]
+
+
+def test_decoder_reassembles_fragments_across_feeds():
+    mask = os.urandom(4)
+    frames = (encode_frame(OP_TEXT, b"hel", fin=False, mask=mask)
+              + encode_frame(OP_PING, b"p", mask=mask)
+              + encode_frame(OP_CONTINUATION, b"lo", mask=mask))
+    decoder = FrameDecoder()
+    received = []
+    for i in range(len(frames)):
+        received += decoder.feed(frames[i:i + 1])
+    assert received == [(OP_PING, b"p"), (OP_TEXT, b"hello")]
+
+
+def test_decoder_rejects_unmasked_client_frames():
+    with pytest.raises(ProtocolError):
+        FrameDecoder().feed(encode_frame(OP_TEXT, b"x"))
+
+
+def test_decoder_enforces_max_size():
+    with pytest.raises(MessageTooBig):
+        FrameDecoder(max_size=10).feed(encode_frame(OP_TEXT, b"x" * 11, mask=os.urandom(4)))
+
+
+def test_close_payload_round_trip():
+    frame = encode_close(1012, "reconnect")
+    [(opcode, payload)] = FrameDecoder(require_mask=False).feed(frame)
+    assert opcode == OP_CLOSE
+    assert parse_close(payload) == (1012, "reconnect")
+
+
+def test_messages_before_a_close_in_the_same_write_are_handled(engine):
+    server = PySocketServer()
+    handled = []
+
+    @server.on("note")
+    async def note(ws, data):
+        handled.append(data)
+
+    async def main():
+        async with serving(server) as port:
+            client = await Client.connect(port)
+            client.writer.write(client.frame("note", 1) + client.frame("note", 2) + client.close_frame())
+            reply = await client.recv()
+            await client.close()
+            return reply
+
+    reply = asyncio.run(main())
+    assert handled == [1, 2]
+    assert reply == ("close", 1000, "")
+
+
+def test_messages_before_eof_are_handled(engine):
+    server = PySocketServer()
+    handled = []
+
+    @server.on("note")
+    async def note(ws, data):
+        handled.append(data)
+
+    async def main():
+        async with serving(server) as port:
+            client = await Client.connect(port)
+            client.writer.write(client.frame("note", 1))
+            client.writer.write_eof()
+            while server.clients or not handled:
+                await asyncio.sleep(0.01)
+            await client.close()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    assert handled == [1]
+
+
+class _Transport:
+    def __init__(self):
+        self.reading = True
+
+    def pause_reading(self):
+        self.reading = False
+
+    def resume_reading(self):
+        self.reading = True
+
+
+def test_a_flood_pauses_reading_until_messages_are_received(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_LIMIT", 1024)
+    connection = ProtocolConnection(None)
+    connection.transport = transport = _Transport()
+    connection._accepted = True
+    frame = encode_frame(OP_TEXT, b"", mask=os.urandom(4))
+
+    async def main():
+        received = 0
+        while transport.reading:
+            connection.data_received(frame * 8)
+        queued = len(connection._pending)
+        while not transport.reading:
+            assert await connection.receive() == ""
+            received += 1
+        return queued, received
+
+    queued, received = asyncio.run(main())
+    # Empty frames still count, and reading resumes once half the queue is gone
+    assert queued <= 2 * 1024 // 64 + 8
+    assert received >= queued // 2
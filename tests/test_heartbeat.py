@@ -0,0 +1,91 @@
+import asyncio
+import os
+
+import pytest
+
+from pysocket import PySocketServer
+from pysocket.connectionEngine.frames import OP_CLOSE, OP_PING, OP_PONG, encode_frame, parse_close
+from pysocket.connectionEngine.heartbeat import TimerWheel
+from pysocket.settings import settings
+
+from wsclient import Client, serving
+
+
+class _Item:
+    _wheel_slot = None
+
+    def __init__(self, name):
+        self.name = name
+
+
+def test_wheel_expires_items_in_order_across_laps():
+    fired = []
+    items = {}
+
+    async def main():
+        def on_expire(item):
+            fired.append(item.name)
+            # Re-arming from the callback keeps the wheel turning past its last slot
+            if item.name == "again" and fired.count("again") < 4:
+                wheel.schedule(item, 0.03)
+
+        wheel = TimerWheel(0.01, 0.03, on_expire)
+        for name, delay in (("late", 0.03), ("again", 0.03), ("early", 0.01), ("cancelled", 0.02)):
+            items[name] = _Item(name)
+            wheel.schedule(items[name], delay)
+        wheel.cancel(items["cancelled"])
+        assert len(wheel) == 3
+        while wheel._handle is not None:
+            await asyncio.sleep(0.01)
+        return len(wheel)
+
+    assert asyncio.run(main()) == 0
+    assert fired[0] == "early"
+    assert sorted(fired[1:3]) == ["again", "late"]
+    assert fired[3:] == ["again"] * 3
+    assert items["cancelled"]._wheel_slot is None
+
+
+def test_wheel_rejects_delays_past_its_horizon():
+    async def main():
+        wheel = TimerWheel(0.01, 0.03, lambda item: None)
+        with pytest.raises(ValueError):
+            wheel.schedule(_Item("far"), 1.0)
+
+    asyncio.run(main())
+
+
+async def _answer_pings(client):
+    while True:
+        frame = await client.frame_in()
+        if frame is None or frame[0] == OP_CLOSE:
+            return frame
+        if frame[0] == OP_PING:
+            client.writer.write(encode_frame(OP_PONG, frame[1], mask=os.urandom(4)))
+
+
+def test_silent_peers_are_pinged_then_closed_while_live_ones_stay(monkeypatch, engine):
+    monkeypatch.setattr(settings, "PING_INTERVAL", 0.05)
+    monkeypatch.setattr(settings, "PING_TIMEOUT", 0.05)
+    monkeypatch.setattr(settings, "HEARTBEAT_TICK", 0.01)
+    server = PySocketServer()
+
+    async def main():
+        async with serving(server) as port:
+            live = await Client.connect(port)
+            dead = await Client.connect(port)
+            answering = asyncio.ensure_future(_answer_pings(live))
+            while len(server.clients) < 2:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.4)
+            frames = [await dead.frame_in(), await dead.frame_in()]
+            remaining = len(server.clients)
+            answering.cancel()
+            await live.close()
+            await dead.close()
+            return frames, remaining
+
+    (ping, close), remaining = asyncio.run(main())
+    assert ping[0] == OP_PING
+    assert close[0] == OP_CLOSE and parse_close(close[1]) == (1011, "Ping timeout")
+    assert remaining == 1
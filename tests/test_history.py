@@ -0,0 +1,110 @@
+import asyncio
+
+from pysocket import PySocketServer
+from pysocket.codecs import get_codec
+from pysocket.serverConfig.history import RoomHistory
+from pysocket.settings import settings
+
+from wsclient import Client, serving
+
+
+def _history(size=3, room_bytes=1000, max_bytes=10000):
+    return RoomHistory(get_codec("json"), size, room_bytes, max_bytes)
+
+
+def _emit(history, room, text):
+    seq = history.next_seq()
+    history.record(room, seq, text)
+    return seq
+
+
+def test_since_replays_what_followed_a_sequence_id():
+    history = _history()
+    first = _emit(history, "a", "1")
+    _emit(history, "b", "other room")
+    _emit(history, "a", "2")
+    last = _emit(history, "a", "3")
+    assert history.since("a", first) == ["2", "3"]
+    assert history.since("a", last) == []
+    assert history.since("quiet", last) == []
+
+
+def test_gaps_are_reported_instead_of_partial_replays():
+    history = _history(size=2)
+    first = _emit(history, "a", "1")
+    second = _emit(history, "a", "2")
+    _emit(history, "a", "3")
+    _emit(history, "a", "4")
+    assert history.since("a", first) is None
+    assert history.since("a", second) == ["3", "4"]
+    # Ids from another process or run fall outside the window
+    assert history.since("a", first - 1000) is None
+    assert history.since("a", second + 1000) is None
+
+
+def test_byte_limits_trim_rooms_and_evict_the_least_recent():
+    history = _history(size=100, room_bytes=10, max_bytes=15)
+    first = _emit(history, "a", "x" * 6)
+    second = _emit(history, "a", "y" * 6)
+    assert history.since("a", first - 1) is None
+    assert history.since("a", first) == ["y" * 6]
+    assert history.bytes == 6
+    _emit(history, "b", "z" * 6)
+    _emit(history, "c", "w" * 6)
+    # Room "a" was written least recently, so it goes first
+    assert len(history) == 2 and history.bytes == 12
+    assert history.since("a", first) is None
+    assert history.since("a", second) == []
+
+
+def _resumable_server():
+    server = PySocketServer()
+
+    @server.on("join")
+    async def join(ws, data):
+        return server.join_room(ws, data["room"], data.get("since"))
+
+    return server
+
+
+async def _join(client, room, since=None, call_id=1):
+    client.send("join", {"room": room, "since": since}, id=call_id)
+    messages = []
+    while True:
+        message = await client.recv()
+        if message.get("ack") == call_id:
+            return message["data"], messages
+        messages.append(message)
+
+
+def test_a_reconnecting_client_resumes_where_it_left_off(monkeypatch, engine):
+    monkeypatch.setattr(settings, "ROOM_HISTORY", 10)
+    server = _resumable_server()
+
+    async def main():
+        async with serving(server) as port:
+            client = await Client.connect(port)
+            await _join(client, "game")
+            await server.emit("move", 1, room="game")
+            seen = await client.recv()
+            assert (seen["room"], seen["data"]) == ("game", 1)
+            await client.close()
+            while server.clients:
+                await asyncio.sleep(0.01)
+            for move in (2, 3):
+                await server.emit("move", move, room="game")
+
+            client = await Client.connect(port)
+            resumed, missed = await _join(client, "game", since=seen["seq"])
+            await server.emit("move", 4, room="game")
+            live = await client.recv()
+            stale, _ = await _join(client, "game", since=seen["seq"] - 5, call_id=2)
+            await client.close()
+            return seen, resumed, missed, live, stale
+
+    seen, resumed, missed, live, stale = asyncio.run(main())
+    assert resumed is True
+    assert [message["data"] for message in missed] == [2, 3]
+    assert [message["seq"] for message in missed] == [seen["seq"] + 1, seen["seq"] + 2]
+    assert (live["data"], live["seq"]) == (4, seen["seq"] + 3)
+    assert stale is False
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from pysocket import PySocketServer
+from pysocket.middleware.cache import ResultCache
+
+from wsclient import Client, serving
+
+
+def test_middleware_added_after_start_applies():
+    server = PySocketServer()
+    server.middleware = []
+    seen = []
+
+    @server.on("note")
+    async def note(ws, data):
+        seen.append(data)
+        return data
+
+    async def main():
+        async with serving(server) as port:
+            client = await Client.connect(port)
+            client.send("note", "before", id=1)
+            assert await client.recv() == {"ack": 1, "data": "before"}
+
+            @server.add_message_middleware
+            async def no_secrets(connection, event, data):
+                return data != "secret"
+
+            @server.add_middleware
+            async def closed(connection, path):
+                return False
+
+            client.send("note", "secret", id=2)
+            client.send("note", "after", id=3)
+            assert await client.recv() == {"ack": 3, "data": "after"}
+            refused = await Client.connect(port)
+            rejection = await refused.recv()
+            await client.close()
+            await refused.close()
+            return rejection
+
+    assert asyncio.run(main()) == ("close", 1000, "")
+    assert seen == ["before", "after"]
+
+
+def test_middleware_lists_are_frozen_once_started():
+    server = PySocketServer()
+    server.middleware = []
+    server.middleware.append(lambda connection, path: True)
+
+    async def main():
+        await server.start()
+
+    asyncio.run(main())
+    assert len(server.middleware) == 1
+    with pytest.raises(AttributeError):
+        server.middleware.append(lambda connection, path: True)
+    with pytest.raises(AttributeError):
+        server.message_middleware.append(lambda connection, event, data: True)
+
+
+def test_concurrent_misses_share_one_call():
+    cache = ResultCache(ttl=60)
+    calls = []
+
+    async def lookup():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "user"
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_call("token", lookup) for _ in range(5)))
+        assert await cache.get_or_call("token", lookup) == "user"
+        return results
+
+    assert asyncio.run(main()) == ["user"] * 5
+    assert len(calls) == 1
+
+
+def test_cancelling_the_caller_making_the_call_does_not_cancel_the_others():
+    cache = ResultCache(ttl=60)
+    calls = []
+
+    async def lookup():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_call("token", lookup))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(cache.get_or_call("token", lookup)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results
+
+    # One waiter takes over the call and the rest share its result
+    assert asyncio.run(main()) == [2, 2, 2]
+    assert len(calls) == 2
+
+
+def test_cancelling_a_waiter_leaves_the_call_running():
+    cache = ResultCache(ttl=60)
+
+    async def lookup():
+        await asyncio.sleep(0.02)
+        return "user"
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_call("token", lookup))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_call("token", lookup))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        assert await leader == "user"
+        assert waiter.cancelled()
+
+    asyncio.run(main())
+
+
+def test_falsy_results_use_the_negative_ttl():
+    cache = ResultCache(ttl=60, negative_ttl=0)
+
+    async def deny():
+        return False
+
+    async def main():
+        assert await cache.get_or_call("a", deny) is False
+        assert len(cache) == 0
+
+    asyncio.run(main())
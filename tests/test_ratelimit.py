@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+from pysocket import PySocketServer
+from pysocket.serverConfig.ratelimit import KeyedBuckets, LoopMonitor, TokenBucket
+from pysocket.settings import settings
+
+from wsclient import Client, serving
+
+
+def test_token_bucket_refills_with_elapsed_time():
+    bucket = TokenBucket(10, burst=2)
+    assert bucket.take() and bucket.take()
+    assert not bucket.take()
+    bucket.stamp -= 0.1
+    assert bucket.take()
+    assert not bucket.take()
+    # Idle time refills up to the burst and no further
+    bucket.stamp -= 60
+    assert bucket.take(2)
+    assert not bucket.take()
+
+
+def test_keyed_buckets_limit_each_key_and_forget_full_ones():
+    buckets = KeyedBuckets(1, burst=1, min_prune=4)
+    assert buckets.take("a") and not buckets.take("a")
+    for key in "bcd":
+        assert buckets.take(key)
+    for key in "ab":
+        buckets._buckets[key].stamp -= 10
+    # The fifth key sweeps the table, dropping the refilled buckets
+    assert buckets.take("e")
+    assert sorted(buckets._buckets) == ["c", "d", "e"]
+    assert buckets.take("a") and not buckets.take("c")
+
+
+def test_loop_monitor_flags_a_blocked_loop_until_it_catches_up():
+    monitor = LoopMonitor(limit=0.05, interval=0.01)
+
+    async def main():
+        monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)
+        while not monitor.overloaded:
+            await asyncio.sleep(0)
+        lag = monitor.lag
+        await asyncio.sleep(0.05)
+        recovered = not monitor.overloaded
+        monitor.stop()
+        return lag, recovered
+
+    lag, recovered = asyncio.run(main())
+    assert lag > 0.05
+    assert recovered
+
+
+def test_max_connections_refuses_handshakes_until_a_slot_is_released(monkeypatch, engine):
+    monkeypatch.setattr(settings, "MAX_CONNECTIONS", 1)
+    server = PySocketServer()
+
+    async def main():
+        async with serving(server) as port:
+            first = await Client.connect(port)
+            refused = await Client.connect(port)
+            await first.close()
+            while server._admitted:
+                await asyncio.sleep(0.01)
+            last = await Client.connect(port)
+            await refused.close()
+            await last.close()
+            return first.response, refused.response, last.response
+
+    first, refused, last = asyncio.run(main())
+    assert first.startswith(b"HTTP/1.1 101")
+    assert refused.startswith(b"HTTP/1.1 503")
+    assert last.startswith(b"HTTP/1.1 101")
+
+
+def test_silent_sockets_time_out_without_holding_a_slot(monkeypatch, engine):
+    monkeypatch.setattr(settings, "MAX_CONNECTIONS", 1)
+    monkeypatch.setattr(settings, "HANDSHAKE_TIMEOUT", 0.1)
+    server = PySocketServer()
+
+    async def main():
+        async with serving(server) as port:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await asyncio.sleep(0.01)
+            client = await Client.connect(port)
+            silent = await asyncio.wait_for(reader.read(), 2)
+            await client.close()
+            writer.close()
+            return client.response, silent
+
+    response, silent = asyncio.run(main())
+    assert response.startswith(b"HTTP/1.1 101")
+    assert silent == b""
+
+
+def test_a_lagging_loop_sheds_new_connections_and_events(monkeypatch):
+    monkeypatch.setattr(settings, "LOOP_LAG_LIMIT", 0.05)
+    monkeypatch.setattr(settings, "LOOP_LAG_INTERVAL", 60)
+    server = PySocketServer()
+
+    @server.on("echo")
+    async def echo(ws, data):
+        return data
+
+    async def main():
+        async with serving(server) as port:
+            client = await Client.connect(port)
+            server.load.overloaded = True
+            client.send("echo", "shed", id=1)
+            refused = await Client.connect(port)
+            server.load.overloaded = False
+            client.send("echo", "kept", id=2)
+            reply = await client.recv()
+            await refused.close()
+            await client.close()
+            return refused.response, reply
+
+    refused, reply = asyncio.run(main())
+    assert refused.startswith(b"HTTP/1.1 503")
+    assert reply == {"ack": 2, "data": "kept"}
@@ -0,0 +1,212 @@
+import asyncio
+import copy
+import random
+
+import pytest
+
+from pysocket import PySocketServer
+from pysocket.backplane import MemoryBackplane, MemoryHub
+from pysocket.connectionEngine.connection import WebSocketConnection
+from pysocket.codecs import get_codec
+from pysocket.serverConfig.roomstate import RoomStates, apply_delta, diff
+from pysocket.settings import settings
+
+from wsclient import Client, serving
+
+
+@pytest.mark.parametrize("old, new", [
+    ({"a": 1}, {"a": 2}),
+    ({"a": 1, "b": 2}, {"a": 1}),
+    ({"a": [1, 2]}, {"a": [1, 2, 3, 4]}),
+    ({"a": [1, 2, 3]}, {"a": [1]}),
+    ({"a": {"b": {"c": 1}}}, {"a": {"b": {"c": 1, "d": [True]}}}),
+    ([1, "x"], {"now": "a dict"}),
+    (None, {"a": 1}),
+    ({"n": 1}, {"n": 1.0}),
+])
+def test_diff_then_apply_reproduces_the_new_state(old, new):
+    ops = diff(old, new)
+    assert apply_delta(copy.deepcopy(old), ops) == new
+
+
+def _random_value(rng, depth=0):
+    kind = rng.randrange(5 if depth < 3 else 3)
+    if kind == 0:
+        return rng.randrange(4)
+    if kind == 1:
+        return rng.choice(["a", "b", None, True])
+    if kind == 2:
+        return rng.random()
+    if kind == 3:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {rng.choice("wxyz"): _random_value(rng, depth + 1) for _ in range(rng.randrange(4))}
+
+
+def test_diff_then_apply_on_random_states():
+    rng = random.Random(7)
+    for _ in range(500):
+        old, new = _random_value(rng), _random_value(rng)
+        assert apply_delta(copy.deepcopy(old), diff(old, new)) == new
+
+
+def test_unchanged_state_has_no_ops():
+    assert diff({"a": [1, {"b": 2}]}, {"a": [1, {"b": 2}]}) == []
+
+
+def test_patches_apply_whole_or_not_at_all():
+    states = RoomStates(get_codec("json"))
+    with pytest.raises(KeyError):
+        states.patch("empty", [["set", ["score"], 1]])
+    assert states.version("empty") == 0 and states.join_messages("empty", get_codec("json")) == []
+    states.update("game", {"score": 1, "players": ["ann"]})
+    for ops in ([["set", ["score"], 2], ["del", ["missing"]]],
+                [["ext", ["players"], ["bob"]], ["bogus", []]]):
+        with pytest.raises(ValueError):
+            states.patch("game", ops)
+    assert states.get("game") == {"score": 1, "players": ["ann"]}
+    assert states.version("game") == 1
+    assert states.patch("game", [["set", ["score"], 2]])["version"] == 2
+
+
+def _state_server():
+    server = PySocketServer()
+
+    @server.on("join")
+    async def join(ws, data):
+        server.join_room(ws, data)
+        return True
+
+    return server
+
+
+async def _joined(port, room):
+    client = await Client.connect(port)
+    client.send("join", room, id=1)
+    messages = []
+    while True:
+        message = await client.recv()
+        if message.get("ack") == 1:
+            return client, messages
+        messages.append(message)
+
+
+def test_members_get_a_snapshot_on_join_then_deltas(engine):
+    server = _state_server()
+
+    async def main():
+        async with serving(server) as port:
+            server.set_state("game", {"score": 0, "players": ["ann"]})
+            client, messages = await _joined(port, "game")
+            [snapshot] = [m for m in messages if m["event"] == "state"]
+            state = snapshot["data"]["state"]
+            assert snapshot["data"]["version"] == 1
+            server.set_state("game", {"score": 3, "players": ["ann", "bob"]})
+            update = await client.recv()
+            assert update["event"] == "state" and update["data"]["version"] == 2
+            state = apply_delta(state, update["data"]["delta"])
+            await client.close()
+            return state
+
+    assert asyncio.run(main()) == {"score": 3, "players": ["ann", "bob"]}
+
+
+def test_state_deltas_skip_the_room_rate_limit(monkeypatch):
+    monkeypatch.setattr(settings, "ROOM_RATE", 0.001)
+    monkeypatch.setattr(settings, "ROOM_BURST", 1)
+    server = _state_server()
+
+    async def main():
+        async with serving(server) as port:
+            client, _ = await _joined(port, "game")
+            await server.emit("chat", "uses up the burst", room="game")
+            await server.emit("chat", "rate limited", room="game")
+            for score in range(1, 4):
+                server.set_state("game", {"score": score})
+            received = [await client.recv() for _ in range(4)]
+            await client.close()
+            return received
+
+    received = asyncio.run(main())
+    assert received[0] == {"event": "chat", "data": "uses up the burst"}
+    assert [m["data"]["version"] for m in received[1:]] == [1, 2, 3]
+
+
+def test_state_is_not_published_to_the_backplane():
+    backplane = MemoryBackplane(MemoryHub())
+    published = []
+    backplane.publish = lambda event, data, room=None: published.append(event)
+    server = PySocketServer(backplane=backplane)
+
+    async def main():
+        await server.start()
+        server.set_state("game", {"score": 1})
+        server.patch_state("game", [["set", ["score"], 2]])
+        await server.emit("chat", "hi", room="game")
+
+    asyncio.run(main())
+    assert published == ["chat"]
+    assert server.get_state("game") == {"score": 2}
+
+
+def test_a_failed_patch_sends_nothing(engine):
+    server = _state_server()
+
+    async def main():
+        async with serving(server) as port:
+            server.set_state("game", {"score": 0})
+            client, _ = await _joined(port, "game")
+            with pytest.raises(ValueError):
+                server.patch_state("game", [["set", ["score"], 1], ["set", ["a", "b"], 2]])
+            with pytest.raises(KeyError):
+                server.patch_state("lobby", [["set", ["score"], 1]])
+            server.patch_state("game", [["set", ["score"], 5]])
+            update = await client.recv()
+            await client.close()
+            return update
+
+    update = asyncio.run(main())
+    assert update["data"] == {"room": "game", "version": 2, "delta": [["set", ["score"], 5]]}
+    assert server.get_state("lobby") is None
+
+
+def _filled(policy, monkeypatch, size=2):
+    monkeypatch.setattr(settings, "SLOW_CONSUMER_POLICY", policy)
+    connection = WebSocketConnection()
+    connection.send_queue_size = size
+    return connection
+
+
+@pytest.mark.parametrize("policy", ["drop_oldest", "drop_newest"])
+def test_a_required_frame_that_does_not_fit_closes_the_connection(policy, monkeypatch):
+    async def main():
+        connection = _filled(policy, monkeypatch)
+        # Nothing is written until the loop runs, so the queue fills up
+        assert connection.send_frame(b"1") and connection.send_frame(b"2")
+        assert not connection.send_frame(b"state", required=True)
+        assert connection._closed
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+
+def test_drop_oldest_closes_rather_than_drop_a_required_frame(monkeypatch):
+    async def main():
+        connection = _filled("drop_oldest", monkeypatch)
+        assert connection.send_frame(b"state", required=True) and connection.send_frame(b"1")
+        assert not connection.send_frame(b"2")
+        assert connection._closed
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+
+def test_drop_oldest_still_drops_plain_frames(monkeypatch):
+    async def main():
+        connection = _filled("drop_oldest", monkeypatch)
+        assert connection.send_frame(b"1") and connection.send_frame(b"state", required=True)
+        assert connection.send_frame(b"2")
+        assert not connection._closed
+        assert [getattr(frame, "frame", frame) for frame in connection._outbound] == [b"state", b"2"]
+        connection._writer_task.cancel()
+
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+import asyncio
+import inspect
+import os
+import signal
+import subprocess
+import sys
+
+import pysocket
+from pysocket import PySocketServer
+from pysocket.bench.util import free_port
+from pysocket.serverConfig.workers import WorkerSupervisor
+
+from wsclient import Client
+
+
+async def _connect(port):
+    for _ in range(200):
+        try:
+            return await Client.connect(port)
+        except OSError:
+            await asyncio.sleep(0.025)
+    raise TimeoutError(f"Nothing listening on {port}")
+
+
+def test_run_is_a_coroutine_that_returns_after_sigterm(engine):
+    server = PySocketServer()
+    port = free_port()
+    assert inspect.iscoroutinefunction(server.run)
+
+    async def main():
+        serving = asyncio.ensure_future(server.run("127.0.0.1", port))
+        client = await _connect(port)
+        while not server.clients:
+            await asyncio.sleep(0.01)
+        os.kill(os.getpid(), signal.SIGTERM)
+        close = await client.recv()
+        await asyncio.wait_for(serving, 5)
+        await client.close()
+        return close
+
+    assert asyncio.run(main()) == ("close", 1012, "reconnect")
+
+
+def test_run_forever_blocks_until_sigterm():
+    port = free_port()
+    script = f"from pysocket import PySocketServer; PySocketServer().run_forever('127.0.0.1', {port}, workers=1)"
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(pysocket.__file__)))
+    process = subprocess.Popen([sys.executable, "-c", script], env=env)
+    try:
+        async def main():
+            client = await _connect(port)
+            assert client.response.startswith(b"HTTP/1.1 101")
+            await client.close()
+
+        asyncio.run(main())
+        assert process.poll() is None
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(10) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+
+def test_workers_that_keep_crashing_are_restarted_more_and_more_slowly():
+    supervisor = WorkerSupervisor(PySocketServer(), "127.0.0.1", 0, workers=2)
+    assert [supervisor._restart_delay(0, 0.1) for _ in range(6)] == [0.5, 1.0, 2.0, 4.0, 5.0, 5.0]
+    assert supervisor._restart_delay(1, 0.1) == 0.5
+    # A worker that stayed up resets its slot's backoff
+    assert supervisor._restart_delay(0, 30.0) == 0.0
+    assert supervisor._restart_delay(0, 0.1) == 0.5
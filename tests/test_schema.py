@@ -0,0 +1,137 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Union
+
+import pytest
+
+from pysocket import Failed, PySocketServer, Schema, SchemaError, WebSocketConsumer
+from pysocket.connectionEngine.connection import WebSocketConnection
+
+from wsclient import Client, serving
+
+
+class Point(Schema):
+    x: float
+    y: float
+
+
+class Shape(Schema):
+    name: str
+    points: List[Point]
+    tags: Dict[str, int] = {}
+    color: Optional[str] = None
+    meta: Any = None
+    size: Union[int, str] = 1
+
+
+class Tree(Schema):
+    value: int
+    children: List["Tree"] = []
+
+
+class Labelled(Point):
+    label: str = ""
+
+
+def test_decode_builds_typed_instances():
+    shape = Shape.decode({"name": "tri", "points": [{"x": 0, "y": 1.5}], "tags": {"a": 1}, "extra": True})
+    assert shape == Shape(name="tri", points=[Point(x=0.0, y=1.5)], tags={"a": 1})
+    assert type(shape.points[0].x) is float
+    assert shape.color is None and shape.size == 1
+    assert shape.to_dict() == {"name": "tri", "points": [{"x": 0.0, "y": 1.5}], "tags": {"a": 1},
+                               "color": None, "meta": None, "size": 1}
+
+
+def test_instances_are_slotted():
+    point = Point.decode({"x": 1, "y": 2})
+    with pytest.raises(AttributeError):
+        point.z = 3
+
+
+@pytest.mark.parametrize("data, path, message", [
+    ([], "", "expected object, got list"),
+    ({"points": []}, "name", "missing field"),
+    ({"name": 1, "points": []}, "name", "expected str, got int"),
+    ({"name": "a", "points": {}}, "points", "expected list, got dict"),
+    ({"name": "a", "points": [{"x": 1, "y": 1}, {"x": "1", "y": 1}]}, "points.1.x", "expected float, got str"),
+    ({"name": "a", "points": [], "tags": {"k": True}}, "tags.k", "expected int, got bool"),
+    ({"name": "a", "points": [], "color": 3}, "color", "expected str, got int"),
+    ({"name": "a", "points": [], "size": 1.5}, "size", "expected int or str, got float"),
+])
+def test_mismatches_name_the_offending_field(data, path, message):
+    error = Shape.validate(data)
+    assert type(error) is SchemaError
+    assert (error.path, error.message) == (tuple(path.split(".")) if path else (), message)
+    with pytest.raises(SchemaError) as raised:
+        Shape.decode(data)
+    assert str(raised.value) == (f"{path}: {message}" if path else message)
+
+
+def test_recursive_and_inherited_schemas():
+    tree = Tree.decode({"value": 1, "children": [{"value": 2, "children": [{"value": 3}]}]})
+    assert tree.children[0].children[0].value == 3
+    assert str(Tree.validate({"value": 1, "children": [{"value": "2"}]})) == "children.0.value: expected int, got str"
+    assert Labelled.decode({"x": 1, "y": 2, "label": "p"}).label == "p"
+    assert Labelled.decode({"x": 1, "y": 2}).label == ""
+    assert type(Point.decode({"x": 1, "y": 2})) is Point
+
+
+class _Recorder(WebSocketConnection):
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def send_frame(self, frame, required=False):
+        self.sent.append(json.loads(frame[2:]))
+        return True
+
+
+class Shapes(WebSocketConsumer):
+    async def handle_draw(self, data: Shape):
+        return data.name
+
+    @staticmethod
+    async def handle_ping(data):
+        return ["pong", data]
+
+    @classmethod
+    async def handle_kind(cls, data: Point):
+        return [cls.__name__, data.x]
+
+
+def test_consumer_handlers_decode_their_schema():
+    async def main():
+        connection = _Recorder()
+        consumer = Shapes(connection, PySocketServer())
+        assert await consumer.handle_event("draw", {"name": "sq", "points": []}) == "sq"
+        assert await consumer.handle_event("ping", 1) == ["pong", 1]
+        assert await consumer.handle_event("kind", {"x": 2, "y": 0}) == ["Shapes", 2.0]
+        failed = await consumer.handle_event("draw", {"points": []})
+        assert isinstance(failed, Failed) and failed.message == "Invalid draw: name: missing field"
+        assert connection.sent == [{"event": "error", "data": {"message": "Invalid draw: name: missing field"}}]
+        assert isinstance(await consumer.handle_event("erase", None), Failed)
+
+    asyncio.run(main())
+
+
+def test_server_handlers_reject_malformed_payloads_with_a_failed_ack():
+    server = PySocketServer()
+    handled = []
+
+    @server.on("move")
+    async def move(ws, data: Point):
+        handled.append(data)
+        return data.x + data.y
+
+    async def main():
+        async with serving(server) as port:
+            client = await Client.connect(port)
+            client.send("move", {"x": 1, "y": 2}, id=1)
+            assert await client.recv() == {"ack": 1, "data": 3.0}
+            client.send("move", {"x": 1}, id=2)
+            assert await client.recv() == {"event": "error", "data": {"message": "Invalid move: y: missing field"}}
+            assert await client.recv() == {"ack": 2, "error": "Invalid move: y: missing field"}
+            await client.close()
+
+    asyncio.run(main())
+    assert handled == [Point(x=1.0, y=2.0)]
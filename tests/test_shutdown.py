@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from pysocket import ASGIConnectionWrapper, PySocketServer
+
+from wsclient import Client, serving
+
+
+@pytest.mark.parametrize("rate", [None, 0, -1, 1000.0])
+def test_drain_closes_every_connection_with_a_restart_code(rate, engine):
+    server = PySocketServer()
+    left = []
+
+    @server.on("disconnect")
+    async def disconnect(ws, data):
+        left.append(ws)
+
+    async def main():
+        async with serving(server) as port:
+            clients = [await Client.connect(port) for _ in range(5)]
+            while len(server.clients) < 5:
+                await asyncio.sleep(0.01)
+            remaining = await server.drain(rate=rate, timeout=5)
+            closes = [await client.recv() for client in clients]
+            refused = await Client.connect(port)
+            for client in clients + [refused]:
+                await client.close()
+            return remaining, closes, refused.response
+
+    remaining, closes, refused = asyncio.run(main())
+    assert remaining == 0
+    assert closes == [("close", 1012, "reconnect")] * 5
+    assert len(left) == 5
+    assert refused.startswith(b"HTTP/1.1 503")
+
+
+def test_drain_paces_closes_at_the_rate():
+    server = PySocketServer()
+
+    async def main():
+        async with serving(server) as port:
+            clients = [await Client.connect(port) for _ in range(4)]
+            while len(server.clients) < 4:
+                await asyncio.sleep(0.01)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await server.drain(rate=20, timeout=5)
+            elapsed = loop.time() - started
+            for client in clients:
+                await client.close()
+            return elapsed
+
+    # The first close goes out at once, the other three 50ms apart
+    assert 0.12 <= asyncio.run(main()) < 2
+
+
+def test_asgi_close_carries_the_reason():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def main():
+        connection = ASGIConnectionWrapper({"type": "websocket", "path": "/"}, None, send)
+        await connection.close(1012, "reconnect")
+
+    asyncio.run(main())
+    assert sent == [{"type": "websocket.close", "code": 1012, "reason": "reconnect"}]
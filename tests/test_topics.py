@@ -0,0 +1,96 @@
+import itertools
+import re
+
+import pytest
+
+from pysocket.backplane import RedisBackplane
+from pysocket.serverConfig.topics import TopicTrie, is_pattern
+
+
+def _matches(pattern, topic):
+    # Reference matcher, straight from the definition
+    pattern, topic = pattern.split("."), topic.split(".")
+    if pattern[-1] == "#":
+        pattern = pattern[:-1]
+        if len(topic) < len(pattern):
+            return False
+        topic = topic[:len(pattern)]
+    return len(pattern) == len(topic) and all(p in ("*", t) for p, t in zip(pattern, topic))
+
+
+PATTERNS = ["a", "a.b", "a.*", "*.b", "a.#", "#", "*", "a.*.c", "a.b.#", "*.*.#", "b.#"]
+TOPICS = [".".join(parts) for n in (1, 2, 3) for parts in itertools.product("abc", repeat=n)]
+
+
+def test_match_agrees_with_the_definition():
+    trie = TopicTrie()
+    for pattern in PATTERNS:
+        trie.subscribe(pattern, pattern)
+    for topic in TOPICS:
+        expected = {pattern for pattern in PATTERNS if _matches(pattern, topic)}
+        assert set(trie.subscribers(topic)) == expected, topic
+
+
+def test_cached_matches_follow_new_and_removed_subscriptions():
+    trie = TopicTrie(cache_size=4)
+    assert trie.subscribers("a.b") == set()
+    assert trie.subscribe("x", "a.*")
+    assert set(trie.subscribers("a.b")) == {"x"}
+    assert not trie.subscribe("y", "a.*")
+    assert trie.subscribe("z", "#")
+    for topic in TOPICS:
+        trie.subscribers(topic)
+    assert set(trie.subscribers("a.b")) == {"x", "y", "z"}
+    assert not trie.unsubscribe("x", "a.*")
+    assert trie.unsubscribe("y", "a.*")
+    assert set(trie.subscribers("a.b")) == {"z"}
+    assert trie.unsubscribe_all("z") == ["#"]
+    assert not trie.subscribers("a.b")
+    assert len(trie) == 0
+
+
+def test_members_are_merged_with_subscribers():
+    trie = TopicTrie()
+    trie.subscribe("x", "a.#")
+    assert set(trie.subscribers("a.b", {"m"})) == {"x", "m"}
+    assert trie.subscribers("c", {"m"}) == {"m"}
+
+
+def test_many_must_be_last():
+    with pytest.raises(ValueError):
+        TopicTrie().subscribe("x", "a.#.b")
+    assert is_pattern("a.*") and is_pattern("#") and not is_pattern("a.b")
+
+
+def _redis_glob(glob):
+    # Redis PSUBSCRIBE semantics for the subset glob_for emits
+    return re.compile("".join(
+        re.escape(token[1]) if token.startswith("\\") else ".*" if token == "*" else re.escape(token)
+        for token in re.findall(r"\\.|.", glob)) + r"\Z", re.S)
+
+
+@pytest.mark.parametrize("pattern, glob", [
+    ("a.*", "p:room:a.*"),
+    ("a.#", "p:room:a*"),
+    ("#", "p:room:*"),
+    ("a[1].*", "p:room:a\\[1\\].*"),
+    ("a[1].#", "p:room:a\\[1\\]*"),
+    ("q?.*.#", "p:room:q\\?.**"),
+])
+def test_redis_globs_escape_literal_segments(pattern, glob):
+    assert RedisBackplane(prefix="p").glob_for(pattern) == glob
+
+
+@pytest.mark.parametrize("pattern", ["a[1].#", "a[1].*", "x*y?.#", "#", "a.*.c"])
+def test_redis_globs_cover_every_matching_room(pattern):
+    glob = _redis_glob(RedisBackplane(prefix="p").glob_for(pattern))
+    rooms = ["a[1]", "a[1].b", "a1.b", "x*y?.z", "xzyq.z", "a.b.c", "a.c"]
+    for room in rooms:
+        if _matches(pattern, room):
+            assert glob.match(f"p:room:{room}"), room
+
+
+def test_redis_globs_treat_special_characters_literally():
+    glob = _redis_glob(RedisBackplane(prefix="p").glob_for("a[1].#"))
+    assert glob.match("p:room:a[1].b")
+    assert not glob.match("p:room:a1.b")
@@ -0,0 +1,83 @@
+"""Minimal WebSocket client and server fixtures shared by the tests."""
+import asyncio
+import base64
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any, List, Optional, Tuple
+
+from pysocket.connectionEngine.frames import (
+    FrameDecoder, OP_CLOSE, OP_TEXT, encode_close, encode_frame, parse_close,
+)
+
+
+class Client:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, response: bytes):
+        self.reader = reader
+        self.writer = writer
+        self.response = response
+        self._decoder = FrameDecoder(require_mask=False)
+        self._frames: List[Tuple[int, bytes]] = []
+
+    @classmethod
+    async def connect(cls, port: int, path: str = "/", headers: str = "") -> "Client":
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((
+            f"GET {path} HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n{headers}\r\n"
+        ).encode())
+        response = await reader.readuntil(b"\r\n\r\n")
+        return cls(reader, writer, response)
+
+    @staticmethod
+    def frame(event: str, data: Any = None, **fields: Any) -> bytes:
+        envelope = dict(fields, event=event, data=data)
+        return encode_frame(OP_TEXT, json.dumps(envelope).encode(), mask=os.urandom(4))
+
+    def send(self, event: str, data: Any = None, **fields: Any) -> None:
+        self.writer.write(self.frame(event, data, **fields))
+
+    def send_raw(self, payload: Any) -> None:
+        self.writer.write(encode_frame(OP_TEXT, json.dumps(payload).encode(), mask=os.urandom(4)))
+
+    def close_frame(self, code: int = 1000) -> bytes:
+        return encode_close(code, mask=os.urandom(4))
+
+    async def frame_in(self, timeout: float = 2.0) -> Optional[Tuple[int, bytes]]:
+        while not self._frames:
+            data = await asyncio.wait_for(self.reader.read(65536), timeout)
+            if not data:
+                return None
+            self._frames += self._decoder.feed(data)
+        return self._frames.pop(0)
+
+    async def recv(self, timeout: float = 2.0) -> Any:
+        """The next decoded envelope, or ``("close", code, reason)``."""
+        frame = await self.frame_in(timeout)
+        if frame is None:
+            return None
+        opcode, payload = frame
+        if opcode == OP_CLOSE:
+            return ("close",) + parse_close(payload)
+        return json.loads(payload)
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+@asynccontextmanager
+async def serving(server):
+    """Serve ``server`` on an ephemeral port for the duration of the block."""
+    await server.start()
+    listener = await server._listen("127.0.0.1", 0)
+    try:
+        yield listener.sockets[0].getsockname()[1]
+    finally:
+        listener.close()
+        for connection in list(server.clients):
+            await connection.close()